@@ -1,12 +1,22 @@
-from flask import Flask, request
-from flask_cors import CORS
-from .routes.recommendation import recommendations_bp
-from .routes.listings import listings_bp
 import os
-from dotenv import load_dotenv
 
+# Imported inside create_app, so scripts using only app.utils (the bulk
+# scorer and its worker processes) don't load Flask and every blueprint.
 def create_app():
+    from flask import Flask
+    from flask_cors import CORS
+    from dotenv import load_dotenv
+    from .routes.recommendation import recommendations_bp
+    from .routes.listings import listings_bp
+    from .routes.metrics import metrics_bp
+    from .utils.accounting import USAGE_HEADER, init_accounting
+    from .utils.http_cache import init_http_cache
+    from .utils.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, init_profiling
+    from .utils.json_provider import FastJSONProvider
+    from .utils.snapshot import init_snapshots
+
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     load_dotenv()
 
@@ -33,8 +43,8 @@ def create_app():
         app,
         origins=allowed_origins if allowed_origins else ["*"],
         supports_credentials=True,
-        allow_headers=["Content-Type", "Authorization"],
-        expose_headers=["Authorization"],
+        allow_headers=["Content-Type", "Authorization", PROFILE_HEADER],
+        expose_headers=["Authorization", "ETag", USAGE_HEADER, PROFILE_ID_HEADER],
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     )
     
@@ -42,6 +52,13 @@ def create_app():
 
     app.register_blueprint(recommendations_bp, url_prefix="/recommendations")
     app.register_blueprint(listings_bp, url_prefix="/listings")
+    app.register_blueprint(metrics_bp, url_prefix="/metrics")
+    # Registered first so its before_request runs even when the HTTP cache answers a 304
+    init_accounting(app)
+    # After accounting, so profiles can sample the request's pool threads
+    init_profiling(app)
+    init_http_cache(app)
+    init_snapshots()
     @app.route("/")
     def root():
         return {"message": "HackPrincetonF25 backend running on AWS-ready Flask app"}
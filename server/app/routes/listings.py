@@ -1,122 +1,210 @@
-from flask import Blueprint, jsonify, request
-import json
-import requests
-import os
-from ..utils.openai import get_car_recommendation, chat_about_car
-from ..utils.clean_data import clean_listings, get_filter_data
+from flask import Blueprint, current_app, jsonify, request
+from ..utils.openai import chat_about_car
+from ..utils.clean_data import RATING_MODES, get_filter_data
+from ..utils.market_index import market_index
+from ..utils.search import autodev_headers, enrich_listings, finish_recommendations, resolve_recommendations, search_many
+from ..utils.recommender import RECOMMENDER_MODES
+from ..utils.vehicle_names import get_name_index
+from ..utils.pagination import DEFAULT_PAGE_SIZE, PAGE_SIZE_MAX, SORT_KEYS, CursorError, ResultSession, decode_cursor, encode_cursor, load_session, store_session
+from ..utils.projection import LAYOUTS, parse_fields, shape_listings
+from ..utils.listing_store import listing_store
+from ..utils.jobs import job_manager
+from ..utils.geo import rank_by_distance, resolve_zip_search
+from ..utils.similar import SIMILAR_DEFAULT_LIMIT, SIMILAR_MAX_LIMIT, similar_index
 
 listings_bp = Blueprint("listings", __name__)
 
+# Limits for POST /listings/batch; each state x query pair is one Auto.dev search
+BATCH_MAX_STATES = 10
+BATCH_MAX_QUERIES = 10
+
+def _listing_page(session, offset, page_size, fields=None, layout="full"):
+    """Enrich and return one page of a result session."""
+    with session.lock:
+        raw_page, has_more = session.take(offset, page_size)
+        missing = [l for l in raw_page if l["vehicle"]["vin"] not in session.enriched]
+        buffered = session.buffered()
+    # Enrich outside the lock so readers of other pages aren't held up; two readers
+    # of the same page may both enrich it, which is harmless
+    enriched = enrich_listings(missing, rating_mode=session.rating_mode) if missing else {}
+    with session.lock:
+        session.enriched.update(enriched)
+        ranking = [l["vehicle"]["vin"] for l in raw_page if l["vehicle"]["vin"] in session.enriched]
+        listings = {vin: session.enriched[vin] for vin in ranking}
+
+    try:
+        filters = get_filter_data(buffered)
+    except Exception as e:
+        print(f"⚠️ Failed to generate filters: {e}")
+        filters = {}
+
+    return jsonify({
+        "items": len(listings),
+        # jsonify sorts object keys, so the ranked order is sent separately
+        "ranking": ranking,
+        "listings": shape_listings(listings, fields, layout, order=ranking),
+        "filters": filters,
+        "page": {
+            "offset": offset,
+            "size": page_size,
+            "sort": session.sort,
+            "order": "desc" if session.descending else "asc",
+            "buffered": len(buffered),
+            # False when the sort is computed here and a model had more upstream pages than were read
+            "exact": session.exact,
+            "nextCursor": encode_cursor(session.id, offset + page_size, session.spec()) if has_more else None,
+        },
+    }), 200
+
+_STRING_PARAMS = ("state", "zip", "make", "model", "primary_use", "comfort", "ratings", "recommender")
+
+def _model_year(value):
+    """A model year as an int, or None when it is missing or not a number."""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+def _search_params(args):
+    """
+    Validate the search parameters shared by GET /listings/ and POST /listings/jobs.
+
+    Returns:
+        tuple: (params, None) or (None, error response)
+    """
+    # JSON bodies (POST /listings/jobs) can carry any type
+    for key in _STRING_PARAMS:
+        if args.get(key) is not None and not isinstance(args[key], str):
+            return None, (jsonify({"error": f"{key} must be a string"}), 400)
+    budget = args.get("budget")
+    if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (str, int, float))):
+        return None, (jsonify({"error": "budget must be a number"}), 400)
+
+    zip_search = None
+    if args.get("zip"):
+        try:
+            radius = float(args["radius"]) if args.get("radius") not in (None, "") else None
+        except (TypeError, ValueError):
+            return None, (jsonify({"error": "radius must be a number of miles"}), 400)
+        try:
+            zip_search = resolve_zip_search(args["zip"], radius)
+        except ValueError as e:
+            return None, (jsonify({"error": str(e)}), 400)
+
+    state = args.get("state")
+    if not state and zip_search is None:
+        return None, (jsonify({"error": "state or zip is required"}), 400)
+    # An explicit state wins; otherwise search the states within the radius, nearest first
+    states = [state] if state else zip_search["states"]
+
+    make = args.get("make")
+    model = args.get("model")
+    primary_use = args.get("primary_use")
+    if primary_use:
+        primary_use = primary_use.replace("_", " ")
+    if not (make or model) and not primary_use:
+        return None, (jsonify({"error": "primary_use is required"}), 400)
+    rating_mode = args.get("ratings", "auto")
+    if rating_mode not in RATING_MODES:
+        return None, (jsonify({"error": f"ratings must be one of {', '.join(RATING_MODES)}"}), 400)
+    recommender_mode = args.get("recommender", "auto")
+    if recommender_mode not in RECOMMENDER_MODES:
+        return None, (jsonify({"error": f"recommender must be one of {', '.join(RECOMMENDER_MODES)}"}), 400)
+    model_year = _model_year(args.get("model_year"))
+
+    return {
+        "state": states[0],
+        "states": states,
+        "zip": zip_search,
+        "make": make,
+        "model": model,
+        "model_year": model_year,
+        "comfort": args.get("comfort"),
+        "primary_use": primary_use,
+        "budget": args.get("budget"),
+        "rating_mode": rating_mode,
+        "recommender_mode": recommender_mode,
+    }, None
+
+def _apply_proximity(results, zip_search):
+    """
+    Apply a zip search's radius to {vin: listing} results.
+
+    Returns:
+        tuple: (results nearest first, response fields: "ranking", "distances" and "zip")
+    """
+    if zip_search is None:
+        return results, {}
+    proximity = {"zip": {k: zip_search[k] for k in ("zip", "radius", "states")}}
+    if zip_search["origin"] is not None:
+        # Nearest first; listings outside the radius are dropped
+        ranking, distances = rank_by_distance(results, zip_search["origin"], zip_search["radius"])
+        results = {vin: results[vin] for vin in ranking}
+        proximity.update(ranking=ranking, distances=distances)
+    return results, proximity
+
 @listings_bp.route("/", methods=["GET"])
 def get_listings_by_filter():
     """Fetch real car listings from Auto.dev based on AI-generated or user-provided criteria."""
     try:
-        state = request.args.get("state")
-        if not state:
-            return jsonify({"error": "state is required"}), 400
-
-        make = request.args.get("make")
-        model = request.args.get("model")
-        model_year = request.args.get("model_year", type=int)
-        comfort = request.args.get("comfort")
-        primary_use = request.args.get("primary_use")
-        if primary_use:
-            primary_use = primary_use.replace("_", " ")
-        if not (make or model) and not primary_use:
-            return jsonify({"error": "primary_use is required"}), 400
-        budget = request.args.get("budget")
-
-        car_listings = []
-
-        # --- 1️⃣ Get recommendations ---
-        if make and model:
-            # ✅ User directly provided make/model → single query, no AI
-            recommendations = [{
-                "make": make,
-                "model": model,
-                "year": model_year,
-            }]
-            print(f"ℹ️ Direct search: {make} {model} ({model_year or 'any year'})")
+        page_size = request.args.get("page_size", type=int)
+        if page_size is not None and not 1 <= page_size <= PAGE_SIZE_MAX:
+            return jsonify({"error": f"page_size must be between 1 and {PAGE_SIZE_MAX}"}), 400
+        try:
+            fields = parse_fields(request.args.get("fields"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        layout = request.args.get("format", "full")
+        if layout not in LAYOUTS:
+            return jsonify({"error": f"format must be one of {', '.join(LAYOUTS)}"}), 400
 
-        else:
-            # ✅ Use AI to generate recommendations
+        # Next page of an earlier search: no new recommendations or searches
+        cursor = request.args.get("cursor")
+        if cursor:
             try:
-                rec_response = get_car_recommendation(state, budget, primary_use, comfort)
-                # Handle both tuple (error) and Response object cases
-                if isinstance(rec_response, tuple):
-                    # Error case: (response, status_code)
-                    error_data = rec_response[0].get_json()
-                    return jsonify({"error": error_data.get("error", "AI recommendation error")}), rec_response[1]
-                recommendations_json = rec_response.get_json()
-            except Exception as e:
-                print(f"❌ Failed to get AI recommendations: {e}")
-                return jsonify({"error": f"AI recommendation error: {str(e)}"}), 500
-
-            # --- Parse AI output safely ---
-            try:
-                raw_text = recommendations_json.get("recommendations", {}).get("text", "")
-                raw_text = raw_text.replace("```json", "").replace("```", "").strip()
-                recommendations = json.loads(raw_text)
-                print(recommendations)
-                print(f"✅ AI provided {len(recommendations)} car suggestions")
-            except Exception as e:
-                print(f"❌ Failed to parse AI recommendations: {e}")
-                return jsonify({"error": f"Failed to parse AI output: {str(e)}"}), 500
-
-        # --- 2️⃣ Validate Auto.dev token ---
-        token = os.getenv("AUTO_DEV_KEY")
-        if not token:
-            return jsonify({"error": "Missing AUTO_DEV_KEY environment variable"}), 500
+                session_id, offset, spec = decode_cursor(cursor)
+                session = load_session(session_id, spec, autodev_headers())
+            except CursorError as e:
+                return jsonify({"error": str(e)}), e.status
+            return _listing_page(session, offset, page_size or session.page_size, fields, layout)
 
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        params, error = _search_params(request.args)
+        if error is not None:
+            return error
+        sort = request.args.get("sort")
+        if sort is not None and sort not in SORT_KEYS:
+            return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+        order = request.args.get("order")
+        if order not in (None, "asc", "desc"):
+            return jsonify({"error": "order must be asc or desc"}), 400
+        paginated = page_size is not None or sort is not None
+        if paginated and params["zip"] is not None:
+            return jsonify({"error": "zip can't be combined with page_size or sort"}), 400
+        state, budget, rating_mode = params["state"], params["budget"], params["rating_mode"]
 
-        # --- 3️⃣ Call Auto.dev for each recommended vehicle ---
-        for rec in recommendations:
-            make = rec.get("make")
-            model = rec.get("model")
-            year = rec.get("year")
-
-            if not (make and model):
-                print(f"⚠️ Skipping incomplete recommendation: {rec}")
-                continue
+        # --- 1️⃣ Validate Auto.dev token ---
+        headers = autodev_headers()
+        if headers is None:
+            return jsonify({"error": "Missing AUTO_DEV_KEY environment variable"}), 500
 
-            url = (
-                f"https://api.auto.dev/listings?"
-                f"vehicle.make={make}&"
-                f"vehicle.model={model}&"
-                f"retailListing.state={state}&"
-                f"limit=5"
-            )
+        # --- 2️⃣ Get recommendations ---
+        recommendations, rec_state, local = resolve_recommendations(params)
 
-            if budget:
-                url += f"&retailListing.price=0-{budget}"
-            if year:
-                url += f"&vehicle.year={year}"
+        # --- 3️⃣ + 4️⃣ Search Auto.dev and clean/enrich listings as results arrive ---
+        if paginated:
+            # Ranked pages: open a result session and enrich only the first page
+            session = ResultSession(state, budget, headers, sort=sort or "price",
+                                    descending=None if order is None else order == "desc",
+                                    page_size=page_size or DEFAULT_PAGE_SIZE, rating_mode=rating_mode)
+            session.open(recommendations)
+            error = finish_recommendations(params, rec_state, local)
+            if error is not None:
+                return jsonify({"error": f"AI recommendation error: {error}"}), error.status
+            store_session(session)
+            return _listing_page(session, 0, session.page_size, fields, layout)
 
-            try:
-                resp = requests.get(url, headers=headers, timeout=10)
-                if resp.status_code == 200:
-                    listings_data = resp.json()
-                    car_listings.append({
-                        "recommendation": rec,
-                        "listings": listings_data.get("listings", listings_data.get("data", []))
-                    })
-                else:
-                    print(f"❌ Auto.dev error {resp.status_code} for {make} {model}")
-                    car_listings.append({
-                        "recommendation": rec,
-                        "error": f"Auto.dev returned {resp.status_code}"
-                    })
-            except Exception as e:
-                print(f"❌ Request failed for {make} {model}: {e}")
-                car_listings.append({
-                    "recommendation": rec,
-                    "error": f"Request exception: {str(e)}"
-                })
-
-        # --- 4️⃣ Clean + deduplicate listings ---
         try:
-            simplified = clean_listings({"results": car_listings})
+            simplified = search_many(recommendations, params["states"], budget, headers, rating_mode=rating_mode)
             print(f"✅ Found {simplified['uniqueVinCount']} unique VINs")
         except Exception as e:
             print(f"⚠️ Failed to clean listings: {e}")
@@ -124,6 +212,13 @@ def get_listings_by_filter():
             traceback.print_exc()
             simplified = {"uniqueVinCount": 0, "results": {}}
 
+        error = finish_recommendations(params, rec_state, local)
+        if error is not None:
+            return jsonify({"error": f"AI recommendation error: {error}"}), error.status
+
+        results, proximity = _apply_proximity(simplified["results"], params["zip"])
+        simplified = {"uniqueVinCount": len(results), "results": results}
+
         # --- 5️⃣ Generate filters ---
         try:
             filters = get_filter_data(simplified.get("results", {}))
@@ -135,8 +230,9 @@ def get_listings_by_filter():
         # --- 6️⃣ Return structured response ---
         return jsonify({
             "items": simplified["uniqueVinCount"],
-            "listings": simplified["results"],
-            "filters": filters
+            "listings": shape_listings(simplified["results"], fields, layout, order=proximity.get("ranking")),
+            "filters": filters,
+            **proximity,
         }), 200
     except Exception as e:
         import traceback
@@ -145,6 +241,203 @@ def get_listings_by_filter():
         print(f"❌ Unhandled error in get_listings_by_filter: {error_msg}")
         return jsonify({"error": f"Internal server error: {error_msg}"}), 500
 
+@listings_bp.route("/batch", methods=["POST"])
+def get_listings_batch():
+    """
+    Search several states and/or make/model pairs in one request.
+
+    JSON body: "states" (list, required), optional "queries" [{"make", "model", "model_year"}],
+    plus the single-search parameters (budget, primary_use, comfort, ratings, recommender,
+    fields, format). Without queries, recommendations are picked once, for the first state,
+    and searched in every state. Listings are returned once, keyed by VIN; each group lists
+    the VINs its search found.
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "JSON body is required"}), 400
+        states = body.get("states")
+        if not isinstance(states, list) or not states or not all(isinstance(s, str) and s for s in states):
+            return jsonify({"error": "states must be a non-empty list of state codes"}), 400
+        states = list(dict.fromkeys(s.upper() for s in states))
+        queries = body.get("queries") or []
+        if not isinstance(queries, list) or not all(
+                isinstance(q, dict) and q.get("make") and q.get("model")
+                and isinstance(q["make"], str) and isinstance(q["model"], str) for q in queries):
+            return jsonify({"error": "queries must be a list of objects with make and model"}), 400
+        if len(states) > BATCH_MAX_STATES or len(queries) > BATCH_MAX_QUERIES:
+            return jsonify({"error": f"at most {BATCH_MAX_STATES} states and {BATCH_MAX_QUERIES} queries"}), 400
+        try:
+            fields = parse_fields(body.get("fields"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        layout = body.get("format", "full")
+        if layout not in LAYOUTS:
+            return jsonify({"error": f"format must be one of {', '.join(LAYOUTS)}"}), 400
+
+        # Shared parameters are validated like a single search for the first state/query
+        first = queries[0] if queries else {}
+        params, error = _search_params({**body, "state": states[0], "make": first.get("make"),
+                                        "model": first.get("model"), "model_year": first.get("model_year")})
+        if error is not None:
+            return error
+
+        headers = autodev_headers()
+        if headers is None:
+            return jsonify({"error": "Missing AUTO_DEV_KEY environment variable"}), 500
+
+        if queries:
+            recommendations = [{"make": q["make"], "model": q["model"], "year": _model_year(q.get("model_year"))}
+                               for q in queries]
+            rec_state, local = {"count": len(queries), "error": None, "picks": []}, None
+        else:
+            recommendations, rec_state, local = resolve_recommendations(params)
+
+        found = search_many(recommendations, states, params["budget"], headers, rating_mode=params["rating_mode"])
+        print(f"✅ Batch found {found['uniqueVinCount']} unique VINs across {len(found['groups'])} searches")
+
+        error = finish_recommendations(params, rec_state, local)
+        if error is not None:
+            return jsonify({"error": f"AI recommendation error: {error}"}), error.status
+
+        try:
+            filters = get_filter_data(found["results"])
+        except Exception as e:
+            print(f"⚠️ Failed to generate filters: {e}")
+            filters = {}
+
+        return jsonify({
+            "items": found["uniqueVinCount"],
+            "groups": [{
+                "state": group["state"],
+                "query": {k: group["recommendation"].get(k) for k in ("make", "model", "year")},
+                "items": len(group["vins"]),
+                "vins": group["vins"],
+                "error": group["error"],
+            } for group in found["groups"]],
+            "listings": shape_listings(found["results"], fields, layout),
+            "filters": filters,
+        }), 200
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f"❌ Unhandled error in get_listings_batch: {e}")
+        return jsonify({"error": f"Internal server error: {e}"}), 500
+
+@listings_bp.route("/jobs", methods=["POST"])
+def create_search_job():
+    """Start a listing search in the background; poll GET /listings/jobs/<id> for results."""
+    args = request.get_json(silent=True) or request.args
+    params, error = _search_params(args)
+    if error is not None:
+        return error
+    headers = autodev_headers()
+    if headers is None:
+        return jsonify({"error": "Missing AUTO_DEV_KEY environment variable"}), 500
+
+    job, created = job_manager.submit(current_app._get_current_object(), params, headers)
+    return jsonify({
+        "jobId": job.id,
+        "status": job.status,
+        "poll": f"{request.script_root}/listings/jobs/{job.id}",
+    }), 202 if created else 200
+
+@listings_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_search_job(job_id):
+    """Progress and the listings enriched so far for a search job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    layout = request.args.get("format", "full")
+    if layout not in LAYOUTS:
+        return jsonify({"error": f"format must be one of {', '.join(LAYOUTS)}"}), 400
+
+    snapshot = job.snapshot()
+    results, proximity = _apply_proximity(snapshot.pop("results"), job.params.get("zip"))
+    try:
+        filters = get_filter_data(results)
+    except Exception as e:
+        print(f"⚠️ Failed to generate filters: {e}")
+        filters = {}
+    return jsonify({
+        **snapshot,
+        "items": len(results),
+        "listings": shape_listings(results, fields, layout, order=proximity.get("ranking")),
+        "filters": filters,
+        **proximity,
+    }), 200
+
+@listings_bp.route("/<vin>", methods=["GET"])
+def get_listing(vin):
+    """Full record for one VIN from a recent search, for the detail view."""
+    listing = listing_store.get(vin) or listing_store.get(vin.upper())
+    if listing is None:
+        return jsonify({"error": f"Listing {vin} not found, search again to refresh it"}), 404
+    return jsonify(listing), 200
+
+@listings_bp.route("/<vin>/similar", methods=["GET"])
+def get_similar_listings(vin):
+    """Listings we've seen that are most like one VIN, from the local vector index."""
+    limit = request.args.get("limit", SIMILAR_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= SIMILAR_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {SIMILAR_MAX_LIMIT}"}), 400
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    layout = request.args.get("format", "full")
+    if layout not in LAYOUTS:
+        return jsonify({"error": f"format must be one of {', '.join(LAYOUTS)}"}), 400
+
+    matches = similar_index.similar(vin, limit)
+    if matches is None:
+        matches = similar_index.similar(vin.upper(), limit)
+    if matches is None:
+        return jsonify({"error": f"Listing {vin} not found, search again to refresh it"}), 404
+
+    # Matches whose full record has already left the listing store are skipped
+    listings = {}
+    for match, _ in matches:
+        listing = listing_store.get(match)
+        if listing is not None:
+            listings[match] = listing
+    ranking = list(listings)
+    scores = dict(matches)
+    return jsonify({
+        "vin": vin,
+        "items": len(listings),
+        "ranking": ranking,
+        "similarity": {v: scores[v] for v in ranking},
+        "listings": shape_listings(listings, fields, layout, order=ranking),
+    }), 200
+
+@listings_bp.route("/market-stats", methods=["GET"])
+def get_market_stats():
+    """Price/mileage quantiles for comparable listings we've seen, optionally scoring a price."""
+    make = request.args.get("make")
+    model = request.args.get("model")
+    if not (make and model):
+        return jsonify({"error": "make and model are required"}), 400
+    make, model, _ = get_name_index().normalize(make, model)
+    year = request.args.get("year", type=int)
+    state = request.args.get("state")
+
+    stats = market_index.stats(make, model, year, state)
+    if stats is None:
+        return jsonify({"error": f"No comparable listings for {make} {model}"}), 404
+
+    price = request.args.get("price", type=float)
+    if price is not None:
+        stats["deal"] = market_index.deal_rating({
+            "vehicle": {"make": make, "model": model, "year": year},
+            "retailListing": {"price": price, "miles": request.args.get("miles", type=float), "state": state},
+        })
+    return jsonify(stats), 200
+
 @listings_bp.route("/chat", methods=["POST"])
 def chat_with_ai():
     """Chat with AI about a specific car."""
@@ -0,0 +1,70 @@
+from flask import Blueprint, jsonify, request
+from ..utils.circuit_breaker import breaker_stats
+from ..utils.vehicle_names import search_metrics
+from ..utils.http_cache import body_cache
+from ..utils.jobs import job_manager
+from ..utils.cache import cache_stats
+from ..utils.hedging import hedger_stats
+from ..utils.similar import similar_index
+from ..utils.accounting import usage_totals
+from ..utils.profiling import PROFILE_HEADER, PROFILE_KINDS, profiler, verify_profile_token
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/search", methods=["GET"])
+def get_search_metrics():
+    """Upstream search counters: how many searches ran, were normalized, and were rescued by normalization."""
+    searches = search_metrics()
+    normalized = searches["normalized"]
+    searches["rescueRate"] = round(searches["rescued"] / normalized, 3) if normalized else None
+    return jsonify({"searches": searches, "breakers": breaker_stats()}), 200
+
+@metrics_bp.route("/http-cache", methods=["GET"])
+def get_http_cache_metrics():
+    """Precompressed body cache size, hit/miss counts and 304s served."""
+    return jsonify(body_cache.stats()), 200
+
+@metrics_bp.route("/jobs", methods=["GET"])
+def get_job_metrics():
+    """Search jobs in the store by status."""
+    return jsonify(job_manager.stats()), 200
+
+@metrics_bp.route("/cache", methods=["GET"])
+def get_cache_metrics():
+    """Shared cache backend and per-namespace hit rates (search, photos, ratings, recommendations)."""
+    return jsonify(cache_stats()), 200
+
+@metrics_bp.route("/hedging", methods=["GET"])
+def get_hedging_metrics():
+    """Per-upstream hedging: current hedge delay, hedge ratio, hedge wins and latency percentiles."""
+    return jsonify(hedger_stats()), 200
+
+@metrics_bp.route("/similar", methods=["GET"])
+def get_similar_metrics():
+    """Similar-listings index size and LSH bucket count."""
+    return jsonify(similar_index.stats()), 200
+
+@metrics_bp.route("/usage", methods=["GET"])
+def get_usage_metrics():
+    """Per-endpoint upstream cost: OpenAI calls and tokens, Auto.dev calls and cache hits, in total and per request."""
+    return jsonify(usage_totals.stats()), 200
+
+@metrics_bp.route("/profiles", methods=["GET"])
+def list_profiles():
+    """Stored request profiles, newest first. Requires a signed X-Profile token."""
+    if not verify_profile_token(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"error": "A valid X-Profile token is required"}), 403
+    return jsonify({"profiles": profiler.list()}), 200
+
+@metrics_bp.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """Collapsed stacks of one profile (?kind=wall or cpu), ready for flamegraph.pl or speedscope."""
+    if not verify_profile_token(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"error": "A valid X-Profile token is required"}), 403
+    kind = request.args.get("kind", "wall")
+    if kind not in PROFILE_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(PROFILE_KINDS)}"}), 400
+    stacks = profiler.stacks(profile_id, kind)
+    if stacks is None:
+        return jsonify({"error": f"Profile {profile_id} not found"}), 404
+    return stacks, 200, {"Content-Type": "text/plain; charset=utf-8"}
@@ -1,7 +1,6 @@
 from flask import Blueprint, jsonify
-import requests
 import os
-from openai import OpenAI
+from ..utils.llm_parsing import LLMParseError, extract_json
 
 recommendations_bp = Blueprint("recommendations", __name__)
 
@@ -11,6 +10,7 @@ def get_car_recommendations():
     if not key:
         return jsonify({"error": "Missing OpenAI API key"}), 500
 
+    from openai import OpenAI
     client = OpenAI(api_key=key)
 
     # Extract query parameters
@@ -61,10 +61,9 @@ def get_car_recommendations():
         raw = response.choices[0].message.content.strip()
 
         # Try to parse the response into JSON
-        import json
         try:
-            recommendations = json.loads(raw)
-        except json.JSONDecodeError:
+            recommendations = extract_json(raw)
+        except LLMParseError:
             # If parsing fails, wrap raw text
             recommendations = {"text": raw}
 
@@ -0,0 +1,146 @@
+"""
+Request Accounting
+==================
+Counts what each request costs upstream: OpenAI calls and tokens, Auto.dev
+search and photo calls, and shared-cache hits (each one an upstream call
+that didn't happen).
+
+The counters for the current request live in a context variable, so code
+anywhere below a route can call record() without threading state through.
+Work handed to a thread pool must be wrapped with propagate() to be counted
+against the request that started it; propagate() also tracks which threads
+are working for the request, so the profiler (profiling.py) can sample
+them. Code running outside a request (search jobs, the bulk scorer)
+records nothing.
+
+Each response carries its counts in the X-Request-Usage header, and totals
+per endpoint are served at /metrics/usage.
+"""
+
+import contextvars
+import os
+import threading
+
+REQUEST_USAGE_HEADER = os.getenv("REQUEST_USAGE_HEADER", "1") != "0"
+USAGE_HEADER = "X-Request-Usage"
+
+_current = contextvars.ContextVar("request_usage", default=None)
+
+
+class RequestUsage:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self.threads = {}  # ident -> depth, for pool threads currently working for the request
+
+    def add(self, counter, amount=1):
+        with self._lock:
+            self._counts[counter] = self._counts.get(counter, 0) + amount
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def active_threads(self):
+        with self._lock:
+            return set(self.threads)
+
+
+def record(counter, amount=1):
+    """Add to a counter of the current request; a no-op outside one."""
+    usage = _current.get()
+    if usage is not None and amount:
+        usage.add(counter, amount)
+
+
+def record_completion(response):
+    """Count one OpenAI completion and its token usage (a response or the final stream chunk)."""
+    record("openaiCalls")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        record("promptTokens", getattr(usage, "prompt_tokens", 0) or 0)
+        record("completionTokens", getattr(usage, "completion_tokens", 0) or 0)
+
+
+def propagate(func):
+    """Wrap `func` so it counts against the current request when run on another thread."""
+    usage = _current.get()
+    if usage is None:
+        return func
+
+    def _run(*args, **kwargs):
+        token = _current.set(usage)
+        ident = threading.get_ident()
+        with usage._lock:
+            usage.threads[ident] = usage.threads.get(ident, 0) + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with usage._lock:
+                # propagate() can nest on one thread (a hedged call made from enrichment)
+                if usage.threads[ident] > 1:
+                    usage.threads[ident] -= 1
+                else:
+                    del usage.threads[ident]
+            _current.reset(token)
+
+    return _run
+
+
+def format_usage(counts):
+    """Header value: "key=value" pairs, sorted, comma separated."""
+    return ", ".join(f"{key}={value}" for key, value in sorted(counts.items()))
+
+
+class UsageTotals:
+    """Counters summed per endpoint across finished requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, endpoint, counts):
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {"requests": 0, "totals": {}})
+            entry["requests"] += 1
+            for key, value in counts.items():
+                entry["totals"][key] = entry["totals"].get(key, 0) + value
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": entry["requests"],
+                    "totals": dict(entry["totals"]),
+                    "perRequest": {k: round(v / entry["requests"], 2) for k, v in entry["totals"].items()},
+                }
+                for endpoint, entry in self._endpoints.items()
+            }
+
+
+usage_totals = UsageTotals()
+
+
+def init_accounting(app):
+    from flask import g, request
+
+    @app.before_request
+    def _start_usage():
+        g.request_usage = RequestUsage()
+        _current.set(g.request_usage)
+
+    @app.after_request
+    def _report_usage(response):
+        usage = g.get("request_usage")
+        if usage is None:
+            return response
+        counts = usage.counts()
+        usage_totals.add(request.endpoint or "unknown", counts)
+        if REQUEST_USAGE_HEADER:
+            response.headers[USAGE_HEADER] = format_usage(counts)
+        return response
+
+    @app.teardown_request
+    def _end_usage(error=None):
+        # Worker threads serve many requests; don't let this one's counters leak into the next
+        _current.set(None)
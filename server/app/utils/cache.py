@@ -0,0 +1,418 @@
+"""
+Cache Module
+============
+One cache API for Auto.dev searches, photos, LLM ratings and LLM
+recommendations, with backends chosen by CACHE_BACKEND:
+
+    memory  per-process LRU (default)
+    sqlite  SQLite file in WAL mode, shared by every worker on the host
+    redis   any server speaking the Redis protocol (RESP), shared across hosts
+
+Values are stored as JSON, so every backend returns the same data. Each
+namespace counts its own hits, misses and writes in the same way for every
+backend, so hit rates can be compared across backends. A failing backend
+counts an error and behaves like a miss; it never fails a request.
+"""
+
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from .accounting import record
+
+try:
+    import orjson
+
+    def _dumps(value):
+        return orjson.dumps(value)
+
+    _loads = orjson.loads
+except ImportError:  # optional, stdlib json is used instead
+    import json
+
+    def _dumps(value):
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "20000"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "revvo_cache.sqlite3"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+
+# Bump when the shape of cached values changes; snapshots from other versions are skipped
+CACHE_VERSION = 1
+
+# Seconds each namespace's entries stay fresh; override with CACHE_TTL_<NAMESPACE>
+DEFAULT_TTLS = {
+    "search": 300,
+    "photos": 86400,
+    "ratings": 6 * 3600,
+    "recommendations": 3600,
+}
+
+
+def namespace_ttl(namespace):
+    return float(os.getenv(f"CACHE_TTL_{namespace.upper()}", DEFAULT_TTLS.get(namespace, 3600)))
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()  # key -> (expires, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] is not None and item[0] < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, data, ttl=None):
+        with self._lock:
+            self._items[key] = (time.time() + ttl if ttl else None, data)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def items(self):
+        """Live (key, data, expires) entries, least recently used first, for snapshots."""
+        now = time.time()
+        with self._lock:
+            return [(k, data, expires) for k, (expires, data) in self._items.items()
+                    if expires is None or expires > now]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items)}
+
+
+class SQLiteBackend:
+    """
+    Shared cache in one SQLite file. WAL mode lets readers in every worker
+    process run alongside a writer; each thread keeps its own connection.
+    """
+    name = "sqlite"
+    PRUNE_EVERY = 500  # writes between expiry/size sweeps
+
+    def __init__(self, path=CACHE_SQLITE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, data, ttl=None):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, data, time.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def prune(self):
+        """Drop expired rows, then the oldest writes beyond max_entries."""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            # INSERT OR REPLACE assigns a new rowid, so low rowids are the least recently written
+            conn.execute("DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid LIMIT ?)",
+                         (excess,))
+
+    def items(self):
+        rows = self._conn().execute(
+            "SELECT key, value, expires FROM cache WHERE expires IS NULL OR expires > ? ORDER BY rowid",
+            (time.time(),)
+        ).fetchall()
+        return [(k, bytes(v), e) for k, v, e in rows]
+
+    def stats(self):
+        return {"entries": self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0], "path": self.path}
+
+
+class RedisBackend:
+    """Minimal RESP client: GET, SET with PX, DEL and DBSIZE over one socket per thread."""
+    name = "redis"
+    RETRY_AFTER = 5  # seconds to skip the server after a failed connect
+
+    def __init__(self, url=CACHE_REDIS_URL, timeout=0.5):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connect(self):
+        if time.time() < self._down_until:
+            raise ConnectionError(f"Redis at {self.host}:{self.port} is unavailable")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            self._down_until = time.time() + self.RETRY_AFTER
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", str(self.db))
+
+    def _read(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [self._read() for _ in range(int(rest))]
+        raise ConnectionError(f"Unexpected Redis reply {line!r}")
+
+    def _call(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._local.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def command(self, *args):
+        """Send one command, reconnecting once if the connection dropped."""
+        for attempt in (0, 1):
+            if getattr(self._local, "sock", None) is None:
+                self._connect()
+            try:
+                return self._call(*args)
+            except (ConnectionError, OSError):
+                self._local.sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, data, ttl=None):
+        if ttl:
+            self.command("SET", key, data, "PX", int(ttl * 1000))
+        else:
+            self.command("SET", key, data)
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+    def items(self):
+        return []  # the Redis server keeps its own data across restarts
+
+    def stats(self):
+        return {"entries": self.command("DBSIZE"), "server": f"{self.host}:{self.port}/{self.db}"}
+
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend, "redis": RedisBackend}
+
+
+class NamespacedCache:
+    """
+    One namespace of the shared backend, with its own TTL and hit/miss counters.
+
+    `warm_source` (see snapshot.py) is consulted on a backend miss; a value
+    found there is copied into the backend and counted as a hit and a warm hit.
+    """
+
+    def __init__(self, backend, namespace, ttl=None, warm_source=None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = namespace_ttl(namespace) if ttl is None else ttl
+        self.warm_source = warm_source
+        self.hits = 0
+        self.misses = 0
+        self.warm_hits = 0
+        self.writes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, key, default=None):
+        try:
+            data = self.backend.get(self._key(key))
+        except Exception as e:
+            print(f"⚠️ Cache get failed ({self.backend.name}/{self.namespace}): {e}")
+            self._count("errors")
+            data = None
+        if data is None and self.warm_source is not None:
+            data = self._warm(key)
+        if data is None:
+            self._count("misses")
+            return default
+        self._count("hits")
+        record(f"cacheHits.{self.namespace}")
+        return _loads(data)
+
+    def _warm(self, key):
+        found = self.warm_source.lookup(self.namespace, key)
+        if found is None:
+            return None
+        data, expires = found
+        ttl = expires - time.time() if expires else self.ttl
+        if ttl <= 0:
+            return None
+        try:
+            self.backend.set(self._key(key), data, ttl)
+        except Exception as e:
+            print(f"⚠️ Cache warm copy failed ({self.backend.name}/{self.namespace}): {e}")
+            self._count("errors")
+        self._count("warm_hits")
+        return data
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.backend.set(self._key(key), _dumps(value), ttl or self.ttl)
+            self._count("writes")
+        except Exception as e:
+            print(f"⚠️ Cache set failed ({self.backend.name}/{self.namespace}): {e}")
+            self._count("errors")
+
+    def delete(self, key):
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            print(f"⚠️ Cache delete failed ({self.backend.name}/{self.namespace}): {e}")
+            self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "warmHits": self.warm_hits,
+                "writes": self.writes,
+                "errors": self.errors,
+                "hitRate": round(self.hits / lookups, 3) if lookups else None,
+                "ttl": self.ttl,
+            }
+
+
+_backend = None
+_namespaces = {}
+_warm_source = None
+_cache_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, created on first use. Falls back to memory if it can't be opened."""
+    global _backend
+    if _backend is None:
+        with _cache_lock:
+            if _backend is None:
+                backend_class = BACKENDS.get(CACHE_BACKEND)
+                if backend_class is None:
+                    print(f"⚠️ Unknown CACHE_BACKEND '{CACHE_BACKEND}', using memory")
+                    backend_class = MemoryBackend
+                try:
+                    _backend = backend_class()
+                except Exception as e:
+                    print(f"⚠️ Failed to open {backend_class.name} cache, using memory: {e}")
+                    _backend = MemoryBackend()
+                print(f"✅ Cache backend: {_backend.name}")
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the backend (tests, benchmarks). Namespace counters start over."""
+    global _backend
+    with _cache_lock:
+        _backend = backend
+        _namespaces.clear()
+
+
+def cache_for(namespace):
+    with _cache_lock:
+        cache = _namespaces.get(namespace)
+    if cache is None:
+        backend = get_backend()
+        with _cache_lock:
+            cache = _namespaces.setdefault(namespace, NamespacedCache(backend, namespace, warm_source=_warm_source))
+    return cache
+
+
+def set_warm_source(source):
+    """Serve backend misses from `source` (a loaded snapshot), or stop with None."""
+    global _warm_source
+    with _cache_lock:
+        _warm_source = source
+        for cache in _namespaces.values():
+            cache.warm_source = source
+
+
+def cache_stats():
+    backend = get_backend()
+    with _cache_lock:
+        namespaces = dict(_namespaces)
+    try:
+        backend_stats = backend.stats()
+    except Exception as e:
+        backend_stats = {"error": str(e)}
+    return {
+        "backend": backend.name,
+        **backend_stats,
+        "snapshot": _warm_source.stats() if _warm_source is not None else None,
+        "namespaces": {name: cache.stats() for name, cache in namespaces.items()},
+    }
@@ -0,0 +1,201 @@
+"""
+Circuit Breaker Module
+======================
+Per-upstream circuit breakers so a degraded Auto.dev or OpenAI endpoint fails
+fast instead of making every VIN wait out its timeout.
+
+A breaker is CLOSED while calls succeed. After `failure_threshold` consecutive
+failures it OPENS and short-circuits straight to the fallback. Once
+`reset_timeout` seconds have passed it goes HALF_OPEN and lets a single probe
+call through: success closes the breaker again, failure re-opens it.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+DEFAULT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+DEFAULT_CACHE_SIZE = 1024
+
+
+class UpstreamError(Exception):
+    """Raised by wrapped calls when the upstream itself misbehaved (5xx, 429, timeout)."""
+
+
+def is_upstream_failure(error):
+    """
+    Whether an error from a wrapped call counts against the breaker: UpstreamError
+    or a transport error (requests' exceptions are OSErrors). A response that
+    arrived but couldn't be parsed (including requests' JSONDecodeError, a
+    ValueError) says nothing about the upstream's health.
+    """
+    return isinstance(error, (UpstreamError, OSError)) and not isinstance(error, ValueError)
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, cache_size=DEFAULT_CACHE_SIZE):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_good = OrderedDict()  # cache_key -> last successful result
+        self._stats = {"calls": 0, "failures": 0, "shortCircuits": 0, "cachedFallbacks": 0, "trips": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _set_state(self, state):
+        # Caller must hold the lock. Any probe belongs to the state being left
+        self._state = state
+        self._probe_in_flight = False
+
+    def _current_state(self):
+        # Caller must hold the lock
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def allow_request(self):
+        """Return True if a call may go upstream right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["shortCircuits"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"✅ Circuit '{self.name}' closed after successful probe")
+            self._set_state(CLOSED)
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["trips"] += 1
+                    print(f"⚡ Circuit '{self.name}' opened after {self._failures} consecutive failures")
+                self._set_state(OPEN)
+                self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Let another probe through after one ended with neither a success nor a failure."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextmanager
+    def attempt(self, is_failure=is_upstream_failure):
+        """
+        Record the outcome of a call made after allow_request() returned True,
+        for calls that can't go through call() (streams, callers with their own
+        error handling). Errors `is_failure` accepts count as failures; any other
+        error means the upstream answered, so it counts as a success. A block
+        abandoned midway (a generator closed by its consumer) records nothing,
+        and the half-open probe is released whatever happens.
+        """
+        try:
+            yield
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        else:
+            self.record_success()
+        finally:
+            self.release_probe()
+
+    def call(self, func, fallback, cache_key=None):
+        """
+        Run `func()` through the breaker.
+
+        Args:
+            func (callable): upstream call; raise UpstreamError on failure. Other errors
+                             fall back too, but only transport errors count as failures
+            fallback (callable): produces the degraded result when the call is skipped or fails
+            cache_key (hashable): if given, the last successful non-None result for this key
+                                  is preferred over `fallback()` while the upstream is down
+
+        Returns:
+            The upstream result, the cached last-good result, or `fallback()`.
+        """
+        if not self.allow_request():
+            return self._fallback(fallback, cache_key)
+
+        with self._lock:
+            self._stats["calls"] += 1
+        try:
+            with self.attempt():
+                result = func()
+        except Exception as e:
+            if is_upstream_failure(e):
+                print(f"❌ Upstream '{self.name}' failed: {e}")
+            else:
+                # The upstream answered; its response just wasn't usable
+                print(f"⚠️ Unusable response from '{self.name}': {e!r}")
+            return self._fallback(fallback, cache_key)
+
+        # None means "nothing here" (a 404, a missing key); keep serving the last real result instead
+        if cache_key is not None and result is not None:
+            with self._lock:
+                self._last_good[cache_key] = result
+                self._last_good.move_to_end(cache_key)
+                while len(self._last_good) > self.cache_size:
+                    self._last_good.popitem(last=False)
+        return result
+
+    def _fallback(self, fallback, cache_key):
+        if cache_key is not None:
+            with self._lock:
+                if cache_key in self._last_good:
+                    self._stats["cachedFallbacks"] += 1
+                    return self._last_good[cache_key]
+        return fallback()
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "state": self._current_state(),
+                    "consecutiveFailures": self._failures, **self._stats}
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """Return the process-wide breaker for an upstream endpoint, creating it on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def breaker_stats():
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
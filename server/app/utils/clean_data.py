@@ -1,10 +1,87 @@
 from .openai import get_car_rating
 from .insurance_prediction import estimate_annual_insurance
+from .rating_engine import estimate_ratings
+from .market_index import apply_market_deal_rating, market_index
 import os
 from flask import jsonify
-import requests
+from .accounting import record
+from .cache import cache_for
+from .circuit_breaker import UpstreamError, get_breaker
+from .hedging import get_hedger
+from .listing_fields import simplify_listing
+from .listing_store import listing_store
+from .similar import similar_index
+
+AUTO_DEV_BASE_URL = os.getenv("AUTO_DEV_BASE_URL", "https://api.auto.dev").rstrip("/")
+RATING_MODES = ("auto", "llm", "local")
+
+# Seconds to wait for an LLM rating in "auto" mode before using local ratings
+RATING_LLM_TIMEOUT = float(os.getenv("RATING_LLM_TIMEOUT", "6"))
+
+
+def fetch_listing_photos(vin, retail):
+    """Fetch the retail photo gallery for a VIN, falling back to the listing's primary image."""
+    token = os.getenv("AUTO_DEV_KEY")
+    if not token:
+        print(f"⚠️ Missing AUTO_DEV_KEY, using default image for {vin}")
+        return retail.get("primaryImage")
+
+    photo_cache = cache_for("photos")
+    images = photo_cache.get(vin)
+    if images is not None:
+        return images
+
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    url = f'{AUTO_DEV_BASE_URL}/photos/{vin}'
+
+    def _fetch():
+        import requests
+        record("autodevPhotos")
+        resp = requests.get(url, headers=headers, timeout=2)
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise UpstreamError(f"Auto.dev returned {resp.status_code} for {vin} images")
+        if resp.status_code != 200:
+            print(f"❌ Auto.dev error {resp.status_code} for {vin} images")
+            return None
+        photo_data = resp.json().get("data", [])
+        retail_photos = photo_data.get("retail", {})
+        photo_cache.set(vin, retail_photos)
+        return retail_photos
+
+    hedger = get_hedger("autodev_photos")
+    images = get_breaker("autodev_photos").call(lambda: hedger.call(_fetch), fallback=lambda: None, cache_key=vin)
+    if images is None:
+        images = retail.get("primaryImage")
+    return images
+
+def rate_listing(car_data, rating_mode="auto"):
+    """
+    Rate one simplified listing.
+
+    rating_mode:
+        "llm"   - get_car_rating only; empty ratings if it fails
+        "local" - the table-driven rating engine, no LLM call
+        "auto"  - get_car_rating with a short timeout, local ratings if it is slow or fails
+    """
+    if rating_mode == "local":
+        return estimate_ratings(car_data)
+
+    timeout = RATING_LLM_TIMEOUT if rating_mode == "auto" else None
+    # Get ratings - handle both dict and tuple responses
+    rating_result = get_car_rating(car_data, timeout=timeout)
+    if not isinstance(rating_result, tuple):
+        return rating_result
+
+    # Error case: (response, status_code)
+    vin = car_data.get("vehicle", {}).get("vin")
+    if rating_mode == "auto":
+        print(f"⚠️ LLM rating unavailable for {vin}, using local ratings")
+        return estimate_ratings(car_data)
+    print(f"⚠️ Failed to get rating for {vin}")
+    return {}
 
-def clean_listings(data):
+
+def clean_listings(data, rating_mode="auto", save_index=True):
     simplified_results = {}
     vin_set = set()
     for item in data.get("results", []):
@@ -30,92 +107,16 @@ def clean_listings(data):
                     vin_set.add(vin)
                     print(f"🔹 Processing VIN: {vin}")
 
-                    # Safe extract with debug prints
-                    history = listing.get("history", {})
-                    retail = listing.get("retailListing", {}).copy()
+                    retail = listing.get("retailListing", {})
                     if "vdp" not in retail:
                         print(f"⚠️ Missing VDP for VIN {vin}")
 
-                    retail["listing"] = retail.pop("vdp", None)
-                    vehicle = listing.get("vehicle", {})
-
-                    token = os.getenv("AUTO_DEV_KEY")
-                    if not token:
-                        print(f"⚠️ Missing AUTO_DEV_KEY, using default image for {vin}")
-                        images = retail.get("primaryImage")
-                    else:
-                        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-                        url = f'https://api.auto.dev/photos/{vin}'
-
-                        try:
-                            resp = requests.get(url, headers=headers, timeout=2)
-                            if resp.status_code == 200:
-                                listings_data = resp.json()
-                                photo_data = listings_data.get("data", [])
-                                photo_retail = photo_data.get("retail", {})
-                                if photo_retail is not None:
-                                    images = photo_retail
-                                else:
-                                    images = retail.get("primaryImage")
-                            else:
-                                print(f"❌ Auto.dev error {resp.status_code} for {vin} images")
-                                images = retail.get("primaryImage")
-                        except Exception as e:
-                            print(f"❌ Auto.dev error for {vin} images: {e}")
-                            images = retail.get("primaryImage")
-
-                    simplified_results[vin] = {
-                         **(
-                            {"history": {
-                                "accidentCount": history.get("accidentCount"),
-                                "accidents": history.get("accidents"),
-                                "oneOwner": history.get("oneOwner"),
-                                "ownerCount": history.get("ownerCount"),
-                                "personalUse": history.get("personalUse"),
-                                "usageType": history.get("usageType"),
-                            }} if history else {}
-                        ),
-                        "retailListing": {
-                            "carfaxUrl": retail.get("carfaxUrl"),
-                            "city": retail.get("city"),
-                            "cpo": retail.get("cpo"),
-                            "dealer": retail.get("dealer"),
-                            "miles": retail.get("miles"),
-                            "price": retail.get("price"),
-                            "images": images,
-                            "state": retail.get("state"),
-                            "used": retail.get("used"),
-                            "listing": retail.get("listing"),
-                            "zip": retail.get("zip"),
-                        },
-                        "vehicle": {
-                            "baseMsrp": vehicle.get("baseMsrp"),
-                            "bodyStyle": vehicle.get("bodyStyle"),
-                            "cylinders": vehicle.get("cylinders"),
-                            "doors": vehicle.get("doors"),
-                            "drivetrain": vehicle.get("drivetrain"),
-                            "engine": vehicle.get("engine"),
-                            "exteriorColor": vehicle.get("exteriorColor"),
-                            "fuel": vehicle.get("fuel"),
-                            "interiorColor": vehicle.get("interiorColor"),
-                            "make": vehicle.get("make"),
-                            "model": vehicle.get("model"),
-                            "seats": vehicle.get("seats"),
-                            "transmission": vehicle.get("transmission"),
-                            "trim": vehicle.get("trim"),
-                            "type": vehicle.get("type"),
-                            "vin": vin,
-                            "year": vehicle.get("year"),
-                        }
-                    }
-                    # Get ratings - handle both dict and tuple responses
-                    rating_result = get_car_rating(simplified_results[vin])
-                    if isinstance(rating_result, tuple):
-                        # Error case: (response, status_code)
-                        print(f"⚠️ Failed to get rating for {vin}")
-                        simplified_results[vin]["ratings"] = {}
-                    else:
-                        simplified_results[vin]["ratings"] = rating_result
+                    images = fetch_listing_photos(vin, retail)
+                    simplified_results[vin] = simplify_listing(listing, images)
+                    ratings = rate_listing(simplified_results[vin], rating_mode)
+                    simplified_results[vin]["ratings"] = apply_market_deal_rating(simplified_results[vin], ratings)
+                    # Observed only after rating, so a listing is never one of its own comparables
+                    market_index.observe(simplified_results[vin])
                     
                     # Get insurance prediction
                     try:
@@ -123,6 +124,8 @@ def clean_listings(data):
                     except Exception as e:
                         print(f"⚠️ Failed to get insurance for {vin}: {e}")
                         simplified_results[vin]["insurance"] = {}
+                    listing_store.put(vin, simplified_results[vin])
+                    similar_index.add(vin, simplified_results[vin])
                 except Exception as e:
                     import traceback
                     print(f"❌ Error while processing VIN or listing: {e}")
@@ -131,6 +134,9 @@ def clean_listings(data):
         except Exception as e:
             print(f"❌ Error while processing item in results: {e}")
 
+    if save_index:
+        market_index.save()
+
     return {
         "uniqueVinCount": len(vin_set),
         "results": simplified_results
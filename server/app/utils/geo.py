@@ -0,0 +1,329 @@
+"""
+Zip Proximity
+=============
+Zip-code centroids in a compact, memory-mapped grid index, for searching by
+distance from a user's zip.
+
+build_zip_index.py compiles zip centroids into ZIP_INDEX_PATH
+(app/data/zip_centroids.bin by default). The bundled file is built from the
+GeoNames US postal codes (https://www.geonames.org, CC BY 4.0). File
+layout, little-endian:
+
+    header   b"RVZIP", format version (uint8), record count (uint32),
+             cell count (uint32), grid size in degrees (float32),
+             state count (uint8) + 2-letter state codes, zero-padded to 4 bytes
+    zips     uint32[count]      records sorted by grid cell, then zip
+    lats     float32[count]
+    lons     float32[count]
+    by_zip   uint32[count]      record indexes in zip order
+    cells    uint32[cells]      ids of the non-empty grid cells, ascending
+    offsets  uint32[cells + 1]  first record of each cell
+    states   uint8[count]       index into the state table
+
+The file is mapped on first use and read through memoryviews, so loading
+copies nothing. A radius query only visits the grid cells overlapping the
+radius' bounding box. Without the file, zips still resolve to a state by
+USPS prefix, but distances are unavailable and an explicit radius is
+rejected rather than silently ignored.
+"""
+
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right
+
+ZIP_INDEX_PATH = os.getenv(
+    "ZIP_INDEX_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "zip_centroids.bin")
+)
+DEFAULT_RADIUS_MILES = 50.0
+MAX_RADIUS_MILES = 500.0
+RADIUS_MAX_STATES = 4  # states searched upstream for one radius query
+GRID_DEGREES = 0.5
+EARTH_RADIUS_MILES = 3958.8
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<5sBIIfB")
+
+# USPS 3-digit zip prefixes (sectional centers) -> state, as (first, last, state)
+ZIP_PREFIX_STATES = [
+    (5, 5, "NY"), (6, 9, "PR"), (10, 27, "MA"), (28, 29, "RI"), (30, 38, "NH"), (39, 49, "ME"),
+    (50, 54, "VT"), (55, 55, "MA"), (56, 59, "VT"), (60, 69, "CT"), (70, 89, "NJ"), (100, 149, "NY"),
+    (150, 196, "PA"), (197, 199, "DE"), (200, 200, "DC"), (201, 201, "VA"), (202, 205, "DC"),
+    (206, 219, "MD"), (220, 246, "VA"), (247, 268, "WV"), (270, 289, "NC"), (290, 299, "SC"),
+    (300, 319, "GA"), (320, 349, "FL"), (350, 369, "AL"), (370, 385, "TN"), (386, 397, "MS"),
+    (398, 399, "GA"), (400, 427, "KY"), (430, 459, "OH"), (460, 479, "IN"), (480, 499, "MI"),
+    (500, 528, "IA"), (530, 549, "WI"), (550, 567, "MN"), (570, 577, "SD"), (580, 588, "ND"),
+    (590, 599, "MT"), (600, 629, "IL"), (630, 658, "MO"), (660, 679, "KS"), (680, 693, "NE"),
+    (700, 714, "LA"), (716, 729, "AR"), (730, 732, "OK"), (733, 733, "TX"), (734, 749, "OK"),
+    (750, 799, "TX"), (800, 816, "CO"), (820, 831, "WY"), (832, 838, "ID"), (840, 847, "UT"),
+    (850, 865, "AZ"), (870, 884, "NM"), (885, 885, "TX"), (889, 898, "NV"), (900, 961, "CA"),
+    (967, 968, "HI"), (969, 969, "GU"), (970, 979, "OR"), (980, 994, "WA"), (995, 999, "AK"),
+]
+_PREFIX_STARTS = [first for first, _, _ in ZIP_PREFIX_STATES]
+
+
+def normalize_zip(zip_code):
+    """The 5-digit zip as a string, or None if it isn't one (ZIP+4 is accepted)."""
+    digits = str(zip_code or "").strip().split("-")[0]
+    return digits if len(digits) == 5 and digits.isdigit() else None
+
+
+def zip_to_state(zip_code):
+    """State for a zip by USPS prefix, or None."""
+    zip_code = normalize_zip(zip_code)
+    if zip_code is None:
+        return None
+    prefix = int(zip_code[:3])
+    i = bisect_right(_PREFIX_STARTS, prefix) - 1
+    if i >= 0 and ZIP_PREFIX_STATES[i][0] <= prefix <= ZIP_PREFIX_STATES[i][1]:
+        return ZIP_PREFIX_STATES[i][2]
+    return None
+
+
+def distance_miles(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _grid_columns(grid):
+    return int(math.ceil(360 / grid))
+
+
+def _cell(lat, lon, grid):
+    return int((lat + 90) // grid) * _grid_columns(grid) + int((lon + 180) // grid)
+
+
+def write_zip_index(path, records, grid=GRID_DEGREES):
+    """
+    Write (zip, lat, lon, state) records to a zip index file atomically.
+
+    Returns:
+        int: number of records written
+    """
+    rows = {}
+    for zip_code, lat, lon, state in records:
+        zip_code = normalize_zip(zip_code)
+        if zip_code is not None and state:
+            rows[int(zip_code)] = (float(lat), float(lon), state)
+    state_table = sorted({state for _, _, state in rows.values()})
+    state_ids = {state: i for i, state in enumerate(state_table)}
+    ordered = sorted(rows.items(), key=lambda item: (_cell(item[1][0], item[1][1], grid), item[0]))
+
+    cells, offsets = [], []
+    for i, (_, (lat, lon, _)) in enumerate(ordered):
+        cell = _cell(lat, lon, grid)
+        if not cells or cells[-1] != cell:
+            cells.append(cell)
+            offsets.append(i)
+    offsets.append(len(ordered))
+    by_zip = sorted(range(len(ordered)), key=lambda i: ordered[i][0])
+
+    header = _HEADER.pack(b"RVZIP", FORMAT_VERSION, len(ordered), len(cells), grid, len(state_table))
+    header += "".join(state_table).encode("ascii")
+    header += b"\0" * (-len(header) % 4)
+    count = len(ordered)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(header)
+        f.write(struct.pack(f"<{count}I", *(zip_code for zip_code, _ in ordered)))
+        f.write(struct.pack(f"<{count}f", *(lat for _, (lat, _, _) in ordered)))
+        f.write(struct.pack(f"<{count}f", *(lon for _, (_, lon, _) in ordered)))
+        f.write(struct.pack(f"<{count}I", *by_zip))
+        f.write(struct.pack(f"<{len(cells)}I", *cells))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(bytes(state_ids[state] for _, (_, _, state) in ordered))
+    os.replace(tmp_path, path)
+    return count
+
+
+class _ZipsByNumber:
+    """Zip codes in zip order, as a sequence bisect can search."""
+
+    def __init__(self, zips, by_zip):
+        self.zips = zips
+        self.by_zip = by_zip
+
+    def __len__(self):
+        return len(self.by_zip)
+
+    def __getitem__(self, i):
+        return self.zips[self.by_zip[i]]
+
+
+class ZipIndex:
+    def __init__(self, path=ZIP_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._map = None
+        self.count = 0
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                self._load()
+            except Exception as e:
+                print(f"⚠️ Failed to load zip index from {self.path}: {e}")
+                self._map = None
+            self._loaded = True
+
+    def _load(self):
+        # Caller must hold the lock
+        if not self.path or not os.path.exists(self.path):
+            print(f"⚠️ No zip index at {self.path}; zip searches fall back to prefix states")
+            return
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, cells, grid, state_count = _HEADER.unpack_from(data, 0)
+        if magic != b"RVZIP" or version != FORMAT_VERSION:
+            data.close()
+            print(f"⚠️ Ignoring zip index {self.path}: unsupported format")
+            return
+        offset = _HEADER.size
+        self._states = [data[offset + 2 * i:offset + 2 * i + 2].decode("ascii") for i in range(state_count)]
+        offset += 2 * state_count
+        offset += -offset % 4
+
+        view = memoryview(data)
+
+        def _array(fmt, length):
+            nonlocal offset
+            size = 4 if fmt in "If" else 1
+            array = view[offset:offset + size * length].cast(fmt)
+            offset += size * length
+            return array
+
+        self._zips = _array("I", count)
+        self._lats = _array("f", count)
+        self._lons = _array("f", count)
+        self._by_zip = _array("I", count)
+        self._cells = _array("I", cells)
+        self._offsets = _array("I", cells + 1)
+        self._state_ids = _array("B", count)
+        self._zip_order = _ZipsByNumber(self._zips, self._by_zip)
+        self._grid = grid
+        self._map = data
+        self.count = count
+        print(f"✅ Loaded zip index: {count} zips")
+
+    @property
+    def available(self):
+        self._ensure_loaded()
+        return self._map is not None
+
+    def locate(self, zip_code):
+        """(lat, lon, state) for a zip, or None."""
+        zip_code = normalize_zip(zip_code)
+        if zip_code is None or not self.available:
+            return None
+        number = int(zip_code)
+        i = bisect_left(self._zip_order, number)
+        if i == len(self._zip_order) or self._zip_order[i] != number:
+            return None
+        record = self._by_zip[i]
+        return self._lats[record], self._lons[record], self._states[self._state_ids[record]]
+
+    def within(self, lat, lon, radius):
+        """
+        Zips within `radius` miles of a point, nearest first.
+
+        Returns:
+            list: (distance in miles, zip, state) tuples
+        """
+        if not self.available:
+            return []
+        grid = self._grid
+        columns = _grid_columns(grid)
+        dlat = radius / 69.0
+        dlon = min(180.0, radius / (69.0 * max(0.01, math.cos(math.radians(lat)))))
+        first_row = int((max(-90.0, lat - dlat) + 90) // grid)
+        last_row = int((min(89.999, lat + dlat) + 90) // grid)
+        first_col = int((max(-180.0, lon - dlon) + 180) // grid)
+        last_col = int((min(179.999, lon + dlon) + 180) // grid)
+
+        found = []
+        for row in range(first_row, last_row + 1):
+            base = row * columns
+            i = bisect_left(self._cells, base + first_col)
+            while i < len(self._cells) and self._cells[i] <= base + last_col:
+                for record in range(self._offsets[i], self._offsets[i + 1]):
+                    distance = distance_miles(lat, lon, self._lats[record], self._lons[record])
+                    if distance <= radius:
+                        found.append((distance, f"{self._zips[record]:05d}", self._states[self._state_ids[record]]))
+                i += 1
+        found.sort()
+        return found
+
+
+zip_index = ZipIndex()
+
+
+def resolve_zip_search(zip_code, radius=None):
+    """
+    Resolve a user's zip and radius for /listings/.
+
+    Returns:
+        dict: {"zip", "radius", "origin": (lat, lon) or None, "states": nearest first}
+
+    Raises:
+        ValueError: for a malformed zip or radius, or a radius without the zip index
+    """
+    normalized = normalize_zip(zip_code)
+    if normalized is None:
+        raise ValueError("zip must be a 5-digit US zip code")
+    if radius is not None and not zip_index.available:
+        raise ValueError("radius searches are unavailable: no zip index is installed")
+    radius = DEFAULT_RADIUS_MILES if radius is None else radius
+    if not 0 < radius <= MAX_RADIUS_MILES:
+        raise ValueError(f"radius must be between 0 and {MAX_RADIUS_MILES:g} miles")
+
+    located = zip_index.locate(normalized)
+    if located is None:
+        state = zip_to_state(normalized)
+        if state is None:
+            raise ValueError(f"Unknown zip code {normalized}")
+        return {"zip": normalized, "radius": radius, "origin": None, "states": [state]}
+
+    lat, lon, state = located
+    states = [state]
+    for _, _, nearby in zip_index.within(lat, lon, radius):
+        if nearby not in states:
+            states.append(nearby)
+            if len(states) == RADIUS_MAX_STATES:
+                break
+    return {"zip": normalized, "radius": radius, "origin": (lat, lon), "states": states}
+
+
+def rank_by_distance(listings, origin, radius):
+    """
+    Distances from `origin` for listings whose zip is known, dropping those beyond `radius`.
+
+    Returns:
+        tuple: (ranking, distances) - VINs nearest first (unknown zips last) and {vin: miles}
+    """
+    distances = {}
+    unknown = []
+    for vin, listing in listings.items():
+        located = zip_index.locate((listing.get("retailListing") or {}).get("zip"))
+        if located is None:
+            unknown.append(vin)
+            continue
+        distance = distance_miles(origin[0], origin[1], located[0], located[1])
+        if distance <= radius:
+            distances[vin] = round(distance, 1)
+    ranking = sorted(distances, key=distances.get) + unknown
+    return ranking, distances
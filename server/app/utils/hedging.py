@@ -0,0 +1,175 @@
+"""
+Hedged Requests
+===============
+Cuts tail latency on idempotent upstream calls (Auto.dev searches and photo
+fetches). If a call hasn't finished after the HEDGE_PERCENTILE latency of
+recent successful calls, a duplicate is sent and whichever succeeds first
+wins; the other is left to finish in the background.
+
+Hedges are rationed with a token bucket: every call earns HEDGE_MAX_RATIO of
+a token and every hedge spends one, so over time at most that fraction of
+calls are duplicated, even while the upstream is slow across the board.
+Until HEDGE_MIN_SAMPLES latencies have been seen, calls run unhedged on the
+caller's thread.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .accounting import propagate
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") != "0"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY_MS", "20")) / 1000
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "256"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "32"))
+HEDGE_BURST = 10  # most tokens the bucket holds, i.e. back-to-back hedges allowed
+
+
+class Hedger:
+    def __init__(self, name, percentile=HEDGE_PERCENTILE, max_ratio=HEDGE_MAX_RATIO, min_delay=HEDGE_MIN_DELAY,
+                 min_samples=HEDGE_MIN_SAMPLES, window=HEDGE_WINDOW, workers=HEDGE_WORKERS, enabled=HEDGE_ENABLED,
+                 burst=HEDGE_BURST):
+        self.name = name
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.workers = workers
+        self.enabled = enabled
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)  # seconds, successful attempts only
+        self._tokens = float(burst)
+        self._pool = None
+        self._stats = {"calls": 0, "hedged": 0, "hedgeWins": 0, "budgetDenied": 0, "failedAttempts": 0}
+
+    def _executor(self):
+        # Caller must hold the lock
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"hedge-{self.name}")
+        return self._pool
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while there isn't enough latency history."""
+        with self._lock:
+            return self._delay()
+
+    def _delay(self):
+        # Caller must hold the lock
+        if not self.enabled or len(self._latencies) < max(self.min_samples, 1):
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def _take_token(self):
+        # Caller must hold the lock
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self._stats["budgetDenied"] += 1
+        return False
+
+    def _attempt(self, func):
+        start = time.monotonic()
+        try:
+            result = func()
+        except Exception:
+            with self._lock:
+                self._stats["failedAttempts"] += 1
+            raise
+        self.record(time.monotonic() - start)
+        return result
+
+    def call(self, func):
+        """
+        Run `func()`, hedging it with a second call if it is slow.
+
+        `func` must be safe to run twice. It should raise on failure (as the
+        circuit breaker expects), so a failed attempt never beats a slow one.
+
+        Returns:
+            The first successful result; re-raises the first error if every attempt failed.
+        """
+        func = propagate(func)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._tokens = min(self.burst, self._tokens + self.max_ratio)
+            delay = self._delay()
+            if delay is not None:
+                primary = self._executor().submit(self._attempt, func)
+        if delay is None:
+            return self._attempt(func)
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            if not self._take_token():
+                hedge = None
+            else:
+                self._stats["hedged"] += 1
+                hedge = self._executor().submit(self._attempt, func)
+        if hedge is None:
+            return primary.result()
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self._stats["hedgeWins"] += 1
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            delay = self._delay()
+            calls = self._stats["calls"]
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                **self._stats,
+                "hedgeRatio": round(self._stats["hedged"] / calls, 3) if calls else None,
+                "maxRatio": self.max_ratio,
+                "delayMs": round(delay * 1000, 1) if delay is not None else None,
+                "samples": len(ordered),
+                "p50Ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                "p99Ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000, 1) if ordered else None,
+            }
+
+
+_hedgers = {}
+_registry_lock = threading.Lock()
+
+
+def get_hedger(name, **kwargs):
+    """Return the process-wide hedger for an upstream endpoint, creating it on first use."""
+    with _registry_lock:
+        hedger = _hedgers.get(name)
+        if hedger is None:
+            hedger = _hedgers[name] = Hedger(name, **kwargs)
+        return hedger
+
+
+def hedger_stats():
+    with _registry_lock:
+        hedgers = list(_hedgers.values())
+    return {h.name: h.stats() for h in hedgers}
@@ -0,0 +1,186 @@
+"""
+HTTP Response Cache
+===================
+Compression, strong ETags and 304s for GET JSON responses.
+
+Every GET JSON response gets an ETag hashed from its body, and a matching
+If-None-Match turns it into a 304. Bodies over COMPRESS_MIN_BYTES are sent
+brotli- or gzip-encoded according to Accept-Encoding; each representation has
+its own strong ETag. Compressed bodies are cached per canonical query (path
+plus sorted query args), so a repeat query whose body hashes the same reuses
+the compressed bytes instead of compressing again.
+
+Within HTTP_CACHE_REVALIDATE_SECONDS of a response, a request for the same
+query carrying its ETag is answered 304 before the view runs at all. That
+shortcut is limited to REVALIDATE_ENDPOINTS, whose body is settled by the
+query; polled resources (jobs, metrics, listing details) always run their
+view and only get a 304 if the new body hashes the same.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+HTTP_CACHE_REVALIDATE_SECONDS = float(os.getenv("HTTP_CACHE_REVALIDATE_SECONDS", "60"))
+# Endpoints that may be answered 304 without running the view
+REVALIDATE_ENDPOINTS = frozenset({"listings.get_listings_by_filter"})
+
+
+def _compressors():
+    compressors = {}
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+
+def canonical_query():
+    """Path plus query args in sorted order, so ?a=1&b=2 and ?b=2&a=1 share an entry."""
+    args = sorted((k, v) for k in request.args for v in request.args.getlist(k))
+    return request.path + "?" + "&".join(f"{k}={v}" for k, v in args)
+
+
+def representation_etag(digest, encoding):
+    return f"{digest}-{encoding}" if encoding else digest
+
+
+class CompressedBodyCache:
+    """
+    LRU of {canonical query: {"digest", "size", "bodies": {encoding: bytes}, "stored"}},
+    bounded by total compressed bytes.
+    """
+
+    def __init__(self, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _entry(self, key, digest, size):
+        # Caller must hold the lock
+        entry = self._entries.get(key)
+        if entry is None or entry["digest"] != digest:
+            if entry is not None:
+                self._size -= sum(len(b) for b in entry["bodies"].values())
+            entry = {"digest": digest, "size": size, "bodies": {}}
+            self._entries[key] = entry
+        entry["stored"] = time.time()
+        self._entries.move_to_end(key)
+        return entry
+
+    def remember(self, key, digest, size):
+        """Record the latest body digest for a query."""
+        with self._lock:
+            self._entry(key, digest, size)
+
+    def compressed(self, key, digest, encoding, body):
+        """Compressed body for (query, digest, encoding), compressing only on a miss."""
+        with self._lock:
+            cached = self._entry(key, digest, len(body))["bodies"].get(encoding)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+        data = COMPRESSORS[encoding](body)
+        with self._lock:
+            entry = self._entry(key, digest, len(body))
+            if encoding not in entry["bodies"]:
+                entry["bodies"][encoding] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._size -= sum(len(b) for b in old["bodies"].values())
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits,
+                    "misses": self.misses, "notModified": self.not_modified}
+
+
+body_cache = CompressedBodyCache()
+
+
+def _negotiate(size):
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(list(COMPRESSORS))
+
+
+def _not_modified(response, etag):
+    body_cache.not_modified += 1
+    response.status_code = 304
+    response.set_data(b"")
+    response.headers.pop("Content-Encoding", None)
+    response.set_etag(etag)
+    return response
+
+
+def init_http_cache(app, revalidate_endpoints=REVALIDATE_ENDPOINTS):
+    @app.before_request
+    def _revalidate():
+        if (request.method != "GET" or not request.if_none_match or HTTP_CACHE_REVALIDATE_SECONDS <= 0
+                or request.endpoint not in revalidate_endpoints):
+            return None
+        entry = body_cache.get(canonical_query())
+        if entry is None or time.time() - entry["stored"] > HTTP_CACHE_REVALIDATE_SECONDS:
+            return None
+        etag = representation_etag(entry["digest"], _negotiate(entry["size"]))
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.headers["Vary"] = "Accept-Encoding"
+            return _not_modified(response, etag)
+        return None
+
+    @app.after_request
+    def _compress_and_tag(response):
+        if (request.method != "GET" or response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed or not response.is_json or "Content-Encoding" in response.headers):
+            return response
+
+        body = response.get_data()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        key = canonical_query()
+        encoding = _negotiate(len(body))
+        etag = representation_etag(digest, encoding)
+        response.vary.add("Accept-Encoding")
+        response.headers.setdefault("Cache-Control", "private, no-cache")
+
+        if request.if_none_match.contains(etag):
+            body_cache.remember(key, digest, len(body))
+            return _not_modified(response, etag)
+
+        if encoding:
+            response.set_data(body_cache.compressed(key, digest, encoding, body))
+            response.headers["Content-Encoding"] = encoding
+        else:
+            body_cache.remember(key, digest, len(body))
+        response.set_etag(etag)
+        return response
@@ -4,6 +4,8 @@ Insurance Prediction Module
 Heuristic-based insurance cost estimation using vehicle attributes and location data.
 """
 
+from .rating_engine import CURRENT_YEAR
+
 # State-based risk multipliers (based on average insurance costs)
 STATE_MULTIPLIERS = {
     "NJ": 1.35,  # New Jersey - high rates
@@ -67,6 +69,12 @@ CYLINDER_MULTIPLIERS = {
 }
 
 
+def _field(section, key, default):
+    """section[key], or `default` when it is missing or None (simplified listings keep missing fields as None)."""
+    value = section.get(key) if section else None
+    return default if value is None else value
+
+
 def estimate_annual_insurance(car_data):
     """
     Estimate annual insurance cost using heuristic model.
@@ -86,15 +94,15 @@ def estimate_annual_insurance(car_data):
     base_cost = price * 0.06  # Start with ~6% of vehicle value
 
     # === LOCATION MULTIPLIER ===
-    state = retail.get("state", "NJ")
+    state = _field(retail, "state", "NJ")
     location_mult = STATE_MULTIPLIERS.get(state, 1.15)  # Default to moderate-high
 
     # === MAKE MULTIPLIER ===
-    make = vehicle.get("make", "")
+    make = _field(vehicle, "make", "")
     make_mult = MAKE_MULTIPLIERS.get(make, 1.00)
 
     # === BODY STYLE MULTIPLIER ===
-    body_style = vehicle.get("bodyStyle", "Sedan")
+    body_style = _field(vehicle, "bodyStyle", "Sedan")
     body_mult = BODY_STYLE_MULTIPLIERS.get(body_style, 1.00)
 
     # === ENGINE POWER MULTIPLIER ===
@@ -102,9 +110,8 @@ def estimate_annual_insurance(car_data):
     cylinder_mult = CYLINDER_MULTIPLIERS.get(cylinders, 1.00) if cylinders else 1.00
 
     # === AGE FACTOR ===
-    year = vehicle.get("year", 2020)
-    current_year = 2025
-    age = max(0, current_year - year)
+    year = _field(vehicle, "year", 2020)
+    age = max(0, CURRENT_YEAR - year)
 
     # More granular age brackets for diversity
     if age <= 2:
@@ -119,7 +126,7 @@ def estimate_annual_insurance(car_data):
         age_mult = 0.75  # Very old, much lower value
 
     # === MILEAGE FACTOR ===
-    miles = retail.get("miles", 50000)
+    miles = _field(retail, "miles", 50000)
     # More granular mileage brackets for diversity
     if miles < 20000:
         mileage_mult = 1.10  # Very low mileage = higher value
@@ -133,7 +140,7 @@ def estimate_annual_insurance(car_data):
         mileage_mult = 0.75  # Very high mileage
 
     # === ACCIDENT HISTORY ===
-    accident_count = history.get("accidentCount", 0) if history else 0
+    accident_count = _field(history, "accidentCount", 0)
     # Clean history gives discount, accidents increase cost
     if accident_count == 0:
         accident_mult = 0.90  # Clean history discount
@@ -141,16 +148,16 @@ def estimate_annual_insurance(car_data):
         accident_mult = 1.0 + (accident_count * 0.20)  # +20% per accident
 
     # === OWNERSHIP HISTORY ===
-    owner_count = history.get("ownerCount", 1) if history else 1
+    owner_count = _field(history, "ownerCount", 1)
     # Multiple owners can indicate higher risk or poor maintenance
     owner_mult = 1.0 + (max(0, owner_count - 1) * 0.05)  # +5% per additional owner
 
     # === USAGE TYPE ===
-    usage_type = history.get("usageType", "Personal") if history else "Personal"
+    usage_type = _field(history, "usageType", "Personal")
     usage_mult = 1.30 if usage_type in ["Commercial", "Rental", "Lease"] else 1.00
 
     # === FUEL TYPE (EVs have different risk profiles) ===
-    fuel = vehicle.get("fuel", "Gasoline")
+    fuel = _field(vehicle, "fuel", "Gasoline")
     fuel_mult = 1.15 if fuel in ["Electric", "Hybrid"] else 1.00  # Higher repair costs
 
     # === CALCULATE FINAL ESTIMATE ===
@@ -0,0 +1,170 @@
+"""
+Search Jobs
+===========
+Runs a /listings/ search in a background worker pool so the HTTP request
+that starts it returns immediately with a job id. Pollers get the listings
+enriched so far and per-stage progress while the job runs.
+
+Jobs live in a bounded in-memory store. Submitting the same search again
+while its job is running, or within JOB_REUSE_SECONDS of it finishing,
+returns the existing job instead of starting another one.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .search import finish_recommendations, resolve_recommendations, search_many
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_STORE_SIZE = int(os.getenv("JOB_STORE_SIZE", "200"))
+JOB_REUSE_SECONDS = float(os.getenv("JOB_REUSE_SECONDS", "600"))
+
+
+class SearchJob:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.key = json.dumps(params, sort_keys=True)
+        self.status = "queued"  # queued, running, done, failed
+        self.stage = "queued"  # queued, recommending, searching, done
+        self.error = None
+        self.search_errors = []  # {"recommendation", "error"} for searches that failed
+        self.results = {}
+        self.progress = {"recommendations": 0, "searchesDone": 0, "listingsFound": 0, "listingsEnriched": 0}
+        self.created = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def recommended(self, rec):
+        with self._lock:
+            self.stage = "searching"
+            self.progress["recommendations"] += 1
+
+    def searched(self, item):
+        with self._lock:
+            self.progress["searchesDone"] += 1
+            self.progress["listingsFound"] += len(item.get("listings") or [])
+            if item.get("error"):
+                self.search_errors.append({"recommendation": item["recommendation"], "error": item["error"]})
+
+    def enriched(self, results):
+        with self._lock:
+            self.results.update(results)
+            self.progress["listingsEnriched"] += len(results)
+
+    def finish(self, error=None):
+        with self._lock:
+            self.status = "failed" if error else "done"
+            self.stage = "done"
+            self.error = error
+            self.finished = time.time()
+
+    def snapshot(self):
+        """Job state and a copy of the results so far, read under the lock."""
+        with self._lock:
+            return {
+                "jobId": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "searchErrors": list(self.search_errors),
+                "results": dict(self.results),
+                "createdAt": self.created,
+                "finishedAt": self.finished,
+            }
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+
+def _run_job(app, job, headers):
+    with app.app_context():
+        job.status = "running"
+        job.stage = "recommending"
+        try:
+            recommendations, rec_state, local = resolve_recommendations(job.params)
+
+            def _tracked():
+                for rec in recommendations:
+                    job.recommended(rec)
+                    yield rec
+
+            # A zip search covers every state within its radius; pollers apply the radius itself
+            search_many(_tracked(), job.params.get("states") or [job.params["state"]], job.params.get("budget"),
+                        headers, rating_mode=job.params.get("rating_mode", "auto"),
+                        on_searched=job.searched, on_enriched=job.enriched)
+            error = finish_recommendations(job.params, rec_state, local)
+            if error is not None:
+                job.finish(f"AI recommendation error: {error}")
+            else:
+                job.finish()
+            print(f"✅ Job {job.id} finished: {job.progress['listingsEnriched']} listings")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ Job {job.id} failed: {e}")
+            job.finish(f"Internal server error: {e}")
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS, max_jobs=JOB_STORE_SIZE):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        # Caller must hold the lock
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search-job")
+        return self._pool
+
+    def submit(self, app, params, headers):
+        """Start a job for `params`, or return the matching recent one. Returns (job, created)."""
+        key = json.dumps(params, sort_keys=True)
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.key != key:
+                    continue
+                if job.active or (job.status == "done" and time.time() - job.finished < JOB_REUSE_SECONDS):
+                    self._jobs.move_to_end(job.id)
+                    return job, False
+                break
+
+            job = SearchJob(params)
+            self._jobs[job.id] = job
+            self._evict()
+            self._executor().submit(_run_job, app, job, headers)
+        print(f"🧾 Queued job {job.id}")
+        return job, True
+
+    def _evict(self):
+        # Caller must hold the lock; drop the oldest finished jobs first
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if not j.active][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"jobs": len(jobs), "byStatus": counts, "workers": self.workers}
+
+
+job_manager = JobManager()
@@ -0,0 +1,55 @@
+"""
+JSON Provider
+=============
+Flask JSON provider backed by orjson, so jsonify of large listing responses
+serializes straight to bytes. Falls back to Flask's stdlib provider when
+orjson isn't installed or JSON_SERIALIZER=stdlib.
+
+Output matches the default provider: compact, keys sorted, and dates, UUIDs
+and decimals converted the same way. Non-ASCII text is written as UTF-8
+rather than ASCII escapes.
+"""
+
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib provider is used instead
+    orjson = None
+
+JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "auto")
+
+if orjson is not None:
+    # Dates go through the default provider so they keep Flask's HTTP date format
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                      | orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+def fast_json_enabled():
+    return orjson is not None and JSON_SERIALIZER != "stdlib"
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # orjson always writes UTF-8; keep the stdlib fallback the same
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        # Custom json.dumps options (indent, cls, ...) need the stdlib path
+        if kwargs or not fast_json_enabled():
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs or not fast_json_enabled():
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if not fast_json_enabled() or self._app.debug:
+            # Debug mode pretty-prints, which orjson only supports at a fixed indent
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
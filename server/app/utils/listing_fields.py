@@ -0,0 +1,35 @@
+"""
+Listing Fields
+==============
+The raw Auto.dev listing fields kept in a simplified listing, and the mapping
+itself. Kept free of Flask and the API clients so the bulk scorer's worker
+processes can import it cheaply.
+"""
+
+# Raw Auto.dev listing fields kept in the simplified listing, per section
+HISTORY_FIELDS = ("accidentCount", "accidents", "oneOwner", "ownerCount", "personalUse", "usageType")
+RETAIL_FIELDS = ("carfaxUrl", "city", "cpo", "dealer", "miles", "price", "state", "used", "zip")
+VEHICLE_FIELDS = (
+    "baseMsrp", "bodyStyle", "cylinders", "doors", "drivetrain", "engine", "exteriorColor", "fuel",
+    "interiorColor", "make", "model", "seats", "transmission", "trim", "type", "vin", "year",
+)
+
+
+def simplify_listing(listing, images=None):
+    """
+    Map a raw Auto.dev listing to the simplified shape served by /listings/,
+    without ratings or insurance. `images` defaults to the primary image.
+    """
+    history = listing.get("history", {})
+    retail = listing.get("retailListing", {})
+    vehicle = listing.get("vehicle", {})
+    simplified = {}
+    if history:
+        simplified["history"] = {field: history.get(field) for field in HISTORY_FIELDS}
+    simplified["retailListing"] = {
+        **{field: retail.get(field) for field in RETAIL_FIELDS},
+        "images": images if images is not None else retail.get("primaryImage"),
+        "listing": retail.get("vdp"),
+    }
+    simplified["vehicle"] = {field: vehicle.get(field) for field in VEHICLE_FIELDS}
+    return simplified
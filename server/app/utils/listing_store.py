@@ -0,0 +1,40 @@
+"""
+Listing Store
+=============
+Bounded in-memory store of the last enriched listings, keyed by VIN, so the
+detail view can fetch one full record after a list response was projected
+down to a few fields.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+LISTING_STORE_SIZE = int(os.getenv("LISTING_STORE_SIZE", "5000"))
+
+
+class ListingStore:
+    def __init__(self, max_size=LISTING_STORE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, vin, listing):
+        with self._lock:
+            self._items[vin] = listing
+            self._items.move_to_end(vin)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def get(self, vin):
+        with self._lock:
+            listing = self._items.get(vin)
+            if listing is not None:
+                self._items.move_to_end(vin)
+            return listing
+
+    def __len__(self):
+        return len(self._items)
+
+
+listing_store = ListingStore()
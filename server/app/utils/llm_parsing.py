@@ -0,0 +1,310 @@
+"""
+LLM Response Parsing Module
+===========================
+Turns model output into validated Python objects without a second round trip.
+
+- RATING_SCHEMA / RECOMMENDATION_SCHEMA double as OpenAI structured-output
+  schemas and as the local validation schema.
+- JSONStreamExtractor finds complete JSON values in text as it arrives, so
+  markdown fences or chatter around the JSON don't matter.
+- extract_json repairs the usual small mistakes (trailing commas, Python
+  literals, truncated closers) before giving up.
+"""
+
+import ast
+import json
+import math
+import re
+
+RATING_KEYS = [
+    "dealRating",
+    "fuelEconomyRating",
+    "maintenanceRating",
+    "safetyRating",
+    "ownerSatisfactionRating",
+    "overallRating",
+]
+
+RATING_SCHEMA = {
+    "type": "object",
+    "properties": {key: {"type": "number", "minimum": 0, "maximum": 5} for key in RATING_KEYS},
+    "required": RATING_KEYS,
+    "additionalProperties": False,
+}
+
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "make": {"type": "string"},
+                    "model": {"type": "string"},
+                    "year": {"type": "integer"},
+                    "price": {"type": "number"},
+                },
+                "required": ["make", "model", "year", "price"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["recommendations"],
+    "additionalProperties": False,
+}
+
+
+class LLMParseError(ValueError):
+    """Raised when no valid JSON matching the expected schema can be recovered."""
+
+
+class JSONStreamExtractor:
+    """
+    Incrementally scans text for JSON values.
+
+    Feed chunks with `feed()`. Once the first top-level value closes, it is in
+    `document` (as text). Objects inside the first array encountered (the
+    top-level array, or e.g. the "recommendations" list of a structured
+    response) close before the document does, and `feed()` returns their text
+    as they complete, so callers can act on them while the rest is arriving.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._start = None
+        self._element_depth = None  # stack depth of the array whose elements are reported
+        self._element_start = None
+        self.document = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text; return the array elements completed by it."""
+        completed = []
+        if self.document is not None or not chunk:
+            return completed
+        self._text += chunk
+        text = self._text
+
+        stack = self._stack
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._start is None:
+                if ch in "{[":
+                    self._start = i
+                    stack.append(ch)
+                    if ch == "[":
+                        self._element_depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if len(stack) == self._element_depth and ch == "{":
+                    self._element_start = i
+                stack.append(ch)
+                if ch == "[" and self._element_depth is None:
+                    self._element_depth = len(stack)
+            elif ch in "}]":
+                stack.pop()
+                if len(stack) == self._element_depth and self._element_start is not None:
+                    completed.append(text[self._element_start:i + 1])
+                    self._element_start = None
+                elif not stack:
+                    self.document = text[self._start:i + 1]
+                    self._pos = i + 1
+                    return completed
+            i += 1
+        self._pos = i
+        return completed
+
+    def partial(self):
+        """Text of the top-level value seen so far (possibly unterminated)."""
+        if self._start is None:
+            return None
+        return self._text[self._start:]
+
+    def closers(self):
+        """Brackets that would close the value as received so far (best effort)."""
+        partial = self.partial()
+        if partial is None:
+            return ""
+        stack, in_string, escape = [], False, False
+        for ch in partial:
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch in "}]" and stack:
+                stack.pop()
+        return ('"' if in_string else "") + "".join(reversed(stack))
+
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _loads_lenient(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    repaired = _TRAILING_COMMA.sub(r"\1", text)
+    try:
+        return json.loads(repaired)
+    except json.JSONDecodeError:
+        pass
+    # Single-quoted keys/strings and True/False/None show up now and then
+    try:
+        return ast.literal_eval(repaired)
+    except (ValueError, SyntaxError):
+        raise LLMParseError(f"Could not parse JSON from: {text[:200]!r}")
+
+
+def extract_json(text):
+    """
+    Recover the first JSON value from model output.
+
+    Handles bare JSON, ```json fenced blocks, leading/trailing prose, trailing
+    commas, Python-style literals and output truncated mid-value.
+
+    Raises:
+        LLMParseError: if nothing usable is found.
+    """
+    if text is None:
+        raise LLMParseError("Empty model output")
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    extractor = JSONStreamExtractor()
+    extractor.feed(text)
+    if extractor.document is not None:
+        return _loads_lenient(extractor.document)
+    if extractor.partial() is not None:
+        # Truncated output: trim a dangling comma and close what's open
+        partial = extractor.partial().rstrip().rstrip(",")
+        return _loads_lenient(partial + extractor.closers())
+    raise LLMParseError(f"No JSON found in: {text[:200]!r}")
+
+
+def validate(value, schema, path="$"):
+    """
+    Check `value` against the subset of JSON Schema used in this module.
+
+    Returns:
+        list: error strings; empty when the value conforms.
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected == "object":
+        if not isinstance(value, dict):
+            return [f"{path}: expected object"]
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], subschema, f"{path}.{key}"))
+    elif expected == "array":
+        if not isinstance(value, list):
+            return [f"{path}: expected array"]
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema.get("items", {}), f"{path}[{i}]"))
+    elif expected in ("number", "integer"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return [f"{path}: expected {expected}"]
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: below {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: above {schema['maximum']}")
+    elif expected == "string" and not isinstance(value, str):
+        errors.append(f"{path}: expected string")
+    return errors
+
+
+def _to_number(value):
+    """Numeric strings as floats; NaN and infinities (which the lenient parser accepts) as None."""
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            return value
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def parse_ratings(text):
+    """
+    Parse and validate a rating response.
+
+    Numeric strings are coerced, and a missing overallRating is computed as the
+    average of the other categories.
+
+    Raises:
+        LLMParseError: if the ratings can't be recovered.
+    """
+    data = extract_json(text)
+    if not isinstance(data, dict):
+        raise LLMParseError("Ratings response is not an object")
+    ratings = {key: _to_number(data[key]) for key in RATING_KEYS if key in data}
+    if "overallRating" not in ratings:
+        parts = [ratings.get(key) for key in RATING_KEYS[:-1]]
+        if all(isinstance(p, (int, float)) for p in parts):
+            ratings["overallRating"] = round(sum(parts) / len(parts), 2)
+    errors = validate(ratings, RATING_SCHEMA)
+    if errors:
+        raise LLMParseError("; ".join(errors))
+    return ratings
+
+
+def parse_recommendations(text):
+    """
+    Parse and validate a recommendation response into a list of make/model/year dicts.
+
+    Accepts either the structured-output shape ({"recommendations": [...]}) or a
+    bare list. Entries without make/model are dropped rather than failing the
+    whole response.
+
+    Raises:
+        LLMParseError: if no usable recommendation is found.
+    """
+    data = extract_json(text)
+    if isinstance(data, dict):
+        data = data.get("recommendations", [data])
+    if not isinstance(data, list):
+        raise LLMParseError("Recommendations response is not a list")
+    recommendations = [rec for rec in map(coerce_recommendation, data) if rec is not None]
+    if not recommendations:
+        raise LLMParseError("No usable recommendations in response")
+    return recommendations
+
+
+def coerce_recommendation(item):
+    """Normalize one recommendation object; returns None if it lacks make/model."""
+    if not isinstance(item, dict) or not item.get("make") or not item.get("model"):
+        return None
+    rec = {"make": str(item["make"]).strip(), "model": str(item["model"]).strip()}
+    year = _to_number(item.get("year"))
+    rec["year"] = int(year) if isinstance(year, (int, float)) else None
+    price = _to_number(item.get("price"))
+    rec["price"] = price if isinstance(price, (int, float)) else None
+    return rec
@@ -0,0 +1,392 @@
+"""
+Market Index Module
+===================
+Comparable-listing statistics built from every listing that passes through
+clean_listings, used to score dealRating against real comps instead of asking
+the LLM about one listing in isolation.
+
+Listings are grouped by (make, model, year, state), with coarser
+(make, model, year) and (make, model) roll-ups for sparse groups. Price and
+mileage distributions are kept in log-bucketed quantile sketches, so
+percentile lookups cost the same no matter how many listings were seen.
+
+The index is persisted to MARKET_INDEX_PATH at most every
+MARKET_INDEX_SAVE_INTERVAL seconds (and at exit). Several workers can share
+the file: a save merges this process's observations since its last save into
+what is on disk, under a file lock, skipping VINs another process already
+counted, and reloads the merged result.
+
+Each VIN is counted once, but only the newest MAX_TRACKED_VINS VINs are
+remembered. Sketches can't forget a value, so a listing seen again after its
+VIN was evicted is counted again; that is the price of a bounded index.
+"""
+
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # optional, not on Windows; concurrent saves may then lose observations
+    fcntl = None
+
+MARKET_INDEX_PATH = os.getenv(
+    "MARKET_INDEX_PATH", os.path.join(tempfile.gettempdir(), "revvo_market_index.json")
+)
+MIN_COMPARABLES = int(os.getenv("MARKET_MIN_COMPARABLES", "5"))
+MAX_TRACKED_VINS = int(os.getenv("MARKET_INDEX_MAX_VINS", "200000"))
+SAVE_INTERVAL = float(os.getenv("MARKET_INDEX_SAVE_INTERVAL", "60"))  # seconds between saves
+SKETCH_ACCURACY = 0.02  # relative error of reported quantiles
+
+INDEX_VERSION = 1
+WILDCARD = "*"
+
+
+class QuantileSketch:
+    """
+    Mergeable log-bucketed histogram (DDSketch-style).
+
+    Values are counted in buckets whose width grows geometrically, so quantiles
+    are accurate to within SKETCH_ACCURACY relative error and the sketch size
+    depends only on the value range, not on how many values were added.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value):
+        if value <= 0:
+            self.zeros += 1
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+
+    def rank(self, value):
+        """Fraction of observed values below `value` (ties count half)."""
+        if not self.count:
+            return None
+        if value <= 0:
+            return (self.zeros / 2) / self.count
+        key = self._key(value)
+        below = self.zeros + sum(c for k, c in self.bins.items() if k < key)
+        return (below + self.bins.get(key, 0) / 2) / self.count
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        target = q * (self.count - 1)
+        seen = self.zeros
+        if target < seen:
+            return 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if target < seen:
+                # Bucket midpoint in log space
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def merge(self, other):
+        """Add another sketch's values to this one; both must share the same accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError("can't merge sketches of different accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def to_dict(self):
+        return {"bins": self.bins, "zeros": self.zeros, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.bins = {int(k): v for k, v in data.get("bins", {}).items()}
+        sketch.zeros = data.get("zeros", 0)
+        sketch.count = data.get("count", 0)
+        return sketch
+
+
+def _group_keys(make, model, year, state):
+    """Most specific first."""
+    make, model = (make or "").strip().lower(), (model or "").strip().lower()
+    return [
+        f"{make}|{model}|{year or WILDCARD}|{(state or WILDCARD).upper()}",
+        f"{make}|{model}|{year or WILDCARD}|{WILDCARD}",
+        f"{make}|{model}|{WILDCARD}|{WILDCARD}",
+    ]
+
+
+def _add(groups, observation):
+    _, make, model, year, state, price, miles = observation
+    for key in _group_keys(make, model, year, state):
+        group = groups.setdefault(key, {"price": QuantileSketch(), "miles": QuantileSketch()})
+        group["price"].add(price)
+        if isinstance(miles, (int, float)):
+            group["miles"].add(miles)
+
+
+def _trim(vins):
+    while len(vins) > MAX_TRACKED_VINS:
+        vins.popitem(last=False)
+
+
+class MarketIndex:
+    def __init__(self, path=MARKET_INDEX_PATH, save_interval=SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._groups = {}  # group key -> {"price": sketch, "miles": sketch}
+        self._vins = OrderedDict()
+        self._pending = []  # observations since the last save, as (vin, make, model, year, state, price, miles)
+        self._last_save = None
+        self._loaded = False
+        self.seed = None  # optional callable returning saved index data, used when `path` doesn't exist
+
+    def _ensure_loaded(self):
+        # Caller must hold the lock
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load market index from {self.path}: {e}")
+                return
+        elif self.seed is not None:
+            # No index on this instance yet; start from the warm-start snapshot
+            data = self.seed()
+            if data is None:
+                return
+        else:
+            return
+        try:
+            loaded = self._parse(data)
+        except Exception as e:
+            print(f"⚠️ Failed to load market index: {e}")
+            return
+        if loaded is not None:
+            self._groups, self._vins = loaded
+            print(f"✅ Loaded market index: {len(self._groups)} groups, {len(self._vins)} VINs")
+
+    @staticmethod
+    def _parse(data):
+        """(groups, vins) from saved index data, or None for another INDEX_VERSION."""
+        if data.get("version") != INDEX_VERSION:
+            print(f"⚠️ Ignoring market index with version {data.get('version')}")
+            return None
+        groups = {
+            key: {field: QuantileSketch.from_dict(s) for field, s in group.items()}
+            for key, group in data.get("groups", {}).items()
+        }
+        return groups, OrderedDict.fromkeys(data.get("vins", []))
+
+    def observe(self, car_data):
+        """Add a simplified listing to the index. Returns False if the VIN was already counted."""
+        vehicle = car_data.get("vehicle") or {}
+        retail = car_data.get("retailListing") or {}
+        vin = vehicle.get("vin")
+        price = retail.get("price")
+        if not vin or not vehicle.get("make") or not vehicle.get("model") or not isinstance(price, (int, float)):
+            return False
+        miles = retail.get("miles")
+
+        observation = (vin, vehicle.get("make"), vehicle.get("model"), vehicle.get("year"), retail.get("state"),
+                       price, miles)
+        with self._lock:
+            self._ensure_loaded()
+            if vin in self._vins:
+                return False
+            self._vins[vin] = None
+            _trim(self._vins)
+            _add(self._groups, observation)
+            self._pending.append(observation)
+        return True
+
+    def comparables(self, make, model, year=None, state=None, min_count=MIN_COMPARABLES):
+        """Return (group key, group) for the most specific group with enough listings, else (None, None)."""
+        with self._lock:
+            self._ensure_loaded()
+            for key in _group_keys(make, model, year, state):
+                group = self._groups.get(key)
+                if group and group["price"].count >= min_count:
+                    return key, group
+        return None, None
+
+    def deal_rating(self, car_data):
+        """
+        Score a listing's price and mileage against its comparables.
+
+        Returns:
+            dict: {"dealRating", "pricePercentile", "milesPercentile", "comparables", "group"},
+                  or None when there aren't enough comparables.
+        """
+        vehicle = car_data.get("vehicle") or {}
+        retail = car_data.get("retailListing") or {}
+        price = retail.get("price")
+        if not isinstance(price, (int, float)):
+            return None
+        key, group = self.comparables(vehicle.get("make"), vehicle.get("model"),
+                                      vehicle.get("year"), retail.get("state"))
+        if group is None:
+            return None
+
+        with self._lock:
+            price_pct = group["price"].rank(price)
+            miles = retail.get("miles")
+            miles_pct = group["miles"].rank(miles) if isinstance(miles, (int, float)) and group["miles"].count else 0.5
+            count = group["price"].count
+
+        # Cheaper than comps matters most; lower miles than comps is a bonus
+        score = 0.75 * (1 - price_pct) + 0.25 * (1 - miles_pct)
+        return {
+            "dealRating": round(1 + 4 * score, 2),
+            "pricePercentile": round(price_pct * 100, 1),
+            "milesPercentile": round(miles_pct * 100, 1),
+            "comparables": count,
+            "group": key,
+        }
+
+    def stats(self, make, model, year=None, state=None):
+        """Price/mileage quantiles for the best matching comparable group."""
+        key, group = self.comparables(make, model, year, state, min_count=1)
+        if group is None:
+            return None
+        quantiles = (0.1, 0.25, 0.5, 0.75, 0.9)
+        with self._lock:
+            return {
+                "group": key,
+                "count": group["price"].count,
+                "price": {f"p{int(q * 100)}": _round(group["price"].quantile(q)) for q in quantiles},
+                "miles": {f"p{int(q * 100)}": _round(group["miles"].quantile(q)) for q in quantiles},
+            }
+
+    def _export(self):
+        # Caller must hold the lock
+        return self._export_groups(self._groups, self._vins)
+
+    @staticmethod
+    def _export_groups(groups, vins):
+        return {
+            "version": INDEX_VERSION,
+            "groups": {key: {field: s.to_dict() for field, s in group.items()}
+                       for key, group in groups.items()},
+            "vins": list(vins),
+        }
+
+    def export(self):
+        """The index as saved to disk, for snapshots."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._export()
+
+    def save(self, force=False):
+        """
+        Merge the observations since the last save into MARKET_INDEX_PATH, at
+        most once per save_interval unless `force`. Nothing new, no write.
+
+        Returns:
+            bool: whether the file was written
+        """
+        if not self.path:
+            return False
+        with self._save_lock:
+            with self._lock:
+                due = self._last_save is None or time.monotonic() - self._last_save >= self.save_interval
+                if not self._pending or not (force or due):
+                    return False
+                self._ensure_loaded()
+                pending, self._pending = self._pending, []
+                self._last_save = time.monotonic()
+            try:
+                groups, vins = self._merge_into_file(pending)
+            except Exception as e:
+                print(f"⚠️ Failed to save market index to {self.path}: {e}")
+                with self._lock:
+                    self._pending = pending + self._pending
+                return False
+            with self._lock:
+                # Observations made while saving stay pending, and are counted on top of the merged index
+                for observation in self._pending:
+                    if observation[0] not in vins:
+                        vins[observation[0]] = None
+                        _add(groups, observation)
+                _trim(vins)
+                self._groups, self._vins = groups, vins
+            return True
+
+    def _merge_into_file(self, pending):
+        """
+        Add `pending` observations to the index on disk (or write this
+        process's whole index when there is no file yet) and return the result.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            loaded = None
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    loaded = self._parse(json.load(f))
+            if loaded is None:
+                data = self.export()
+                groups, vins = self._parse(data)
+            else:
+                groups, vins = loaded
+                for observation in pending:
+                    # Another worker may have counted the same VIN already
+                    if observation[0] not in vins:
+                        vins[observation[0]] = None
+                        _add(groups, observation)
+                _trim(vins)
+                data = self._export_groups(groups, vins)
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        return groups, vins
+
+
+def _round(value):
+    return round(value) if value is not None else None
+
+
+market_index = MarketIndex()
+# Saves are throttled, so write whatever is still pending on the way out
+atexit.register(market_index.save, force=True)
+
+
+def apply_market_deal_rating(car_data, ratings):
+    """
+    Replace dealRating with the comparable-based score when enough comps exist,
+    recomputing overallRating to match. Returns the (possibly updated) ratings.
+    """
+    if not ratings:
+        return ratings
+    market = market_index.deal_rating(car_data)
+    if market is None:
+        return ratings
+    ratings = dict(ratings)
+    ratings["dealRating"] = market["dealRating"]
+    parts = [ratings.get(k) for k in ("dealRating", "fuelEconomyRating", "maintenanceRating",
+                                      "safetyRating", "ownerSatisfactionRating")]
+    if all(isinstance(p, (int, float)) for p in parts):
+        ratings["overallRating"] = round(sum(parts) / len(parts), 2)
+    return ratings
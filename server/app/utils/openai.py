@@ -1,17 +1,77 @@
 from flask import jsonify
-import requests
-import os, json
-from openai import OpenAI
+import hashlib
+import os
+import sys
+from .accounting import record_completion
+from .cache import cache_for
+from .circuit_breaker import get_breaker, is_upstream_failure
+from .llm_parsing import (
+    JSONStreamExtractor,
+    LLMParseError,
+    RATING_SCHEMA,
+    RECOMMENDATION_SCHEMA,
+    coerce_recommendation,
+    extract_json,
+    parse_ratings,
+    parse_recommendations,
+)
+
+# Ask for schema-constrained output; flipped off for the process if the model rejects it
+_structured_outputs = os.getenv("OPENAI_STRUCTURED_OUTPUTS", "1") != "0"
+
+
+def _is_openai_failure(error):
+    """Connection errors, timeouts, 429s and 5xx count against the breaker; bad requests and bad output don't."""
+    if is_upstream_failure(error):
+        return True
+    openai = sys.modules.get("openai")  # an SDK error means the SDK is already imported
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500 or error.status_code == 429
+    return False
+
+
+def _openai_client(key):
+    # The SDK is imported on first use so cold starts don't pay for it
+    from openai import OpenAI
+    return OpenAI(api_key=key)
 
-def get_car_recommendation(state, budget, primary_use, comfort):
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        return jsonify({"error": "Missing OpenAI API key"}), 500
 
-    client = OpenAI(api_key=key)
+def _complete_json(client, messages, temperature, schema_name, schema, **kwargs):
+    """Run a chat completion constrained to `schema` when structured outputs are available."""
+    global _structured_outputs
+    if _structured_outputs:
+        from openai import BadRequestError
+        try:
+            return client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=temperature,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": schema_name, "schema": schema, "strict": True},
+                },
+                **kwargs,
+            )
+        except BadRequestError as e:
+            if "response_format" not in str(e):
+                raise
+            print(f"⚠️ Structured outputs unavailable, falling back to plain completions: {e}")
+            _structured_outputs = False
+    return client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=temperature,
+        **kwargs,
+    )
+
 
+def _recommendation_prompt(state, budget, primary_use, comfort):
     # Construct a prompt for OpenAI
-    prompt = f"""
+    return f"""
     You are an expert car consultant. Suggest top 3 cars (make, model, and year) that best fit
     the following buyer preferences:
 
@@ -26,54 +86,109 @@ def get_car_recommendation(state, budget, primary_use, comfort):
     3. Year (within budget range)
     4. Estimated price based on current market trends
 
-    Respond in JSON format as a list of objects with keys:
+    Respond in JSON format as an object with a "recommendations" list of objects with keys:
     ["make", "model", "year", "price"].
 
     Do NOT include any additional explanations or reasons.
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful car buying assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-
-        raw = response.choices[0].message.content.strip()
-
-        # Try to parse the response into JSON
-        import json
-        try:
-            recommendations = json.loads(raw)
-        except json.JSONDecodeError:
-            # If parsing fails, wrap raw text
-            recommendations = {"text": raw}
 
-        return jsonify({
-            "recommendations": recommendations
-        })
+class RecommendationError(Exception):
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    
-def get_car_rating(vehicle_data):
+
+def stream_car_recommendations(state, budget, primary_use, comfort):
+    """
+    Stream recommendations from the LLM, yielding each make/model/year dict as
+    soon as its JSON object is complete in the response.
+
+    Raises:
+        RecommendationError: if the call fails or yields no usable recommendation.
+    """
     key = os.getenv("OPENAI_API_KEY")
     if not key:
-        return jsonify({"error": "Missing OpenAI API key"}), 500
+        raise RecommendationError("Missing OpenAI API key")
 
-    client = OpenAI(api_key=key)
+    client = _openai_client(key)
+    prompt = _recommendation_prompt(state, budget, primary_use, comfort)
 
-    # Validate
-    if not vehicle_data:
-        return jsonify({"error": "Missing vehicle data"}), 400
+    breaker = get_breaker("openai")
+    if not breaker.allow_request():
+        raise RecommendationError("OpenAI is temporarily unavailable", 503)
 
-    # Build prompt for OpenAI
-    prompt = f"""
+    try:
+        # A consumer that stops reading closes this generator; attempt() still releases the probe
+        with breaker.attempt(_is_openai_failure):
+            stream = _complete_json(
+                client,
+                [
+                    {"role": "system", "content": "You are a helpful car buying assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                0.7,
+                "car_recommendations",
+                RECOMMENDATION_SCHEMA,
+                stream=True,
+                # The final chunk then carries token usage (and no choices)
+                stream_options={"include_usage": True},
+            )
+            extractor = JSONStreamExtractor()
+            count = 0
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    record_completion(chunk)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                for element in extractor.feed(delta or ""):
+                    try:
+                        rec = coerce_recommendation(extract_json(element))
+                    except LLMParseError:
+                        rec = None
+                    if rec is not None:
+                        count += 1
+                        yield rec
+    except Exception as e:
+        raise RecommendationError(str(e))
+
+    if count == 0:
+        # Fall back to parsing the whole response (e.g. a single bare object)
+        try:
+            for rec in parse_recommendations(extractor.partial() or ""):
+                yield rec
+        except LLMParseError as e:
+            raise RecommendationError(f"Failed to parse AI output: {e}", 502)
+
+# Listing fields that actually inform the ratings, in prompt order.
+# Image galleries, dealer blobs and carfax/listing URLs are deliberately left out.
+RATING_INPUT_FIELDS = [
+    ("year", "vehicle", "year"),
+    ("make", "vehicle", "make"),
+    ("model", "vehicle", "model"),
+    ("trim", "vehicle", "trim"),
+    ("body", "vehicle", "bodyStyle"),
+    ("engine", "vehicle", "engine"),
+    ("cylinders", "vehicle", "cylinders"),
+    ("fuel", "vehicle", "fuel"),
+    ("drivetrain", "vehicle", "drivetrain"),
+    ("transmission", "vehicle", "transmission"),
+    ("msrp", "vehicle", "baseMsrp"),
+    ("price", "retailListing", "price"),
+    ("miles", "retailListing", "miles"),
+    ("state", "retailListing", "state"),
+    ("used", "retailListing", "used"),
+    ("cpo", "retailListing", "cpo"),
+    ("accidents", "history", "accidentCount"),
+    ("owners", "history", "ownerCount"),
+    ("oneOwner", "history", "oneOwner"),
+    ("usage", "history", "usageType"),
+]
+
+RATING_PROMPT = """
     You are an automotive analyst that evaluates used cars based on reliability, cost, and satisfaction.
-    Given the following vehicle JSON, return a JSON object with numeric ratings (out of 5.00, up to 2 decimals)
+    Given the following vehicle, return a JSON object with numeric ratings (out of 5.00, up to 2 decimals)
     for these categories:
 
     1. dealRating — based on mileage, price, year, and location
@@ -100,35 +215,115 @@ def get_car_rating(vehicle_data):
     }}
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a precise car rating assistant that only returns clean JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
 
-        raw = response.choices[0].message.content.strip()
+def project_rating_input(vehicle_data):
+    """
+    Reduce a simplified listing to the rating-relevant fields.
 
-        try:
-            ratings = json.loads(raw)
-        except json.JSONDecodeError:
-            ratings = {"rawText": raw}
-        print(ratings)
-        return ratings
+    Returns:
+        str: one `key=value` pair per field, separated by "; ", in RATING_INPUT_FIELDS
+             order. Missing fields are omitted, so equal listings always give equal text.
+    """
+    parts = []
+    for label, section, field in RATING_INPUT_FIELDS:
+        value = (vehicle_data.get(section) or {}).get(field)
+        if value is None or value == "":
+            continue
+        parts.append(f"{label}={value}")
+    return "; ".join(parts)
+
+
+def build_rating_prompt(vehicle_data, compact=True):
+    """Build the rating prompt; compact=False embeds the whole listing dict as before."""
+    payload = project_rating_input(vehicle_data) if compact else vehicle_data
+    return RATING_PROMPT.format(vehicle_data=payload)
+
+
+def estimate_tokens(text):
+    """Approximate token count (~4 characters per token for English/JSON)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def rating_prompt_report(vehicle_data):
+    """Compare prompt size for the full listing dict against the compact projection."""
+    full = estimate_tokens(build_rating_prompt(vehicle_data, compact=False))
+    compact = estimate_tokens(build_rating_prompt(vehicle_data))
+    return {
+        "fullTokens": full,
+        "compactTokens": compact,
+        "savedTokens": full - compact,
+        "reduction": round(1 - compact / full, 3),
+    }
+
+def get_car_rating(vehicle_data, timeout=None):
+    """
+    Rate a simplified listing with the LLM.
+
+    `timeout` (seconds) bounds the call and disables SDK retries, for callers
+    that have a cheaper fallback.
+    """
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        return jsonify({"error": "Missing OpenAI API key"}), 500
+
+    # Validate
+    if not vehicle_data:
+        return jsonify({"error": "Missing vehicle data"}), 400
+
+    # Listings with the same rating input get the same ratings, whichever worker asked first
+    rating_cache = cache_for("ratings")
+    cache_key = hashlib.blake2b(project_rating_input(vehicle_data).encode(), digest_size=16).hexdigest()
+    cached = rating_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    client = _openai_client(key)
+    if timeout:
+        client = client.with_options(timeout=timeout, max_retries=0)
+
+    # Build prompt for OpenAI
+    prompt = build_rating_prompt(vehicle_data)
+    print(f"🧮 Rating prompt for {vehicle_data.get('vehicle', {}).get('vin')}: ~{estimate_tokens(prompt)} tokens")
+
+    breaker = get_breaker("openai")
+    if not breaker.allow_request():
+        return jsonify({"error": "OpenAI is temporarily unavailable"}), 503
+
+    try:
+        with breaker.attempt(_is_openai_failure):
+            response = _complete_json(
+                client,
+                [
+                    {"role": "system", "content": "You are a precise car rating assistant that only returns clean JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                0.3,
+                "car_ratings",
+                RATING_SCHEMA,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    record_completion(response)
+    if getattr(response, "usage", None):
+        print(f"🧮 Rating usage: {response.usage.prompt_tokens} prompt / {response.usage.completion_tokens} completion tokens")
+
+    try:
+        ratings = parse_ratings(response.choices[0].message.content)
+    except LLMParseError as e:
+        print(f"❌ Unusable rating output: {e}")
+        return jsonify({"error": f"Failed to parse ratings: {e}"}), 502
+    print(ratings)
+    rating_cache.set(cache_key, ratings)
+    return ratings
+
 def chat_about_car(car_data, message_history):
     """Chat with AI about a specific car using conversation history. Don't include any headers or anything that needs to be formatted. Just be conversational."""
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         return {"error": "Missing OpenAI API key"}
 
-    client = OpenAI(api_key=key)
+    client = _openai_client(key)
 
     # Build system prompt with car information
     car_info = f"""
@@ -184,12 +379,18 @@ def chat_about_car(car_data, message_history):
     for msg in message_history:
         messages.append(msg)
 
+    breaker = get_breaker("openai")
+    if not breaker.allow_request():
+        return {"error": "OpenAI is temporarily unavailable"}
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.7
-        )
+        with breaker.attempt(_is_openai_failure):
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7
+            )
+        record_completion(response)
 
         reply = response.choices[0].message.content.strip()
         return {"reply": reply}
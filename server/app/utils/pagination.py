@@ -0,0 +1,322 @@
+"""
+Listing Pagination
+==================
+Cursor-based pages over the listings for a set of recommendations, ranked
+server-side.
+
+Each recommendation is a stream of Auto.dev result pages. A result session
+keeps one sorted buffer per stream and merges the buffers through a heap, so
+taking the next k listings costs O(k log streams).
+
+For price and miles Auto.dev sorts the results itself (UPSTREAM_SORT_FIELDS),
+so a stream's later pages never rank before what it has already returned:
+the next upstream page is fetched only once the merge actually needs another
+listing from it, and the ranking is exact. overallRating and insurance are
+computed here, so every upstream page of a stream is read, up to
+UNSORTED_MAX_PAGES, before anything is ranked; past that cap the ranking only
+covers the pages read, and the page reports "exact": false.
+
+Only the returned page is enriched (photos, ratings, insurance); ranking by
+overallRating or insurance uses the local rating engine and insurance model on
+the raw listing.
+
+Sessions live in this process's memory. Cursors also carry the search itself
+(state, budget, sort, recommendations), so a cursor that reaches another
+worker, or outlives its session, rebuilds the session by re-running the
+upstream searches instead of failing.
+"""
+
+import base64
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .accounting import propagate
+from .clean_data import RATING_MODES
+from .insurance_prediction import estimate_annual_insurance
+from .rating_engine import estimate_ratings
+from .search import SEARCH_WORKERS, search_autodev
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "50"))
+UPSTREAM_PAGE_SIZE = int(os.getenv("UPSTREAM_PAGE_SIZE", "20"))
+MAX_SESSIONS = int(os.getenv("PAGINATION_MAX_SESSIONS", "256"))
+SESSION_TTL = float(os.getenv("PAGINATION_SESSION_TTL", "900"))
+UNSORTED_MAX_PAGES = int(os.getenv("PAGINATION_UNSORTED_MAX_PAGES", "5"))
+CURSOR_MAX_RECOMMENDATIONS = 20
+
+# sort name -> Auto.dev field it can sort by upstream
+UPSTREAM_SORT_FIELDS = {"price": "retailListing.price", "miles": "retailListing.miles"}
+
+
+def _price(listing):
+    return (listing.get("retailListing") or {}).get("price")
+
+
+def _miles(listing):
+    return (listing.get("retailListing") or {}).get("miles")
+
+
+def _overall_rating(listing):
+    return estimate_ratings(listing).get("overallRating")
+
+
+def _insurance_monthly(listing):
+    try:
+        return estimate_annual_insurance(listing).get("monthlyEstimate")
+    except Exception:
+        return None
+
+
+# sort name -> (key function, descending by default)
+SORT_KEYS = {
+    "price": (_price, False),
+    "miles": (_miles, False),
+    "overallRating": (_overall_rating, True),
+    "insurance": (_insurance_monthly, False),
+}
+
+
+def _year(value):
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CursorError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(session_id, offset, spec=None):
+    """A page cursor; `spec` (ResultSession.spec()) lets another process rebuild the session."""
+    data = {"s": session_id, "o": offset}
+    if spec is not None:
+        data["q"] = spec
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _check_spec(spec):
+    if spec is None:
+        return None
+    # The spec comes back from the client, so it is checked like the query it replays
+    recs = spec["recs"]
+    budget = spec["budget"]
+    if (spec["sort"] not in SORT_KEYS or not isinstance(spec["desc"], bool)
+            or not isinstance(spec["state"], str) or not 1 <= int(spec["size"]) <= PAGE_SIZE_MAX
+            or spec.get("ratings", "auto") not in RATING_MODES
+            or not (budget is None or isinstance(budget, (str, int, float)) and not isinstance(budget, bool))
+            or not isinstance(recs, list) or len(recs) > CURSOR_MAX_RECOMMENDATIONS
+            or not all(isinstance(rec, list) and len(rec) == 3 and isinstance(rec[0], str)
+                       and isinstance(rec[1], str) and (rec[2] is None or type(rec[2]) is int) for rec in recs)):
+        raise ValueError("malformed search")
+    return spec
+
+
+def decode_cursor(cursor):
+    """Returns (session_id, offset, spec or None)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return str(data["s"]), int(data["o"]), _check_spec(data.get("q"))
+    except Exception:
+        raise CursorError("Invalid cursor")
+
+
+class ListingStream:
+    """Upstream result pages for one recommendation."""
+
+    def __init__(self, rec):
+        self.rec = rec
+        self.page = 0
+        self.buffer = []
+        self.pos = 0
+        self.exhausted = False
+        self.truncated = False  # stopped at UNSORTED_MAX_PAGES with pages left
+        self.error = None
+
+
+class ResultSession:
+    def __init__(self, state, budget, headers, sort="price", descending=None,
+                 page_size=DEFAULT_PAGE_SIZE, rating_mode="auto", session_id=None):
+        key_func, default_desc = SORT_KEYS[sort]
+        self.id = session_id or uuid.uuid4().hex
+        self.state = state
+        self.budget = budget
+        self.headers = headers
+        self.sort = sort
+        self.descending = default_desc if descending is None else descending
+        self.page_size = page_size
+        self.rating_mode = rating_mode
+        self._key_func = key_func
+        field = UPSTREAM_SORT_FIELDS.get(sort)
+        self.upstream_sort = f"{field}.{'desc' if self.descending else 'asc'}" if field else None
+        self.streams = []
+        self.emitted = []  # raw listings in ranked order
+        self.enriched = {}  # vin -> simplified listing
+        self._seen = set()
+        self._heap = []
+        self._seq = 0
+        self.lock = threading.Lock()
+        self.touched = time.time()
+
+    def _key(self, listing):
+        value = self._key_func(listing)
+        if value is None:
+            return (1, 0)  # missing values rank last either way
+        return (0, -value if self.descending else value)
+
+    @classmethod
+    def from_spec(cls, session_id, spec, headers):
+        """Rebuild a session from the search carried in a cursor (see spec())."""
+        session = cls(spec["state"], spec["budget"], headers, sort=spec["sort"], descending=spec["desc"],
+                      page_size=int(spec["size"]), rating_mode=spec.get("ratings", "auto"), session_id=session_id)
+        return session.open({"make": make, "model": model, "year": year} for make, model, year in spec["recs"])
+
+    def spec(self):
+        """The search this session runs, compact enough to carry in a cursor."""
+        return {
+            "state": self.state, "budget": self.budget, "sort": self.sort, "desc": self.descending,
+            "size": self.page_size, "ratings": self.rating_mode,
+            "recs": [[s.rec["make"], s.rec["model"], _year(s.rec.get("year"))]
+                     for s in self.streams[:CURSOR_MAX_RECOMMENDATIONS]],
+        }
+
+    @property
+    def exact(self):
+        """Whether the ranking covers every upstream listing, not just the pages read."""
+        return not any(stream.truncated for stream in self.streams)
+
+    def _fetch_page(self, stream):
+        """The stream's next upstream page, unsorted."""
+        result = search_autodev(stream.rec, self.state, self.budget, self.headers,
+                                limit=UPSTREAM_PAGE_SIZE, page=stream.page + 1, sort=self.upstream_sort)
+        stream.page += 1
+        if "error" in result:
+            stream.error = result["error"]
+            stream.exhausted = True
+            return []
+        listings = result.get("listings") or []
+        if len(listings) < UPSTREAM_PAGE_SIZE:
+            stream.exhausted = True
+        return listings
+
+    def _fetch(self, stream):
+        """Fetch and sort the stream's next upstream page, or all of them when upstream can't sort."""
+        listings = self._fetch_page(stream)
+        if self.upstream_sort is None:
+            while not stream.exhausted:
+                if stream.page >= UNSORTED_MAX_PAGES:
+                    stream.truncated = stream.exhausted = True
+                    break
+                listings += self._fetch_page(stream)
+        stream.buffer = sorted(listings, key=self._key)
+        stream.pos = 0
+
+    def _push(self, index, pending_key=None):
+        stream = self.streams[index]
+        self._seq += 1
+        if stream.pos < len(stream.buffer):
+            heapq.heappush(self._heap, (self._key(stream.buffer[stream.pos]), self._seq, index, False))
+        elif not stream.exhausted:
+            # Fetch the next page only when the merge reaches this point
+            heapq.heappush(self._heap, (pending_key or (1, 0), self._seq, index, True))
+
+    def open(self, recommendations):
+        """Fetch the first page of every recommendation; `recommendations` may be a generator."""
+        pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+        futures = []
+        try:
+            for rec in recommendations:
+                if not (rec.get("make") and rec.get("model")):
+                    print(f"⚠️ Skipping incomplete recommendation: {rec}")
+                    continue
+                stream = ListingStream(rec)
+                self.streams.append(stream)
+                futures.append(pool.submit(propagate(self._fetch), stream))
+        finally:
+            pool.shutdown(wait=True)
+        for future in futures:
+            future.result()
+        for index in range(len(self.streams)):
+            self._push(index)
+        return self
+
+    def _advance(self):
+        """Move the next ranked listing into `emitted`. Returns False when every stream is done."""
+        while self._heap:
+            key, _, index, pending = heapq.heappop(self._heap)
+            stream = self.streams[index]
+            if pending:
+                print(f"📄 Fetching page {stream.page + 1} for {stream.rec.get('make')} {stream.rec.get('model')}")
+                self._fetch(stream)
+                self._push(index)
+                continue
+            listing = stream.buffer[stream.pos]
+            stream.pos += 1
+            self._push(index, pending_key=key)
+            vin = (listing.get("vehicle") or {}).get("vin")
+            if not vin or vin in self._seen:
+                continue
+            self._seen.add(vin)
+            self.emitted.append(listing)
+            return True
+        return False
+
+    def take(self, offset, size):
+        """Ranked raw listings [offset, offset + size), and whether more may follow."""
+        while len(self.emitted) < offset + size and self._advance():
+            pass
+        page = self.emitted[offset:offset + size]
+        has_more = len(self.emitted) > offset + size or bool(self._heap)
+        return page, has_more
+
+    def buffered(self):
+        """Every raw listing fetched so far (returned or still buffered), for filter metadata."""
+        listings = {l["vehicle"]["vin"]: l for l in self.emitted}
+        for stream in self.streams:
+            for listing in stream.buffer[stream.pos:]:
+                vin = (listing.get("vehicle") or {}).get("vin")
+                if vin:
+                    listings.setdefault(vin, listing)
+        return listings
+
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def store_session(session):
+    with _sessions_lock:
+        _sessions[session.id] = session
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def load_session(session_id, spec=None, headers=None):
+    """
+    The session a cursor points at. A session this process doesn't have (it
+    expired, or was opened by another worker) is rebuilt from the cursor's
+    `spec`, which re-runs its upstream searches.
+    """
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is not None and time.time() - session.touched <= SESSION_TTL:
+            _sessions.move_to_end(session_id)
+            session.touched = time.time()
+            return session
+        _sessions.pop(session_id, None)
+    if spec is None or headers is None:
+        raise CursorError("Cursor has expired, start a new search", status=410)
+    print(f"♻️ Rebuilding result session {session_id} from its cursor")
+    session = ResultSession.from_spec(session_id, spec, headers)
+    store_session(session)
+    return session
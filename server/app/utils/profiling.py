@@ -0,0 +1,306 @@
+"""
+Request Profiling
+=================
+On-demand sampling profiler for slow requests. A request is profiled when
+it carries a valid signed X-Profile token, or automatically once it has run
+longer than PROFILE_SLOW_MS; a slow request is sampled from that point on,
+so the profile covers the slow tail rather than the whole request.
+
+One sampler thread, started on the first profiled request, reads the stacks
+of the request thread and of the pool threads working for it (tracked by
+accounting.propagate) every PROFILE_INTERVAL_MS via sys._current_frames().
+Each stack is rooted at "request" or "worker" so upstream waits in the
+request thread stand apart from work in the pools.
+
+Two collapsed-stack profiles ("frame;frame;frame count" lines, the input
+format of flamegraph.pl and speedscope) are kept per request:
+    wall - one count per sample, wherever the thread was
+    cpu  - microseconds of thread CPU time spent since the previous sample,
+           so threads blocked on I/O drop out
+
+Profiles are written to PROFILE_DIR as <id>.json metadata plus
+<id>.wall.folded and <id>.cpu.folded, and only the newest PROFILE_KEEP are
+kept. They are listed at /metrics/profiles with the same signed token.
+
+Tokens are "<expiry unix time>.<HMAC-SHA256 of it with PROFILE_SECRET>";
+without PROFILE_SECRET, on-demand profiling and the listing are disabled.
+Make one with sign_profile_token().
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "3000"))  # 0 disables automatic profiling
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "revvo_profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_MAX_SAMPLES = 20000  # per request, so a stuck request can't grow without bound
+PROFILE_MAX_DEPTH = 128
+PROFILE_KINDS = ("wall", "cpu")
+
+
+def sign_profile_token(ttl=3600, secret=None, now=None):
+    """A token that turns on profiling for requests sent in the next `ttl` seconds."""
+    expires = str(int((now or time.time()) + ttl))
+    digest = hmac.new((secret or PROFILE_SECRET).encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify_profile_token(token, secret=None, now=None):
+    secret = secret if secret is not None else PROFILE_SECRET
+    if not (secret and token):
+        return False
+    expires, _, digest = token.partition(".")
+    if not expires.isdigit() or int(expires) < (now or time.time()):
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def _thread_cpu_clock(ident):
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):  # not available on this platform
+        return None
+
+
+def collapse_stack(frame, root):
+    """A frame's stack as one collapsed line, outermost call first."""
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """Samples for one request."""
+
+    def __init__(self, ident, usage=None, forced=False, started=None):
+        self.ident = ident
+        self.usage = usage
+        self.forced = forced
+        self.started = started if started is not None else time.monotonic()
+        self.sampling_from = None
+        self.samples = 0
+        self.wall = Counter()
+        self.cpu = Counter()
+        self._clocks = {}
+        self._last_cpu = {}
+
+    def _cpu_delta(self, ident):
+        if ident not in self._clocks:
+            self._clocks[ident] = _thread_cpu_clock(ident)
+        clock = self._clocks[ident]
+        if clock is None:
+            return 0
+        try:
+            now = time.clock_gettime(clock)
+        except OSError:  # the thread has exited
+            return 0
+        last = self._last_cpu.get(ident)
+        self._last_cpu[ident] = now
+        return int((now - last) * 1e6) if last is not None else 0
+
+    def sample(self, frames, now):
+        if self.sampling_from is None:
+            self.sampling_from = now
+        if self.samples >= PROFILE_MAX_SAMPLES:
+            return
+        self.samples += 1
+        workers = self.usage.active_threads() if self.usage is not None else ()
+        for ident in (self.ident, *workers):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = collapse_stack(frame, "request" if ident == self.ident else "worker")
+            self.wall[stack] += 1
+            cpu = self._cpu_delta(ident)
+            if cpu:
+                self.cpu[stack] += cpu
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR, interval=PROFILE_INTERVAL, slow_ms=PROFILE_SLOW_MS, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.interval = interval
+        self.slow = slow_ms / 1000 if slow_ms > 0 else None
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self, ident, usage=None, forced=False):
+        """Watch a request; returns its session, or None if it can't be profiled."""
+        if not forced and self.slow is None:
+            return None
+        session = ProfileSession(ident, usage, forced)
+        with self._lock:
+            self._sessions[ident] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return session
+
+    def end(self, session, meta):
+        """
+        Stop watching a request and write its profile if it was sampled.
+
+        Returns:
+            str: the profile id, or None
+        """
+        with self._lock:
+            if self._sessions.get(session.ident) is session:
+                del self._sessions[session.ident]
+        if not session.samples:
+            return None
+        ended = time.monotonic()
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        meta = {
+            **meta,
+            "id": profile_id,
+            "created": time.time(),
+            "trigger": "header" if session.forced else "slow",
+            "durationMs": round((ended - session.started) * 1000, 1),
+            "sampledMs": round((ended - session.sampling_from) * 1000, 1),
+            "samples": session.samples,
+            "cpuMs": round(sum(session.cpu.values()) / 1000, 1),
+            "intervalMs": self.interval * 1000,
+        }
+        try:
+            self._write(profile_id, meta, session)
+        except OSError as e:
+            print(f"⚠️ Failed to write profile {profile_id}: {e}")
+            return None
+        print(f"🔬 Profiled {meta.get('method')} {meta.get('path')} ({meta['durationMs']:.0f} ms): {profile_id}")
+        return profile_id
+
+    def _run(self):
+        while True:
+            # Sampling holds the lock so end() never reads a session's counters mid-sample
+            with self._lock:
+                sessions = list(self._sessions.values())
+                now = time.monotonic()
+                due = [s for s in sessions if s.forced or now - s.started >= self.slow]
+                if due:
+                    frames = sys._current_frames()
+                    for session in due:
+                        session.sample(frames, now)
+                    del frames
+            if not sessions:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            if due:
+                wait = self.interval
+            else:
+                # Nothing is slow yet: sleep until the oldest request would be
+                wait = max(self.interval, min(s.started for s in sessions) + self.slow - now)
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    @staticmethod
+    def _atomic_write(path, text):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _write(self, profile_id, meta, session):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        for kind, counts in (("wall", session.wall), ("cpu", session.cpu)):
+            self._atomic_write(f"{base}.{kind}.folded",
+                               "".join(f"{stack} {count}\n" for stack, count in counts.most_common()))
+        # Metadata last: a profile is listed only once its stacks are on disk
+        self._atomic_write(f"{base}.json", json.dumps(meta, sort_keys=True))
+        self._prune()
+
+    def _prune(self):
+        profiles = self.list()
+        for meta in profiles[self.keep:]:
+            for suffix in (".json", ".wall.folded", ".cpu.folded"):
+                try:
+                    os.remove(os.path.join(self.directory, meta["id"] + suffix))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Metadata of the stored profiles, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        profiles = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda meta: meta.get("created", 0), reverse=True)
+        return profiles
+
+    def stacks(self, profile_id, kind="wall"):
+        """Collapsed stacks of one profile, or None if it doesn't exist."""
+        if kind not in PROFILE_KINDS or not profile_id.replace("-", "").isalnum():
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.{kind}.folded"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+profiler = Profiler()
+
+
+def init_profiling(app):
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        if request.blueprint == "metrics":
+            return  # the admin endpoints share the token; don't profile them
+        forced = verify_profile_token(request.headers.get(PROFILE_HEADER))
+        g.profile_session = profiler.begin(threading.get_ident(), g.get("request_usage"), forced=forced)
+
+    @app.after_request
+    def _finish_profile(response):
+        session = g.pop("profile_session", None)
+        if session is None:
+            return response
+        profile_id = profiler.end(session, {
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+        })
+        if profile_id is not None:
+            response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    @app.teardown_request
+    def _drop_profile(error=None):
+        # Requests that failed before after_request ran still stop being sampled
+        session = g.pop("profile_session", None)
+        if session is not None:
+            profiler.end(session, {"method": request.method, "path": request.full_path.rstrip("?"),
+                                   "endpoint": request.endpoint, "status": 500})
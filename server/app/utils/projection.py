@@ -0,0 +1,112 @@
+"""
+Listing Projection
+==================
+Sparse fieldsets and a compact columnar layout for listing responses.
+
+`fields=` takes comma-separated dotted paths ("retailListing.price",
+"ratings") or a preset name ("grid"). A whole section name keeps the whole
+section. `retailListing.primaryImage` is a virtual field holding the first
+gallery image, so grid views don't need the full `images` list.
+
+The compact layout turns {vin: listing} into one array per field:
+    {"vins": [...], "fields": [...], "columns": {field: [...]}}
+so field names are sent once instead of once per listing.
+"""
+
+import copy
+
+SECTIONS = ("vehicle", "retailListing", "history", "ratings", "insurance")
+
+FIELD_PRESETS = {
+    # Everything the results grid renders
+    "grid": (
+        "vehicle.vin", "vehicle.make", "vehicle.model", "vehicle.year", "vehicle.trim",
+        "vehicle.bodyStyle", "vehicle.exteriorColor", "vehicle.fuel",
+        "retailListing.price", "retailListing.miles", "retailListing.city", "retailListing.state",
+        "retailListing.primaryImage",
+        "ratings.overallRating", "insurance.monthlyEstimate",
+    ),
+}
+
+LAYOUTS = ("full", "compact")
+
+
+def parse_fields(spec):
+    """
+    Parse a `fields=` value into a tuple of dotted paths, or None for "everything".
+
+    Raises:
+        ValueError: for unknown sections
+    """
+    if not spec:
+        return None
+    paths = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part in FIELD_PRESETS:
+            paths.extend(FIELD_PRESETS[part])
+            continue
+        if part.split(".", 1)[0] not in SECTIONS:
+            raise ValueError(f"Unknown field '{part}', fields must start with one of {', '.join(SECTIONS)}")
+        paths.append(part)
+    return tuple(dict.fromkeys(paths)) or None
+
+
+def get_path(listing, path):
+    """Value at a dotted path, or None if any part is missing."""
+    if path == "retailListing.primaryImage":
+        images = (listing.get("retailListing") or {}).get("images")
+        if isinstance(images, list):
+            return images[0] if images else None
+        return images
+    value = listing
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def project(listing, paths):
+    """
+    Copy of a listing with only the given dotted paths. Values are deep-copied,
+    so the result never shares dicts with the stored listing.
+    """
+    if paths is None:
+        return listing
+    result = {}
+    # Whole sections first, so a nested path adds to the copied section instead of being replaced by it
+    for path in sorted(paths, key=lambda p: p.count(".")):
+        keys = path.split(".")
+        target = result
+        for key in keys[:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        target[keys[-1]] = copy.deepcopy(get_path(listing, path))
+    return result
+
+
+def to_columns(listings, paths, order=None):
+    """
+    Columnar layout for {vin: listing}, in `order` if given. Without `paths`,
+    each section is one column.
+    """
+    vins = list(order) if order is not None else list(listings)
+    fields = list(paths) if paths is not None else list(SECTIONS)
+    return {
+        "vins": vins,
+        "fields": fields,
+        "columns": {field: [get_path(listings[vin], field) for vin in vins] for field in fields},
+    }
+
+
+def shape_listings(listings, paths=None, layout="full", order=None):
+    """Apply a field projection and layout to a {vin: listing} response body."""
+    if layout == "compact":
+        return to_columns(listings, paths, order)
+    if paths is None:
+        return listings
+    return {vin: project(listing, paths) for vin, listing in listings.items()}
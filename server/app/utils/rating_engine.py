@@ -0,0 +1,185 @@
+"""
+Local Rating Engine
+===================
+Table-driven car ratings that mirror the shape returned by get_car_rating
+(dealRating, fuelEconomyRating, maintenanceRating, safetyRating,
+ownerSatisfactionRating, overallRating — all out of 5.00) without an LLM call.
+"""
+
+import datetime
+
+CURRENT_YEAR = datetime.date.today().year
+
+# Brand-level reliability / cost-of-ownership (out of 5)
+MAKE_RELIABILITY = {
+    "Toyota": 4.6, "Lexus": 4.7, "Honda": 4.4, "Acura": 4.2, "Mazda": 4.3,
+    "Subaru": 3.9, "Hyundai": 3.9, "Kia": 4.0, "Genesis": 3.9, "Nissan": 3.5,
+    "Infiniti": 3.4, "Mitsubishi": 3.6, "Ford": 3.4, "Lincoln": 3.3, "Chevrolet": 3.4,
+    "GMC": 3.3, "Buick": 3.8, "Cadillac": 3.1, "Dodge": 3.2, "Chrysler": 3.0,
+    "Jeep": 2.9, "Ram": 3.2, "Volkswagen": 3.3, "Audi": 3.2, "BMW": 3.1,
+    "Mercedes-Benz": 3.0, "Mini": 3.0, "Volvo": 3.4, "Porsche": 3.5, "Tesla": 3.4,
+    "Rivian": 3.0, "Jaguar": 2.7, "Land Rover": 2.5, "Alfa Romeo": 2.7, "Fiat": 2.8,
+    "Maserati": 2.5,
+}
+
+# Brand-level owner satisfaction (out of 5)
+MAKE_SATISFACTION = {
+    "Toyota": 4.3, "Lexus": 4.6, "Honda": 4.2, "Acura": 4.1, "Mazda": 4.3,
+    "Subaru": 4.2, "Hyundai": 4.0, "Kia": 4.1, "Genesis": 4.3, "Nissan": 3.6,
+    "Infiniti": 3.6, "Mitsubishi": 3.4, "Ford": 3.8, "Lincoln": 3.9, "Chevrolet": 3.7,
+    "GMC": 3.9, "Buick": 3.8, "Cadillac": 3.8, "Dodge": 3.9, "Chrysler": 3.6,
+    "Jeep": 3.8, "Ram": 4.1, "Volkswagen": 3.7, "Audi": 4.0, "BMW": 4.1,
+    "Mercedes-Benz": 4.0, "Mini": 3.9, "Volvo": 4.0, "Porsche": 4.6, "Tesla": 4.4,
+    "Rivian": 4.5, "Jaguar": 3.5, "Land Rover": 3.6, "Alfa Romeo": 3.7, "Fiat": 3.2,
+    "Maserati": 3.4,
+}
+
+# Model-level overrides: (combined MPG or MPGe, IIHS/NHTSA-style safety out of 5)
+MODEL_PROFILES = {
+    ("Toyota", "Corolla"): (34, 4.6), ("Toyota", "Camry"): (32, 4.7), ("Toyota", "Prius"): (52, 4.5),
+    ("Toyota", "RAV4"): (30, 4.6), ("Toyota", "Highlander"): (24, 4.6), ("Toyota", "Tacoma"): (21, 4.0),
+    ("Toyota", "Tundra"): (18, 4.1), ("Toyota", "4Runner"): (17, 3.8), ("Toyota", "Sienna"): (36, 4.6),
+    ("Honda", "Civic"): (35, 4.6), ("Honda", "Accord"): (32, 4.7), ("Honda", "CR-V"): (30, 4.6),
+    ("Honda", "HR-V"): (28, 4.3), ("Honda", "Pilot"): (22, 4.5), ("Honda", "Odyssey"): (22, 4.6),
+    ("Mazda", "Mazda3"): (31, 4.7), ("Mazda", "CX-5"): (26, 4.7), ("Mazda", "CX-30"): (28, 4.7),
+    ("Subaru", "Outback"): (28, 4.6), ("Subaru", "Forester"): (29, 4.6), ("Subaru", "Crosstrek"): (29, 4.5),
+    ("Hyundai", "Elantra"): (34, 4.5), ("Hyundai", "Tucson"): (28, 4.5), ("Hyundai", "Ioniq 5"): (114, 4.7),
+    ("Kia", "Forte"): (34, 4.4), ("Kia", "Sportage"): (28, 4.4), ("Kia", "Telluride"): (23, 4.6),
+    ("Ford", "F-150"): (20, 4.3), ("Ford", "Escape"): (30, 4.3), ("Ford", "Explorer"): (24, 4.2),
+    ("Ford", "Mustang"): (22, 3.9), ("Chevrolet", "Silverado"): (19, 4.1), ("Chevrolet", "Equinox"): (28, 4.2),
+    ("Chevrolet", "Malibu"): (32, 4.2), ("Nissan", "Altima"): (32, 4.3), ("Nissan", "Rogue"): (33, 4.4),
+    ("Nissan", "Sentra"): (33, 4.2), ("Jeep", "Wrangler"): (19, 3.2), ("Jeep", "Grand Cherokee"): (22, 4.0),
+    ("Tesla", "Model 3"): (132, 4.8), ("Tesla", "Model Y"): (122, 4.8), ("Tesla", "Model S"): (120, 4.7),
+    ("BMW", "3 Series"): (30, 4.5), ("BMW", "X3"): (25, 4.5), ("BMW", "X5"): (23, 4.5),
+    ("Mercedes-Benz", "C-Class"): (27, 4.4), ("Mercedes-Benz", "GLC"): (25, 4.5),
+    ("Audi", "A4"): (29, 4.5), ("Audi", "Q5"): (25, 4.5), ("Lexus", "RX"): (24, 4.6), ("Lexus", "ES"): (28, 4.7),
+    ("Volkswagen", "Jetta"): (34, 4.3), ("Volkswagen", "Tiguan"): (25, 4.3), ("Ram", "1500"): (20, 4.1),
+}
+
+# Typical combined MPG when the model isn't profiled
+BODY_STYLE_MPG = {
+    "Sedan": 30, "Hatchback": 31, "Wagon": 28, "Coupe": 25, "Convertible": 24,
+    "SUV": 25, "Truck": 19, "Pickup": 19, "Van": 20, "Minivan": 22,
+}
+
+# Baseline safety by body style when the model isn't profiled
+BODY_STYLE_SAFETY = {
+    "Sedan": 4.2, "Hatchback": 4.0, "Wagon": 4.3, "Coupe": 3.9, "Convertible": 3.6,
+    "SUV": 4.3, "Truck": 4.0, "Pickup": 4.0, "Van": 3.9, "Minivan": 4.4,
+}
+
+CYLINDER_MPG_ADJUSTMENT = {3: 4, 4: 2, 6: -3, 8: -7, 10: -9, 12: -11}
+
+# Expected resale value as a share of MSRP, by age in years
+DEPRECIATION_CURVE = [1.00, 0.87, 0.80, 0.74, 0.69, 0.65, 0.61, 0.57, 0.53, 0.50, 0.47]
+
+MILES_PER_YEAR = 12000
+
+
+def _clamp(value, low=1.0, high=5.0):
+    return max(low, min(high, value))
+
+
+def _fuel_rating(mpg, fuel):
+    if fuel == "Electric" or mpg >= 80:
+        return 4.9
+    # 15 MPG -> 1.5, 45+ MPG -> 5.0
+    rating = 1.5 + (mpg - 15) * (3.5 / 30)
+    if fuel in ("Hybrid", "Plug-In Hybrid"):
+        rating += 0.3
+    return _clamp(rating)
+
+
+def estimate_market_value(msrp, age, make):
+    """Expected used price for a car of this MSRP, age and make at typical mileage."""
+    expected = msrp * DEPRECIATION_CURVE[min(age, len(DEPRECIATION_CURVE) - 1)]
+    # Reliable brands hold their value better
+    expected *= 1 + 0.1 * (MAKE_RELIABILITY.get(make, 3.5) - 3.5)
+    if age >= len(DEPRECIATION_CURVE):
+        expected *= 0.93 ** (age - len(DEPRECIATION_CURVE) + 1)
+    return expected
+
+
+def _deal_rating(price, msrp, age, miles, make):
+    if not price or not msrp:
+        return 3.0
+    expected = estimate_market_value(msrp, age, make)
+    # Each 10k miles over/under the yearly norm shifts expected value ~3%
+    expected_miles = max(age, 1) * MILES_PER_YEAR
+    expected *= 1 - 0.03 * ((miles - expected_miles) / 10000)
+    # 40% under expected value -> 5.0, 40% over -> 1.0
+    ratio = price / max(expected, 1)
+    return _clamp(3.0 + (1.0 - ratio) * 5)
+
+
+def estimate_ratings(car_data):
+    """
+    Rate a car from lookup tables and listing features.
+
+    Args:
+        car_data (dict): Car listing data with 'vehicle', 'retailListing', and 'history' keys
+
+    Returns:
+        dict: Ratings in the same shape as get_car_rating
+    """
+    vehicle = car_data.get("vehicle") or {}
+    retail = car_data.get("retailListing") or {}
+    history = car_data.get("history") or {}
+
+    make = vehicle.get("make") or ""
+    model = vehicle.get("model") or ""
+    body_style = vehicle.get("bodyStyle") or "Sedan"
+    fuel = vehicle.get("fuel") or "Gasoline"
+    cylinders = vehicle.get("cylinders")
+
+    year = vehicle.get("year") or CURRENT_YEAR - 5
+    age = max(0, CURRENT_YEAR - year)
+    miles = retail.get("miles")
+    if miles is None:
+        miles = age * MILES_PER_YEAR
+    price = retail.get("price")
+    msrp = vehicle.get("baseMsrp")
+
+    profile = MODEL_PROFILES.get((make, model))
+    if profile:
+        mpg, safety = profile
+    else:
+        mpg = BODY_STYLE_MPG.get(body_style, 26) + CYLINDER_MPG_ADJUSTMENT.get(cylinders, 0)
+        safety = BODY_STYLE_SAFETY.get(body_style, 4.0)
+
+    # === FUEL ECONOMY ===
+    fuel_rating = _fuel_rating(mpg, fuel)
+
+    # === SAFETY (newer model years carry more driver-assist features) ===
+    safety_rating = _clamp(safety - 0.05 * max(0, age - 5))
+
+    # === MAINTENANCE (brand reliability, worn down by age and mileage) ===
+    reliability = MAKE_RELIABILITY.get(make, 3.5)
+    maintenance_rating = reliability - 0.04 * age - 0.4 * max(0, miles - 60000) / 60000
+    if history.get("accidentCount"):
+        maintenance_rating -= 0.3 * min(history["accidentCount"], 3)
+    maintenance_rating = _clamp(maintenance_rating)
+
+    # === OWNER SATISFACTION ===
+    satisfaction_rating = MAKE_SATISFACTION.get(make, 3.7)
+    if history.get("oneOwner"):
+        satisfaction_rating += 0.1
+    if retail.get("cpo"):
+        satisfaction_rating += 0.1
+    satisfaction_rating = _clamp(satisfaction_rating)
+
+    # === DEAL ===
+    deal_rating = _deal_rating(price, msrp, age, miles, make)
+    if history.get("accidentCount"):
+        deal_rating -= 0.2
+    deal_rating = _clamp(deal_rating)
+
+    parts = [deal_rating, fuel_rating, maintenance_rating, safety_rating, satisfaction_rating]
+    return {
+        "dealRating": round(deal_rating, 2),
+        "fuelEconomyRating": round(fuel_rating, 2),
+        "maintenanceRating": round(maintenance_rating, 2),
+        "safetyRating": round(safety_rating, 2),
+        "ownerSatisfactionRating": round(satisfaction_rating, 2),
+        "overallRating": round(sum(parts) / len(parts), 2),
+    }
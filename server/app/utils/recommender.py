@@ -0,0 +1,192 @@
+"""
+Local Recommender
+=================
+Scores the bundled vehicle catalog against a (state, budget, primary_use,
+comfort) query and returns top-k make/model/year picks in the same shape as
+the LLM recommendation, plus a confidence score. Callers use the LLM only when
+the confidence is below RECOMMENDER_MIN_CONFIDENCE.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+from .rating_engine import CURRENT_YEAR, MAKE_RELIABILITY, MODEL_PROFILES, BODY_STYLE_MPG, estimate_market_value
+from .vehicle_catalog import CATALOG
+
+RECOMMENDER_MIN_CONFIDENCE = float(os.getenv("RECOMMENDER_MIN_CONFIDENCE", "0.6"))
+RECOMMENDATION_LOG_PATH = os.getenv("RECOMMENDATION_LOG_PATH")
+RECOMMENDER_MODES = ("auto", "local", "llm")
+
+DEFAULT_BUDGET = 35000
+MAX_AGE = 12
+
+# Query keyword -> intent. Keywords match whole words of the lowercased query,
+# allowing plurals and the like (see KEYWORD_SUFFIX): "tow" matches "towing"
+# but not "town", "eco" matches "eco-friendly" but not "economy".
+INTENT_KEYWORDS = {
+    "sports": ("sport", "performance", "fast", "fun"),
+    "luxury": ("luxury", "premium", "upscale"),
+    "suv": ("suv", "crossover"),
+    "sedan": ("sedan",),
+    "truck": ("truck", "pickup", "haul"),
+    "towing": ("tow",),
+    "compact": ("compact", "economy", "city", "small", "cheap", "first car"),
+    "commute": ("commute", "commuting", "commuter", "daily", "fuel", "mpg", "gas mileage"),
+    "family": ("family", "families", "kids", "minivan", "carpool", "third row", "3 row"),
+    "minivan": ("minivan", "van"),
+    "electric": ("electric", "hybrid", "ev", "eco", "green"),
+    "offroad": ("off-road", "off road", "offroad", "outdoor", "camping", "snow", "adventure"),
+}
+KEYWORD_SUFFIX = r"(?:s|es|er|ers|ing|ed|y)?"
+
+_INTENT_PATTERNS = {
+    intent: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + ")" + KEYWORD_SUFFIX + r"\b")
+    for intent, words in INTENT_KEYWORDS.items()
+}
+
+
+def _intents(*texts):
+    query = " ".join(t for t in texts if t).lower()
+    return {intent for intent, pattern in _INTENT_PATTERNS.items() if pattern.search(query)}
+
+
+def _mpg(entry):
+    profile = MODEL_PROFILES.get((entry["make"], entry["model"]))
+    if profile:
+        return profile[0]
+    if entry["fuel"] == "Electric":
+        return 110
+    return BODY_STYLE_MPG.get(entry["bodyStyle"], 26) + (12 if entry["fuel"] == "Hybrid" else 0)
+
+
+def _matches(entry, intent):
+    body, fuel, tags = entry["bodyStyle"], entry["fuel"], entry["tags"]
+    if intent == "sports":
+        return "sports" in tags or body in ("Coupe", "Convertible")
+    if intent == "luxury":
+        return "luxury" in tags
+    if intent == "suv":
+        return body == "SUV"
+    if intent == "sedan":
+        return body == "Sedan"
+    if intent == "truck":
+        return body == "Truck"
+    if intent == "towing":
+        return "towing" in tags
+    if intent == "compact":
+        return "compact" in tags
+    if intent == "commute":
+        return _mpg(entry) >= 30
+    if intent == "family":
+        return "family" in tags or entry["seats"] >= 7
+    if intent == "minivan":
+        return body == "Minivan"
+    if intent == "electric":
+        return fuel in ("Electric", "Hybrid") or "electric" in tags
+    if intent == "offroad":
+        return "offroad" in tags
+    return False
+
+
+def _parse_budget(budget):
+    try:
+        value = float(str(budget).replace("$", "").replace(",", ""))
+        return value if value > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _newest_affordable(entry, budget):
+    """Newest model year whose estimated used price fits the budget, as (year, price)."""
+    last = min(entry["lastYear"], CURRENT_YEAR)
+    first = max(entry["firstYear"], CURRENT_YEAR - MAX_AGE)
+    for year in range(last, first - 1, -1):
+        price = estimate_market_value(entry["baseMsrp"], CURRENT_YEAR - year, entry["make"])
+        if price <= budget:
+            return year, price
+    return None, None
+
+
+def recommend(state, budget, primary_use, comfort, k=3):
+    """
+    Pick the top-k catalog vehicles for a query.
+
+    Returns:
+        dict: {"recommendations": [{"make", "model", "year", "price"}, ...],
+               "confidence": 0..1, "intents": [...]}
+    """
+    intents = _intents(primary_use, comfort)
+    parsed_budget = _parse_budget(budget)
+    max_price = parsed_budget or DEFAULT_BUDGET
+
+    scored = []
+    for entry in CATALOG:
+        year, price = _newest_affordable(entry, max_price)
+        if year is None:
+            continue
+        matched = sum(1 for intent in intents if _matches(entry, intent))
+        intent_score = matched / len(intents) if intents else 0.5
+        reliability = MAKE_RELIABILITY.get(entry["make"], 3.5) / 5
+        recency = 1 - (CURRENT_YEAR - year) / MAX_AGE
+        budget_use = price / max_price
+        score = 0.45 * intent_score + 0.2 * reliability + 0.2 * recency + 0.15 * budget_use
+        if "commute" in intents or "compact" in intents:
+            score += 0.05 * min(_mpg(entry), 50) / 50
+        scored.append((score, intent_score, entry, year, price))
+
+    scored.sort(key=lambda row: row[0], reverse=True)
+
+    picks, makes = [], set()
+    for score, intent_score, entry, year, price in scored:
+        if entry["make"] in makes:
+            continue
+        makes.add(entry["make"])
+        picks.append((score, intent_score, entry, year, price))
+        if len(picks) == k:
+            break
+
+    # Confidence: did we understand the query, and do the picks actually satisfy it?
+    if not picks:
+        confidence = 0.0
+    elif not intents:
+        confidence = 0.2
+    else:
+        fully_matched = sum(1 for p in picks if p[1] == 1.0) / k
+        depth = min(1.0, sum(1 for row in scored if row[1] == 1.0) / (3 * k))
+        confidence = 0.35 + 0.45 * fully_matched + 0.2 * depth
+        if parsed_budget is None:
+            confidence -= 0.2
+    confidence = round(max(0.0, min(1.0, confidence)), 3)
+
+    return {
+        "recommendations": [
+            {"make": entry["make"], "model": entry["model"], "year": year, "price": int(round(price, -2))}
+            for _, _, entry, year, price in picks
+        ],
+        "confidence": confidence,
+        "intents": sorted(intents),
+    }
+
+
+_log_lock = threading.Lock()
+
+
+def log_recommendation(query, llm_picks, local_result):
+    """Append an LLM pick (with the local recommender's answer) to RECOMMENDATION_LOG_PATH for offline evaluation."""
+    if not RECOMMENDATION_LOG_PATH or not llm_picks:
+        return
+    entry = {
+        "ts": time.time(),
+        "query": query,
+        "llm": llm_picks,
+        "local": local_result["recommendations"] if local_result else None,
+        "localConfidence": local_result["confidence"] if local_result else None,
+    }
+    try:
+        with _log_lock, open(RECOMMENDATION_LOG_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"⚠️ Failed to log recommendation: {e}")
@@ -0,0 +1,323 @@
+"""
+Listing Search Pipeline
+=======================
+Auto.dev search plus per-VIN enrichment for a stream of recommendations.
+
+Each recommendation starts its Auto.dev search as soon as it arrives (the LLM
+recommendation stream yields them one at a time), and each finished search
+starts enrichment of its not-yet-seen VINs right away, so LLM generation,
+upstream searches and enrichment overlap instead of running back to back.
+
+Auto.dev search results and LLM recommendations go through the shared cache
+(cache.py), so repeat queries skip the upstream call in every worker, and
+slow Auto.dev searches are hedged (hedging.py).
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from flask import current_app
+
+from .accounting import propagate, record
+from .cache import cache_for
+from .circuit_breaker import UpstreamError, get_breaker
+from .clean_data import AUTO_DEV_BASE_URL, clean_listings
+from .hedging import get_hedger
+from .market_index import market_index
+from .openai import RecommendationError, stream_car_recommendations
+from .recommender import RECOMMENDER_MIN_CONFIDENCE, log_recommendation, recommend
+from .vehicle_names import normalize_recommendation, record_search
+
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "4"))
+
+
+def autodev_headers():
+    """Auth headers for Auto.dev, or None if AUTO_DEV_KEY isn't configured."""
+    token = os.getenv("AUTO_DEV_KEY")
+    if not token:
+        return None
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+
+def _recommendation_cache_key(params):
+    return json.dumps([params.get(k) for k in ("state", "budget", "primary_use", "comfort")])
+
+
+def resolve_recommendations(params):
+    """
+    Pick where a search's recommendations come from: the user's make/model,
+    the local recommender when it is confident, or the streamed LLM.
+
+    Args:
+        params (dict): state, budget, primary_use, comfort, make, model,
+                       model_year and recommender_mode
+
+    Returns:
+        tuple: (recommendations, rec_state, local). `recommendations` may be a
+               generator; rec_state {"count", "error", "picks"} fills in as it is consumed.
+    """
+    state, budget = params["state"], params.get("budget")
+    primary_use, comfort = params.get("primary_use"), params.get("comfort")
+    make, model = params.get("make"), params.get("model")
+    recommender_mode = params.get("recommender_mode", "auto")
+
+    rec_state = {"count": 0, "error": None, "picks": []}
+    local = None
+    if not (make and model) and recommender_mode != "llm":
+        local = recommend(state, budget, primary_use, comfort)
+
+    if make and model:
+        # ✅ User directly provided make/model → single query, no AI
+        model_year = params.get("model_year")
+        print(f"ℹ️ Direct search: {make} {model} ({model_year or 'any year'})")
+        return [{"make": make, "model": model, "year": model_year}], rec_state, local
+
+    if local is not None and (recommender_mode == "local" or local["confidence"] >= RECOMMENDER_MIN_CONFIDENCE):
+        # ✅ Local recommender is confident enough → no AI
+        recommendations = local["recommendations"]
+        rec_state["count"] = len(recommendations)
+        print(f"ℹ️ Local recommendations (confidence {local['confidence']}): {recommendations}")
+        return recommendations, rec_state, local
+
+    cached = cache_for("recommendations").get(_recommendation_cache_key(params))
+    if cached:
+        # ✅ Same query was answered by the LLM recently → reuse its picks
+        rec_state["count"] = len(cached)
+        print(f"ℹ️ Cached AI recommendations: {cached}")
+        return cached, rec_state, local
+
+    # ✅ Stream AI recommendations; each one starts its search as soon as it's parsed
+    def _stream():
+        try:
+            for rec in stream_car_recommendations(state, budget, primary_use, comfort):
+                rec_state["count"] += 1
+                rec_state["picks"].append(rec)
+                yield rec
+        except RecommendationError as e:
+            print(f"❌ Failed to get AI recommendations: {e}")
+            rec_state["error"] = e
+
+    return _stream(), rec_state, local
+
+
+def finish_recommendations(params, rec_state, local):
+    """
+    Log and cache the LLM's picks once the recommendations have been consumed.
+
+    Returns:
+        RecommendationError or None: the LLM error if it failed before producing any pick
+    """
+    if rec_state["error"] is not None and rec_state["count"] == 0:
+        return rec_state["error"]
+    if rec_state["picks"]:
+        print(f"✅ AI provided {rec_state['count']} car suggestions")
+        if rec_state["error"] is None:
+            cache_for("recommendations").set(_recommendation_cache_key(params), rec_state["picks"])
+        log_recommendation(
+            {k: params.get(k) for k in ("state", "budget", "primary_use", "comfort")},
+            rec_state["picks"],
+            local,
+        )
+    return None
+
+
+def search_autodev(rec, state, budget, headers, limit=5, page=None, sort=None):
+    """
+    Search Auto.dev for one recommendation. Make/model names are normalized
+    to Auto.dev's vocabulary first; the returned recommendation carries the
+    normalized names. `sort` ("<field>.asc" / "<field>.desc") orders the
+    results upstream, across pages.
+
+    Returns:
+        dict: {"recommendation": rec, "listings": [...]} or {"recommendation": rec, "error": "..."}
+    """
+    rec, normalized = normalize_recommendation(rec)
+    make = rec.get("make")
+    model = rec.get("model")
+    year = rec.get("year")
+
+    url = (
+        f"{AUTO_DEV_BASE_URL}/listings?"
+        f"vehicle.make={make}&"
+        f"vehicle.model={model}&"
+        f"retailListing.state={state}&"
+        f"limit={limit}"
+    )
+
+    if budget:
+        url += f"&retailListing.price=0-{budget}"
+    if year:
+        url += f"&vehicle.year={year}"
+    if page and page > 1:
+        url += f"&page={page}"
+    if sort:
+        url += f"&sort={sort}"
+
+    search_cache = cache_for("search")
+
+    def _search():
+        import requests
+        record("autodevSearches")
+        resp = requests.get(url, headers=headers, timeout=10)
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise UpstreamError(f"Auto.dev returned {resp.status_code}")
+        if resp.status_code != 200:
+            return resp.status_code, None
+        listings_data = resp.json()
+        found = listings_data.get("listings", listings_data.get("data", []))
+        search_cache.set(url, found)
+        return 200, found
+
+    found = search_cache.get(url)
+    cached = found is not None
+    if cached:
+        status = 200
+    else:
+        hedged = partial(get_hedger("autodev_listings").call, _search)
+        status, found = get_breaker("autodev_listings").call(hedged, fallback=lambda: (None, None))
+    if status is None:
+        print(f"❌ Auto.dev search unavailable for {make} {model}")
+        return {"recommendation": rec, "error": "Auto.dev is temporarily unavailable"}
+    if status != 200:
+        print(f"❌ Auto.dev error {status} for {make} {model}")
+        return {"recommendation": rec, "error": f"Auto.dev returned {status}"}
+    if not cached:
+        record_search(normalized, bool(found))
+    return {"recommendation": rec, "listings": found}
+
+
+def enrich_listings(listings, rating_mode="auto"):
+    """
+    Clean and enrich raw Auto.dev listings in parallel.
+
+    Returns:
+        dict: {vin: simplified listing}
+    """
+    app = current_app._get_current_object()
+
+    def _enrich(listing):
+        with app.app_context():
+            return clean_listings({"results": [{"listings": [listing]}]}, rating_mode=rating_mode,
+                                  save_index=False)["results"]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as pool:
+        for enriched in pool.map(propagate(_enrich), listings):
+            results.update(enriched)
+    market_index.save()
+    return results
+
+
+def run_search(recommendations, state, budget, headers, rating_mode="auto", on_searched=None, on_enriched=None):
+    """
+    Search and enrich listings for an iterable of recommendations in one state.
+
+    `recommendations` may be a generator; searches start while it is still
+    being consumed. Results keep recommendation order and each VIN is enriched
+    once even if several searches return it.
+
+    Each new VIN is enriched as its own task, so listings from one search are
+    enriched in parallel. `on_searched(item)` is called with each finished
+    search result and `on_enriched(results)` with each enriched
+    {vin: listing}, both from worker threads, so callers can report progress.
+
+    Returns:
+        dict: {"uniqueVinCount": int, "results": {vin: listing}} like clean_listings
+    """
+    found = search_many(recommendations, [state], budget, headers, rating_mode=rating_mode,
+                        on_searched=on_searched, on_enriched=on_enriched)
+    return {"uniqueVinCount": found["uniqueVinCount"], "results": found["results"]}
+
+
+def search_many(recommendations, states, budget, headers, rating_mode="auto", on_searched=None, on_enriched=None):
+    """
+    run_search across several states: every recommendation is searched in
+    every state concurrently, VINs are deduplicated across all searches and
+    each is enriched once.
+
+    Returns:
+        dict: {"uniqueVinCount", "results": {vin: listing}, "groups": [...]} where each
+              group is {"state", "recommendation", "vins", "error"} in search order; a
+              group lists every VIN its search returned, including ones shared with
+              other groups
+    """
+    app = current_app._get_current_object()
+    claimed = set()
+    claim_lock = threading.Lock()
+    slots = []
+
+    search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+    enrich_pool = ThreadPoolExecutor(max_workers=ENRICH_WORKERS)
+
+    def _enrich(listing):
+        with app.app_context():
+            enriched = clean_listings({"results": [{"listings": [listing]}]}, rating_mode=rating_mode,
+                                      save_index=False)["results"]
+        if on_enriched is not None:
+            on_enriched(enriched)
+        return enriched
+
+    # Bound here: search callbacks run on pool threads outside the request's context
+    enrich = propagate(_enrich)
+
+    def _on_search_done(slot, future):
+        # concurrent.futures only logs what a done-callback raises, so failures go on the group instead
+        try:
+            item = future.result()
+        except Exception as e:
+            print(f"⚠️ Search failed for {slot['recommendation']} in {slot['state']}: {e}")
+            item = {"recommendation": slot["recommendation"], "error": f"Search failed: {e}"}
+        try:
+            if on_searched is not None:
+                on_searched(item)
+            slot["recommendation"] = item["recommendation"]
+            slot["error"] = item.get("error")
+            fresh = []
+            with claim_lock:
+                for listing in item.get("listings") or []:
+                    vin = (listing.get("vehicle") or {}).get("vin")
+                    if not vin or vin in slot["vins"]:
+                        continue
+                    slot["vins"].append(vin)
+                    if vin not in claimed:
+                        claimed.add(vin)
+                        fresh.append(listing)
+            slot["enriched"] = [enrich_pool.submit(enrich, listing) for listing in fresh]
+        except Exception as e:
+            print(f"⚠️ Failed to handle search results for {slot['recommendation']} in {slot['state']}: {e}")
+            slot["error"] = f"Failed to handle search results: {e}"
+
+    try:
+        for rec in recommendations:
+            if not (rec.get("make") and rec.get("model")):
+                print(f"⚠️ Skipping incomplete recommendation: {rec}")
+                continue
+            for state in states:
+                print(f"🔎 Searching Auto.dev for {rec.get('make')} {rec.get('model')} "
+                      f"({rec.get('year') or 'any year'}) in {state}")
+                slot = {"state": state, "recommendation": rec, "vins": [], "error": None}
+                slots.append(slot)
+                future = search_pool.submit(propagate(search_autodev), rec, state, budget, headers)
+                future.add_done_callback(partial(_on_search_done, slot))
+    finally:
+        # Search callbacks submit enrichment, so drain searches first
+        search_pool.shutdown(wait=True)
+        enrich_pool.shutdown(wait=True)
+
+    market_index.save()
+
+    results = {}
+    for slot in slots:
+        for enriched in slot.pop("enriched", None) or []:
+            try:
+                results.update(enriched.result())
+            except Exception as e:
+                print(f"⚠️ Failed to enrich a listing for {slot['recommendation']}: {e}")
+    for slot in slots:
+        # A VIN whose enrichment failed is dropped from every group
+        slot["vins"] = [vin for vin in slot["vins"] if vin in results]
+    return {"uniqueVinCount": len(results), "results": results, "groups": slots}
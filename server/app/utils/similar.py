@@ -0,0 +1,255 @@
+"""
+Similar Listings
+================
+Vector index over the listings clean_listings has enriched, behind
+GET /listings/<vin>/similar.
+
+Each listing is encoded as a fixed-length vector: price (log scale), miles and
+year as scaled numbers, plus make, make/model, trim, body style, fuel and
+drivetrain folded into the remaining slots by feature hashing, so no
+vocabulary has to be kept. Vectors are L2-normalised and compared by cosine
+similarity.
+
+Candidates come from random-hyperplane LSH: each table buckets listings by
+which side of SIMILAR_LSH_BITS hyperplanes they fall on, and a query probes
+its own bucket plus every bucket one bit away. Candidates are then scored
+exactly. Small indexes, or queries whose buckets are too sparse, fall back to
+scoring every listing.
+
+Like the listing store, the index is bounded and evicts its oldest listings.
+Vectors live in a NumPy matrix when NumPy is installed, otherwise in plain
+float arrays. NumPy is imported, and the index's storage allocated, on first
+use rather than at import, since every cold start imports this module.
+"""
+
+import hashlib
+import math
+import operator
+import os
+import random
+import threading
+from array import array
+from collections import OrderedDict
+
+from .listing_store import LISTING_STORE_SIZE
+
+SIMILAR_INDEX_SIZE = int(os.getenv("SIMILAR_INDEX_SIZE", str(LISTING_STORE_SIZE)))
+SIMILAR_LSH_TABLES = int(os.getenv("SIMILAR_LSH_TABLES", "4"))
+SIMILAR_LSH_BITS = int(os.getenv("SIMILAR_LSH_BITS", "12"))
+SIMILAR_DEFAULT_LIMIT = 10
+SIMILAR_MAX_LIMIT = 50
+VECTOR_DIM = 64
+LSH_SEED = 1729  # fixed, so bucket layout doesn't change between restarts
+
+# (feature, weight); weights set how much each one moves the similarity
+NUMERIC_FEATURES = (("price", 1.2), ("miles", 0.8), ("year", 1.0))
+HASHED_FEATURES = (("make", 1.0), ("model", 1.5), ("trim", 0.3), ("bodyStyle", 1.0), ("fuel", 0.7),
+                   ("drivetrain", 0.5))
+REFERENCE_PRICE = 25000.0
+REFERENCE_YEAR = 2018
+MILES_SCALE = 50000.0
+YEAR_SCALE = 5.0
+
+
+_numpy = None  # the numpy module once imported, False when it isn't installed
+
+
+def _load_numpy():
+    """Import NumPy on first use; None when it isn't installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # optional, scoring falls back to pure Python
+            _numpy = False
+    return _numpy or None
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _hash_slot(token):
+    """Slot and sign for a hashed token, stable across processes."""
+    digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    hashed_dims = VECTOR_DIM - len(NUMERIC_FEATURES)
+    return len(NUMERIC_FEATURES) + digest % hashed_dims, 1.0 if digest >> 63 else -1.0
+
+
+def encode_listing(listing):
+    """
+    Feature vector for one simplified listing.
+
+    Returns:
+        list: VECTOR_DIM floats with unit length, or None if the listing has nothing to encode
+    """
+    vehicle = listing.get("vehicle") or {}
+    retail = listing.get("retailListing") or {}
+    vector = [0.0] * VECTOR_DIM
+
+    price, miles, year = _number(retail.get("price")), _number(retail.get("miles")), _number(vehicle.get("year"))
+    numeric = {
+        "price": math.log(price / REFERENCE_PRICE) if price and price > 0 else None,
+        "miles": miles / MILES_SCALE - 1 if miles is not None else None,
+        "year": (year - REFERENCE_YEAR) / YEAR_SCALE if year is not None else None,
+    }
+    for i, (name, weight) in enumerate(NUMERIC_FEATURES):
+        if numeric[name] is not None:
+            vector[i] = weight * max(-3.0, min(3.0, numeric[name]))
+
+    make = str(vehicle.get("make") or "").strip().lower()
+    values = {
+        "make": make,
+        "model": f"{make}/{str(vehicle.get('model') or '').strip().lower()}" if vehicle.get("model") else "",
+        "trim": str(vehicle.get("trim") or "").strip().lower(),
+        "bodyStyle": str(vehicle.get("bodyStyle") or "").strip().lower(),
+        "fuel": str(vehicle.get("fuel") or "").strip().lower(),
+        "drivetrain": str(vehicle.get("drivetrain") or "").strip().lower(),
+    }
+    for name, weight in HASHED_FEATURES:
+        if values[name]:
+            slot, sign = _hash_slot(f"{name}:{values[name]}")
+            vector[slot] += sign * weight
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    if not norm:
+        return None
+    return [v / norm for v in vector]
+
+
+class SimilarIndex:
+    def __init__(self, max_size=SIMILAR_INDEX_SIZE, tables=SIMILAR_LSH_TABLES, bits=SIMILAR_LSH_BITS,
+                 use_numpy=None):
+        """`use_numpy`: None uses NumPy when it is installed, False never does."""
+        self.max_size = max_size
+        self.tables = tables
+        self.bits = bits
+        self.use_numpy = use_numpy
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # vin -> slot, oldest first
+        self._ready = False
+        self._np = None
+
+    def _ensure_ready(self):
+        """Pick the vector backend and allocate storage on first use."""
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            np = _load_numpy() if self.use_numpy is not False else None
+            max_size, tables, bits = self.max_size, self.tables, self.bits
+            self._vins = [None] * max_size
+            self._free = list(range(max_size - 1, -1, -1))
+            if np is not None:
+                self._vectors = np.zeros((max_size, VECTOR_DIM), dtype=np.float32)
+            else:
+                self._vectors = [None] * max_size
+            self._signatures = [None] * max_size
+            self._buckets = [{} for _ in range(tables)]
+
+            rng = random.Random(LSH_SEED)
+            self._planes = [[[rng.gauss(0, 1) for _ in range(VECTOR_DIM)] for _ in range(bits)]
+                            for _ in range(tables)]
+            if np is not None:
+                self._plane_matrix = np.array(self._planes, dtype=np.float32).reshape(tables * bits, VECTOR_DIM)
+            self._np = np
+            self._ready = True
+
+    def _signature(self, vector):
+        np = self._np
+        if np is not None:
+            sides = (self._plane_matrix @ np.asarray(vector, dtype=np.float32)) > 0
+            sides = sides.reshape(self.tables, self.bits)
+            return [sum(1 << b for b in range(self.bits) if row[b]) for row in sides.tolist()]
+        return [sum(1 << b for b, plane in enumerate(planes) if sum(p * v for p, v in zip(plane, vector)) > 0)
+                for planes in self._planes]
+
+    def _remove(self, vin):
+        # Caller must hold the lock
+        slot = self._slots.pop(vin)
+        for table, signature in zip(self._buckets, self._signatures[slot]):
+            bucket = table.get(signature)
+            bucket.discard(slot)
+            if not bucket:
+                del table[signature]
+        self._vins[slot] = None
+        self._signatures[slot] = None
+        self._free.append(slot)
+
+    def add(self, vin, listing):
+        """Index (or re-index) one simplified listing. Returns False if it couldn't be encoded."""
+        vector = encode_listing(listing)
+        if vector is None or not vin:
+            return False
+        self._ensure_ready()
+        signature = self._signature(vector)
+        with self._lock:
+            if vin in self._slots:
+                self._remove(vin)
+            while not self._free:
+                self._remove(next(iter(self._slots)))
+            slot = self._free.pop()
+            self._slots[vin] = slot
+            self._vins[slot] = vin
+            self._vectors[slot] = vector if self._np is not None else array("f", vector)
+            self._signatures[slot] = signature
+            for table, key in zip(self._buckets, signature):
+                table.setdefault(key, set()).add(slot)
+        return True
+
+    def _candidates(self, signature):
+        # Caller must hold the lock
+        found = set()
+        for table, key in zip(self._buckets, signature):
+            for probe in (key, *(key ^ (1 << b) for b in range(self.bits))):
+                found.update(table.get(probe, ()))
+        return found
+
+    def _score(self, vector, slots):
+        # Caller must hold the lock
+        np = self._np
+        if np is not None:
+            slots = list(slots)
+            scores = self._vectors[slots] @ np.asarray(vector, dtype=np.float32)
+            return zip(slots, scores.tolist())
+        return ((slot, sum(map(operator.mul, self._vectors[slot], vector))) for slot in slots)
+
+    def similar(self, vin, limit=SIMILAR_DEFAULT_LIMIT):
+        """
+        Listings most similar to an indexed VIN.
+
+        Returns:
+            list: (vin, cosine similarity) pairs, most similar first, or None if the VIN isn't indexed
+        """
+        with self._lock:
+            slot = self._slots.get(vin)
+            if slot is None:
+                return None
+            vector = self._vectors[slot]
+            if self._np is None:
+                vector = list(vector)
+            candidates = self._candidates(self._signatures[slot])
+            candidates.discard(slot)
+            if len(candidates) < limit * 2:
+                candidates = set(self._slots.values())
+                candidates.discard(slot)
+            scored = sorted(self._score(vector, candidates), key=lambda item: -item[1])[:limit]
+            return [(self._vins[s], round(score, 4)) for s, score in scored]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._slots),
+                "maxSize": self.max_size,
+                "buckets": sum(len(table) for table in self._buckets) if self._ready else 0,
+                # None until the first listing is indexed
+                "numpy": self._np is not None if self._ready else None,
+            }
+
+    def __len__(self):
+        return len(self._slots)
+
+
+similar_index = SimilarIndex()
@@ -0,0 +1,240 @@
+"""
+Cache Snapshots
+===============
+Warm start for new processes. A background thread periodically writes the
+most recently used entries of the recommendation, rating and photo caches,
+plus the market index, to one file at SNAPSHOT_PATH. create_app registers
+that file as the caches' warm source, so a fresh process answers repeat
+queries without paying LLM and Auto.dev latency again.
+
+File layout:
+
+    b"RVSNAP"        magic (6 bytes)
+    format version   uint16, little-endian
+    header length    uint32, little-endian
+    header           JSON: created, versions, entries {namespace: {key: [offset, length, expires]}},
+                     market [offset, length]
+    data             the cached JSON values, back to back
+
+Loading is lazy: nothing is read until the first cache miss, and then only
+the header is parsed; values are sliced out of a memory map when requested,
+so startup cost doesn't grow with the snapshot. Snapshots with another format
+or CACHE_VERSION are skipped, and the market section is skipped when the
+market index's INDEX_VERSION differs.
+"""
+
+import atexit
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from .cache import CACHE_VERSION, get_backend, set_warm_source
+from .market_index import INDEX_VERSION, market_index
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "revvo_snapshot.bin"))
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))  # seconds; 0 disables periodic writes
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "5000"))  # per namespace
+SNAPSHOT_NAMESPACES = ("recommendations", "ratings", "photos")
+
+MAGIC = b"RVSNAP"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<6sHI")
+
+
+class Snapshot:
+    """A snapshot file, opened and memory-mapped on first use."""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._opened = False
+        self._map = None
+        self._data_start = 0
+        self._entries = {}
+        self._market = None
+        self.created = None
+        self.served = 0
+
+    def _ensure_open(self):
+        if self._opened:
+            return
+        with self._lock:
+            if self._opened:
+                return
+            try:
+                self._open()
+            except Exception as e:
+                print(f"⚠️ Failed to load snapshot from {self.path}: {e}")
+                self._close()
+            self._opened = True
+
+    def _open(self):
+        # Caller must hold the lock
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREAMBLE.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            print(f"⚠️ Ignoring snapshot {self.path}: format {version}, expected {FORMAT_VERSION}")
+            self._close()
+            return
+        header = json.loads(self._map[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        versions = header.get("versions", {})
+        if versions.get("cache") != CACHE_VERSION:
+            print(f"⚠️ Ignoring snapshot {self.path}: cache version {versions.get('cache')}")
+            self._close()
+            return
+        self._data_start = _PREAMBLE.size + header_length
+        self._entries = header.get("entries", {})
+        if versions.get("market") == INDEX_VERSION:
+            self._market = header.get("market")
+        self.created = header.get("created")
+        count = sum(len(keys) for keys in self._entries.values())
+        print(f"✅ Loaded snapshot from {self.path}: {count} cache entries")
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._entries = {}
+        self._market = None
+
+    def _read(self, offset, length):
+        start = self._data_start + offset
+        return self._map[start:start + length]
+
+    def lookup(self, namespace, key):
+        """(data, expires) for a live entry, else None."""
+        self._ensure_open()
+        entry = self._entries.get(namespace, {}).get(key)
+        if entry is None:
+            return None
+        offset, length, expires = entry
+        if expires and expires <= time.time():
+            return None
+        self.served += 1
+        return self._read(offset, length), expires
+
+    def items(self, namespace):
+        """Live (key, data, expires) entries of one namespace."""
+        self._ensure_open()
+        now = time.time()
+        return [(key, self._read(offset, length), expires)
+                for key, (offset, length, expires) in self._entries.get(namespace, {}).items()
+                if not expires or expires > now]
+
+    def market(self):
+        """The saved market index data, or None."""
+        self._ensure_open()
+        if self._market is None:
+            return None
+        return json.loads(self._read(*self._market))
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "loaded": self._map is not None,
+            "createdAt": self.created,
+            "entries": {namespace: len(keys) for namespace, keys in self._entries.items()},
+            "served": self.served,
+        }
+
+
+def write_snapshot(path=SNAPSHOT_PATH, backend=None, previous=None, market=None,
+                   namespaces=SNAPSHOT_NAMESPACES, max_entries=SNAPSHOT_MAX_ENTRIES):
+    """
+    Write the live entries of `namespaces` to `path` atomically.
+
+    The newest max_entries per namespace are kept. Entries of the `previous`
+    snapshot that the backend doesn't hold are carried over, but are dropped
+    first when a namespace is over the limit.
+
+    Returns:
+        int: number of cache entries written
+    """
+    backend = backend or get_backend()
+    by_namespace = {namespace: {} for namespace in namespaces}
+    if previous is not None:
+        for namespace in namespaces:
+            for key, data, expires in previous.items(namespace):
+                by_namespace[namespace][key] = (data, expires)
+    for full_key, data, expires in backend.items():
+        namespace, _, key = full_key.partition(":")
+        if namespace in by_namespace:
+            # Re-insert so the backend's order (least recently used first) wins
+            by_namespace[namespace].pop(key, None)
+            by_namespace[namespace][key] = (data, expires)
+
+    chunks = []
+    offset = 0
+    entries = {}
+    for namespace, items in by_namespace.items():
+        entries[namespace] = {}
+        for key, (data, expires) in list(items.items())[-max_entries:]:
+            entries[namespace][key] = [offset, len(data), expires]
+            chunks.append(data)
+            offset += len(data)
+    header = {
+        "created": time.time(),
+        "versions": {"cache": CACHE_VERSION, "market": INDEX_VERSION},
+        "entries": entries,
+    }
+    if market is not None:
+        data = json.dumps(market, separators=(",", ":")).encode("utf-8")
+        header["market"] = [offset, len(data)]
+        chunks.append(data)
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return sum(len(keys) for keys in entries.values())
+
+
+_snapshot = None
+_writer = None
+
+
+def save_snapshot():
+    """Write the current caches and market index to SNAPSHOT_PATH."""
+    try:
+        count = write_snapshot(SNAPSHOT_PATH, previous=_snapshot, market=market_index.export())
+        print(f"💾 Saved snapshot to {SNAPSHOT_PATH}: {count} cache entries")
+    except Exception as e:
+        print(f"⚠️ Failed to save snapshot to {SNAPSHOT_PATH}: {e}")
+
+
+def _write_periodically(interval):
+    while True:
+        time.sleep(interval)
+        save_snapshot()
+
+
+def init_snapshots():
+    """Serve cache misses from the last snapshot and keep writing new ones. Does no file I/O itself."""
+    global _snapshot, _writer
+    if not SNAPSHOT_PATH or _snapshot is not None:
+        return
+    _snapshot = Snapshot(SNAPSHOT_PATH)
+    set_warm_source(_snapshot)
+    market_index.seed = _snapshot.market
+    if SNAPSHOT_INTERVAL > 0:
+        _writer = threading.Thread(target=_write_periodically, args=(SNAPSHOT_INTERVAL,),
+                                   name="snapshot-writer", daemon=True)
+        _writer.start()
+    atexit.register(save_snapshot)
@@ -0,0 +1,214 @@
+"""
+Vehicle Catalog
+===============
+Bundled make/model catalog used by the local recommender and name
+normalization. Prices are approximate base MSRPs (USD) for recent model years;
+year ranges are the US model years covered by Auto.dev-era listings.
+"""
+
+# (make, model, bodyStyle, fuel, baseMsrp, seats, firstYear, lastYear, tags)
+_CATALOG_ROWS = [
+    ("Acura", "ILX", "Sedan", "Gasoline", 27000, 5, 2013, 2022, ("luxury", "compact")),
+    ("Acura", "Integra", "Hatchback", "Gasoline", 32000, 5, 2023, 2025, ("luxury", "compact", "sports")),
+    ("Acura", "TLX", "Sedan", "Gasoline", 45000, 5, 2015, 2025, ("luxury",)),
+    ("Acura", "RDX", "SUV", "Gasoline", 44000, 5, 2013, 2025, ("luxury",)),
+    ("Acura", "MDX", "SUV", "Gasoline", 50000, 7, 2010, 2025, ("luxury", "family")),
+    ("Audi", "A3", "Sedan", "Gasoline", 36000, 5, 2015, 2025, ("luxury", "compact")),
+    ("Audi", "A4", "Sedan", "Gasoline", 42000, 5, 2010, 2025, ("luxury",)),
+    ("Audi", "A6", "Sedan", "Gasoline", 57000, 5, 2010, 2025, ("luxury",)),
+    ("Audi", "Q3", "SUV", "Gasoline", 38000, 5, 2015, 2025, ("luxury", "compact")),
+    ("Audi", "Q5", "SUV", "Gasoline", 46000, 5, 2010, 2025, ("luxury",)),
+    ("Audi", "Q7", "SUV", "Gasoline", 60000, 7, 2010, 2025, ("luxury", "family")),
+    ("Audi", "e-tron", "SUV", "Electric", 70000, 5, 2019, 2024, ("luxury", "electric")),
+    ("BMW", "3 Series", "Sedan", "Gasoline", 45000, 5, 2010, 2025, ("luxury", "sports")),
+    ("BMW", "5 Series", "Sedan", "Gasoline", 58000, 5, 2010, 2025, ("luxury",)),
+    ("BMW", "X1", "SUV", "Gasoline", 40000, 5, 2013, 2025, ("luxury", "compact")),
+    ("BMW", "X3", "SUV", "Gasoline", 48000, 5, 2010, 2025, ("luxury",)),
+    ("BMW", "X5", "SUV", "Gasoline", 66000, 5, 2010, 2025, ("luxury", "family")),
+    ("BMW", "i4", "Sedan", "Electric", 57000, 5, 2022, 2025, ("luxury", "electric", "sports")),
+    ("Buick", "Encore", "SUV", "Gasoline", 25000, 5, 2013, 2025, ("compact",)),
+    ("Buick", "Envision", "SUV", "Gasoline", 36000, 5, 2016, 2025, ()),
+    ("Buick", "Enclave", "SUV", "Gasoline", 45000, 7, 2010, 2025, ("family",)),
+    ("Cadillac", "CT4", "Sedan", "Gasoline", 35000, 5, 2020, 2025, ("luxury", "sports")),
+    ("Cadillac", "XT4", "SUV", "Gasoline", 36000, 5, 2019, 2025, ("luxury",)),
+    ("Cadillac", "XT5", "SUV", "Gasoline", 45000, 5, 2017, 2025, ("luxury",)),
+    ("Cadillac", "Escalade", "SUV", "Gasoline", 85000, 7, 2010, 2025, ("luxury", "family")),
+    ("Chevrolet", "Spark", "Hatchback", "Gasoline", 14000, 4, 2013, 2022, ("compact",)),
+    ("Chevrolet", "Malibu", "Sedan", "Gasoline", 26000, 5, 2010, 2024, ()),
+    ("Chevrolet", "Camaro", "Coupe", "Gasoline", 32000, 4, 2010, 2024, ("sports",)),
+    ("Chevrolet", "Corvette", "Coupe", "Gasoline", 68000, 2, 2010, 2025, ("sports", "luxury")),
+    ("Chevrolet", "Trax", "SUV", "Gasoline", 22000, 5, 2015, 2025, ("compact",)),
+    ("Chevrolet", "Equinox", "SUV", "Gasoline", 28000, 5, 2010, 2025, ()),
+    ("Chevrolet", "Bolt EV", "Hatchback", "Electric", 27000, 5, 2017, 2023, ("electric", "compact")),
+    ("Chevrolet", "Traverse", "SUV", "Gasoline", 38000, 8, 2010, 2025, ("family",)),
+    ("Chevrolet", "Tahoe", "SUV", "Gasoline", 58000, 8, 2010, 2025, ("family", "towing")),
+    ("Chevrolet", "Silverado", "Truck", "Gasoline", 38000, 5, 2010, 2025, ("towing", "offroad")),
+    ("Chevrolet", "Colorado", "Truck", "Gasoline", 31000, 5, 2015, 2025, ("towing", "offroad")),
+    ("Chrysler", "300", "Sedan", "Gasoline", 34000, 5, 2010, 2023, ()),
+    ("Chrysler", "Pacifica", "Minivan", "Gasoline", 40000, 7, 2017, 2025, ("family",)),
+    ("Dodge", "Charger", "Sedan", "Gasoline", 34000, 5, 2010, 2023, ("sports",)),
+    ("Dodge", "Challenger", "Coupe", "Gasoline", 32000, 5, 2010, 2023, ("sports",)),
+    ("Dodge", "Durango", "SUV", "Gasoline", 40000, 7, 2011, 2025, ("family", "towing")),
+    ("Dodge", "Grand Caravan", "Minivan", "Gasoline", 28000, 7, 2010, 2020, ("family",)),
+    ("Ford", "Fiesta", "Hatchback", "Gasoline", 16000, 5, 2011, 2019, ("compact",)),
+    ("Ford", "Focus", "Hatchback", "Gasoline", 19000, 5, 2010, 2018, ("compact",)),
+    ("Ford", "Fusion", "Sedan", "Gasoline", 24000, 5, 2010, 2020, ()),
+    ("Ford", "Mustang", "Coupe", "Gasoline", 32000, 4, 2010, 2025, ("sports",)),
+    ("Ford", "Mustang Mach-E", "SUV", "Electric", 43000, 5, 2021, 2025, ("electric",)),
+    ("Ford", "Escape", "SUV", "Gasoline", 29000, 5, 2010, 2025, ()),
+    ("Ford", "Edge", "SUV", "Gasoline", 37000, 5, 2010, 2024, ()),
+    ("Ford", "Explorer", "SUV", "Gasoline", 38000, 7, 2010, 2025, ("family",)),
+    ("Ford", "Expedition", "SUV", "Gasoline", 58000, 8, 2010, 2025, ("family", "towing")),
+    ("Ford", "F-150", "Truck", "Gasoline", 38000, 5, 2010, 2025, ("towing", "offroad")),
+    ("Ford", "Ranger", "Truck", "Gasoline", 33000, 5, 2019, 2025, ("towing", "offroad")),
+    ("Ford", "Bronco", "SUV", "Gasoline", 39000, 5, 2021, 2025, ("offroad",)),
+    ("Ford", "Maverick", "Truck", "Hybrid", 25000, 5, 2022, 2025, ("compact",)),
+    ("Genesis", "G70", "Sedan", "Gasoline", 42000, 5, 2019, 2025, ("luxury", "sports")),
+    ("Genesis", "G80", "Sedan", "Gasoline", 53000, 5, 2017, 2025, ("luxury",)),
+    ("Genesis", "GV70", "SUV", "Gasoline", 45000, 5, 2022, 2025, ("luxury",)),
+    ("GMC", "Terrain", "SUV", "Gasoline", 30000, 5, 2010, 2025, ()),
+    ("GMC", "Acadia", "SUV", "Gasoline", 38000, 7, 2010, 2025, ("family",)),
+    ("GMC", "Yukon", "SUV", "Gasoline", 60000, 8, 2010, 2025, ("family", "towing")),
+    ("GMC", "Sierra", "Truck", "Gasoline", 40000, 5, 2010, 2025, ("towing", "offroad")),
+    ("GMC", "Canyon", "Truck", "Gasoline", 36000, 5, 2015, 2025, ("towing", "offroad")),
+    ("Honda", "Fit", "Hatchback", "Gasoline", 17000, 5, 2010, 2020, ("compact",)),
+    ("Honda", "Civic", "Sedan", "Gasoline", 24000, 5, 2010, 2025, ("compact",)),
+    ("Honda", "Accord", "Sedan", "Gasoline", 28000, 5, 2010, 2025, ()),
+    ("Honda", "Insight", "Sedan", "Hybrid", 26000, 5, 2019, 2022, ("compact", "electric")),
+    ("Honda", "HR-V", "SUV", "Gasoline", 25000, 5, 2016, 2025, ("compact",)),
+    ("Honda", "CR-V", "SUV", "Gasoline", 30000, 5, 2010, 2025, ()),
+    ("Honda", "Passport", "SUV", "Gasoline", 42000, 5, 2019, 2025, ("offroad",)),
+    ("Honda", "Pilot", "SUV", "Gasoline", 40000, 8, 2010, 2025, ("family",)),
+    ("Honda", "Odyssey", "Minivan", "Gasoline", 38000, 8, 2010, 2025, ("family",)),
+    ("Honda", "Ridgeline", "Truck", "Gasoline", 40000, 5, 2017, 2025, ("towing",)),
+    ("Hyundai", "Accent", "Sedan", "Gasoline", 16000, 5, 2010, 2022, ("compact",)),
+    ("Hyundai", "Elantra", "Sedan", "Gasoline", 21000, 5, 2010, 2025, ("compact",)),
+    ("Hyundai", "Sonata", "Sedan", "Gasoline", 27000, 5, 2010, 2025, ()),
+    ("Hyundai", "Kona", "SUV", "Gasoline", 24000, 5, 2018, 2025, ("compact",)),
+    ("Hyundai", "Tucson", "SUV", "Gasoline", 28000, 5, 2010, 2025, ()),
+    ("Hyundai", "Santa Fe", "SUV", "Gasoline", 33000, 7, 2010, 2025, ("family",)),
+    ("Hyundai", "Palisade", "SUV", "Gasoline", 37000, 8, 2020, 2025, ("family",)),
+    ("Hyundai", "Ioniq 5", "SUV", "Electric", 42000, 5, 2022, 2025, ("electric",)),
+    ("Infiniti", "Q50", "Sedan", "Gasoline", 43000, 5, 2014, 2024, ("luxury", "sports")),
+    ("Infiniti", "QX60", "SUV", "Gasoline", 50000, 7, 2014, 2025, ("luxury", "family")),
+    ("Jeep", "Renegade", "SUV", "Gasoline", 26000, 5, 2015, 2023, ("compact", "offroad")),
+    ("Jeep", "Compass", "SUV", "Gasoline", 28000, 5, 2010, 2025, ("offroad",)),
+    ("Jeep", "Cherokee", "SUV", "Gasoline", 30000, 5, 2014, 2023, ("offroad",)),
+    ("Jeep", "Grand Cherokee", "SUV", "Gasoline", 40000, 5, 2010, 2025, ("offroad", "towing")),
+    ("Jeep", "Wrangler", "SUV", "Gasoline", 33000, 4, 2010, 2025, ("offroad",)),
+    ("Jeep", "Gladiator", "Truck", "Gasoline", 40000, 5, 2020, 2025, ("offroad", "towing")),
+    ("Kia", "Rio", "Sedan", "Gasoline", 17000, 5, 2010, 2023, ("compact",)),
+    ("Kia", "Forte", "Sedan", "Gasoline", 20000, 5, 2010, 2024, ("compact",)),
+    ("Kia", "K5", "Sedan", "Gasoline", 26000, 5, 2021, 2025, ()),
+    ("Kia", "Stinger", "Sedan", "Gasoline", 37000, 5, 2018, 2023, ("sports",)),
+    ("Kia", "Soul", "Hatchback", "Gasoline", 20000, 5, 2010, 2025, ("compact",)),
+    ("Kia", "Seltos", "SUV", "Gasoline", 25000, 5, 2021, 2025, ("compact",)),
+    ("Kia", "Sportage", "SUV", "Gasoline", 28000, 5, 2010, 2025, ()),
+    ("Kia", "Sorento", "SUV", "Gasoline", 32000, 7, 2011, 2025, ("family",)),
+    ("Kia", "Telluride", "SUV", "Gasoline", 37000, 8, 2020, 2025, ("family",)),
+    ("Kia", "Carnival", "Minivan", "Gasoline", 35000, 8, 2022, 2025, ("family",)),
+    ("Kia", "EV6", "SUV", "Electric", 43000, 5, 2022, 2025, ("electric",)),
+    ("Lexus", "IS", "Sedan", "Gasoline", 40000, 5, 2010, 2025, ("luxury", "sports")),
+    ("Lexus", "ES", "Sedan", "Gasoline", 43000, 5, 2010, 2025, ("luxury",)),
+    ("Lexus", "UX", "SUV", "Hybrid", 36000, 5, 2019, 2025, ("luxury", "compact", "electric")),
+    ("Lexus", "NX", "SUV", "Gasoline", 41000, 5, 2015, 2025, ("luxury",)),
+    ("Lexus", "RX", "SUV", "Gasoline", 49000, 5, 2010, 2025, ("luxury",)),
+    ("Lexus", "GX", "SUV", "Gasoline", 60000, 7, 2010, 2025, ("luxury", "offroad")),
+    ("Lincoln", "Corsair", "SUV", "Gasoline", 39000, 5, 2020, 2025, ("luxury",)),
+    ("Lincoln", "Nautilus", "SUV", "Gasoline", 47000, 5, 2019, 2025, ("luxury",)),
+    ("Lincoln", "Aviator", "SUV", "Gasoline", 54000, 7, 2020, 2025, ("luxury", "family")),
+    ("Lincoln", "Navigator", "SUV", "Gasoline", 80000, 8, 2010, 2025, ("luxury", "family")),
+    ("Mazda", "Mazda3", "Sedan", "Gasoline", 24000, 5, 2010, 2025, ("compact",)),
+    ("Mazda", "Mazda6", "Sedan", "Gasoline", 26000, 5, 2010, 2021, ()),
+    ("Mazda", "MX-5 Miata", "Convertible", "Gasoline", 29000, 2, 2010, 2025, ("sports",)),
+    ("Mazda", "CX-30", "SUV", "Gasoline", 25000, 5, 2020, 2025, ("compact",)),
+    ("Mazda", "CX-5", "SUV", "Gasoline", 29000, 5, 2013, 2025, ()),
+    ("Mazda", "CX-50", "SUV", "Gasoline", 30000, 5, 2023, 2025, ("offroad",)),
+    ("Mazda", "CX-9", "SUV", "Gasoline", 38000, 7, 2010, 2023, ("family",)),
+    ("Mercedes-Benz", "A-Class", "Sedan", "Gasoline", 35000, 5, 2019, 2022, ("luxury", "compact")),
+    ("Mercedes-Benz", "C-Class", "Sedan", "Gasoline", 46000, 5, 2010, 2025, ("luxury",)),
+    ("Mercedes-Benz", "E-Class", "Sedan", "Gasoline", 58000, 5, 2010, 2025, ("luxury",)),
+    ("Mercedes-Benz", "GLA", "SUV", "Gasoline", 40000, 5, 2015, 2025, ("luxury", "compact")),
+    ("Mercedes-Benz", "GLC", "SUV", "Gasoline", 48000, 5, 2016, 2025, ("luxury",)),
+    ("Mercedes-Benz", "GLE", "SUV", "Gasoline", 62000, 5, 2016, 2025, ("luxury",)),
+    ("Mini", "Cooper", "Hatchback", "Gasoline", 26000, 4, 2010, 2025, ("compact", "sports")),
+    ("Mini", "Countryman", "SUV", "Gasoline", 32000, 5, 2011, 2025, ("compact",)),
+    ("Mitsubishi", "Mirage", "Hatchback", "Gasoline", 17000, 5, 2014, 2025, ("compact",)),
+    ("Mitsubishi", "Outlander", "SUV", "Gasoline", 30000, 7, 2010, 2025, ("family",)),
+    ("Mitsubishi", "Outlander Sport", "SUV", "Gasoline", 24000, 5, 2011, 2024, ("compact",)),
+    ("Nissan", "Versa", "Sedan", "Gasoline", 17000, 5, 2010, 2025, ("compact",)),
+    ("Nissan", "Sentra", "Sedan", "Gasoline", 21000, 5, 2010, 2025, ("compact",)),
+    ("Nissan", "Altima", "Sedan", "Gasoline", 27000, 5, 2010, 2025, ()),
+    ("Nissan", "Maxima", "Sedan", "Gasoline", 39000, 5, 2010, 2023, ("sports",)),
+    ("Nissan", "Leaf", "Hatchback", "Electric", 29000, 5, 2011, 2025, ("electric", "compact")),
+    ("Nissan", "Kicks", "SUV", "Gasoline", 21000, 5, 2018, 2025, ("compact",)),
+    ("Nissan", "Rogue", "SUV", "Gasoline", 29000, 5, 2010, 2025, ()),
+    ("Nissan", "Murano", "SUV", "Gasoline", 38000, 5, 2010, 2024, ()),
+    ("Nissan", "Pathfinder", "SUV", "Gasoline", 37000, 8, 2010, 2025, ("family",)),
+    ("Nissan", "Frontier", "Truck", "Gasoline", 31000, 5, 2010, 2025, ("towing", "offroad")),
+    ("Porsche", "718", "Coupe", "Gasoline", 70000, 2, 2017, 2025, ("sports", "luxury")),
+    ("Porsche", "911", "Coupe", "Gasoline", 115000, 4, 2010, 2025, ("sports", "luxury")),
+    ("Porsche", "Macan", "SUV", "Gasoline", 62000, 5, 2015, 2025, ("luxury", "sports")),
+    ("Porsche", "Cayenne", "SUV", "Gasoline", 80000, 5, 2010, 2025, ("luxury",)),
+    ("Porsche", "Taycan", "Sedan", "Electric", 90000, 4, 2020, 2025, ("luxury", "electric", "sports")),
+    ("Ram", "1500", "Truck", "Gasoline", 40000, 5, 2011, 2025, ("towing", "offroad")),
+    ("Ram", "2500", "Truck", "Diesel", 46000, 5, 2011, 2025, ("towing",)),
+    ("Rivian", "R1S", "SUV", "Electric", 76000, 7, 2022, 2025, ("electric", "luxury", "offroad")),
+    ("Subaru", "Impreza", "Hatchback", "Gasoline", 23000, 5, 2010, 2025, ("compact",)),
+    ("Subaru", "Legacy", "Sedan", "Gasoline", 25000, 5, 2010, 2025, ()),
+    ("Subaru", "WRX", "Sedan", "Gasoline", 33000, 5, 2015, 2025, ("sports",)),
+    ("Subaru", "BRZ", "Coupe", "Gasoline", 31000, 4, 2013, 2025, ("sports",)),
+    ("Subaru", "Crosstrek", "SUV", "Gasoline", 26000, 5, 2013, 2025, ("compact", "offroad")),
+    ("Subaru", "Forester", "SUV", "Gasoline", 30000, 5, 2010, 2025, ("offroad",)),
+    ("Subaru", "Outback", "Wagon", "Gasoline", 30000, 5, 2010, 2025, ("offroad",)),
+    ("Subaru", "Ascent", "SUV", "Gasoline", 36000, 8, 2019, 2025, ("family",)),
+    ("Tesla", "Model 3", "Sedan", "Electric", 40000, 5, 2017, 2025, ("electric",)),
+    ("Tesla", "Model Y", "SUV", "Electric", 45000, 5, 2020, 2025, ("electric",)),
+    ("Tesla", "Model S", "Sedan", "Electric", 75000, 5, 2012, 2025, ("electric", "luxury", "sports")),
+    ("Tesla", "Model X", "SUV", "Electric", 80000, 7, 2016, 2025, ("electric", "luxury", "family")),
+    ("Toyota", "Yaris", "Sedan", "Gasoline", 16000, 5, 2010, 2020, ("compact",)),
+    ("Toyota", "Corolla", "Sedan", "Gasoline", 22000, 5, 2010, 2025, ("compact",)),
+    ("Toyota", "Prius", "Hatchback", "Hybrid", 28000, 5, 2010, 2025, ("compact", "electric")),
+    ("Toyota", "Camry", "Sedan", "Gasoline", 28000, 5, 2010, 2025, ()),
+    ("Toyota", "Avalon", "Sedan", "Gasoline", 37000, 5, 2010, 2022, ("luxury",)),
+    ("Toyota", "GR86", "Coupe", "Gasoline", 30000, 4, 2022, 2025, ("sports",)),
+    ("Toyota", "Supra", "Coupe", "Gasoline", 46000, 2, 2020, 2025, ("sports",)),
+    ("Toyota", "C-HR", "SUV", "Gasoline", 24000, 5, 2018, 2022, ("compact",)),
+    ("Toyota", "RAV4", "SUV", "Gasoline", 30000, 5, 2010, 2025, ()),
+    ("Toyota", "RAV4 Hybrid", "SUV", "Hybrid", 33000, 5, 2016, 2025, ("electric",)),
+    ("Toyota", "Highlander", "SUV", "Gasoline", 40000, 8, 2010, 2025, ("family",)),
+    ("Toyota", "4Runner", "SUV", "Gasoline", 42000, 5, 2010, 2025, ("offroad",)),
+    ("Toyota", "Sequoia", "SUV", "Hybrid", 62000, 8, 2010, 2025, ("family", "towing")),
+    ("Toyota", "Sienna", "Minivan", "Hybrid", 39000, 8, 2010, 2025, ("family",)),
+    ("Toyota", "Tacoma", "Truck", "Gasoline", 33000, 5, 2010, 2025, ("towing", "offroad")),
+    ("Toyota", "Tundra", "Truck", "Gasoline", 42000, 5, 2010, 2025, ("towing", "offroad")),
+    ("Volkswagen", "Jetta", "Sedan", "Gasoline", 22000, 5, 2010, 2025, ("compact",)),
+    ("Volkswagen", "Passat", "Sedan", "Gasoline", 26000, 5, 2010, 2022, ()),
+    ("Volkswagen", "Golf", "Hatchback", "Gasoline", 24000, 5, 2010, 2021, ("compact",)),
+    ("Volkswagen", "GTI", "Hatchback", "Gasoline", 32000, 5, 2010, 2025, ("sports", "compact")),
+    ("Volkswagen", "ID.4", "SUV", "Electric", 40000, 5, 2021, 2025, ("electric",)),
+    ("Volkswagen", "Taos", "SUV", "Gasoline", 25000, 5, 2022, 2025, ("compact",)),
+    ("Volkswagen", "Tiguan", "SUV", "Gasoline", 29000, 7, 2010, 2025, ()),
+    ("Volkswagen", "Atlas", "SUV", "Gasoline", 38000, 7, 2018, 2025, ("family",)),
+    ("Volvo", "S60", "Sedan", "Gasoline", 43000, 5, 2010, 2025, ("luxury",)),
+    ("Volvo", "XC40", "SUV", "Gasoline", 39000, 5, 2019, 2025, ("luxury", "compact")),
+    ("Volvo", "XC60", "SUV", "Gasoline", 46000, 5, 2010, 2025, ("luxury",)),
+    ("Volvo", "XC90", "SUV", "Gasoline", 58000, 7, 2010, 2025, ("luxury", "family")),
+]
+
+CATALOG = [
+    {
+        "make": make,
+        "model": model,
+        "bodyStyle": body_style,
+        "fuel": fuel,
+        "baseMsrp": msrp,
+        "seats": seats,
+        "firstYear": first_year,
+        "lastYear": last_year,
+        "tags": set(tags),
+    }
+    for make, model, body_style, fuel, msrp, seats, first_year, last_year, tags in _CATALOG_ROWS
+]
+
+MAKES = sorted({entry["make"] for entry in CATALOG})
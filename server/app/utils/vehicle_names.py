@@ -0,0 +1,228 @@
+"""
+Vehicle Name Normalization
+==========================
+Maps free-form make/model names (from the LLM or user typos) onto the
+vocabulary Auto.dev expects, before any upstream search is made.
+
+Lookup order for each name:
+1. exact match on a normalized key (lowercase, alphanumerics only), which
+   covers "CRV" / "cr-v" / "CR V", plus explicit aliases ("Chevy", "F150")
+2. longest leading-word match, when every dropped word is a known trim
+   word ("Civic EX-L", "Camry XLE AWD")
+3. fuzzy match through a precomputed trigram index, for single-word names
+   only, and only when one name clearly wins ("Corrolla", "Toyta")
+
+Anything else is passed through unchanged. Many real models extend a
+catalog name with another word ("Corolla Cross", "Bronco Sport", "Camry
+Hybrid", "CX-90"), so a multi-word name that isn't matched exactly is more
+likely a model missing from the catalog than a typo.
+"""
+
+import re
+import threading
+from collections import defaultdict
+
+from .vehicle_catalog import CATALOG
+
+MAKE_ALIASES = {
+    "chevy": "Chevrolet",
+    "vw": "Volkswagen",
+    "volkswagon": "Volkswagen",
+    "mercedes": "Mercedes-Benz",
+    "benz": "Mercedes-Benz",
+    "mb": "Mercedes-Benz",
+    "landrover": "Land Rover",
+    "range rover": "Land Rover",
+    "alfa": "Alfa Romeo",
+    "mini cooper": "Mini",
+    "dodge ram": "Ram",
+}
+
+MODEL_ALIASES = {
+    ("Mazda", "3"): "Mazda3",
+    ("Mazda", "6"): "Mazda6",
+    ("Mazda", "miata"): "MX-5 Miata",
+    ("Mazda", "mx5"): "MX-5 Miata",
+    ("Chevrolet", "bolt"): "Bolt EV",
+    ("Ford", "mach e"): "Mustang Mach-E",
+    ("Ford", "mache"): "Mustang Mach-E",
+    ("Toyota", "rav4 hybrid"): "RAV4 Hybrid",
+    ("BMW", "3"): "3 Series",
+    ("BMW", "5"): "5 Series",
+    ("BMW", "3series"): "3 Series",
+    ("BMW", "5series"): "5 Series",
+    ("Mercedes-Benz", "c"): "C-Class",
+    ("Mercedes-Benz", "e"): "E-Class",
+    ("Mercedes-Benz", "a"): "A-Class",
+    ("Dodge", "caravan"): "Grand Caravan",
+    ("Ram", "ram 1500"): "1500",
+    ("Ram", "ram 2500"): "2500",
+}
+
+FUZZY_THRESHOLD = 0.5
+FUZZY_MARGIN = 0.15  # the best fuzzy match must beat the runner-up by this much
+# Words that only name a trim or drivetrain, never a distinct model
+TRIM_WORDS = frozenset({
+    "base", "ex", "exl", "l", "lx", "le", "xle", "xse", "se", "sel", "s", "sv", "sl", "sr", "sr5", "trd", "lt",
+    "ls", "ltz", "rs", "premier", "platinum", "limited", "touring", "xlt", "lariat", "sxt", "gt", "awd", "fwd",
+    "rwd", "4wd", "2wd", "4x4", "4x2", "sedan", "hatchback", "coupe",
+})
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_key(name):
+    """Lowercase alphanumerics only: 'CR-V' -> 'crv'."""
+    return "".join(_WORD.findall((name or "").lower()))
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over a fixed vocabulary, scored by Dice similarity."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._grams = [_trigrams(normalize_key(n)) for n in self.names]
+        self._postings = defaultdict(list)
+        for i, grams in enumerate(self._grams):
+            for gram in grams:
+                self._postings[gram].append(i)
+
+    def best(self, query, threshold=FUZZY_THRESHOLD, margin=FUZZY_MARGIN):
+        """Closest name and its score; None unless it clears `threshold` and beats the runner-up by `margin`."""
+        grams = _trigrams(normalize_key(query))
+        if not grams:
+            return None, 0.0
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                shared[i] += 1
+        best_name, best_score, runner_up = None, 0.0, 0.0
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._grams[i]))
+            if score > best_score:
+                best_name, best_score, runner_up = self.names[i], score, best_score
+            elif score > runner_up:
+                runner_up = score
+        if best_score < threshold or best_score - runner_up < margin:
+            return None, best_score
+        return best_name, best_score
+
+
+class VehicleNameIndex:
+    def __init__(self, catalog=CATALOG):
+        self._makes = {}
+        self._models = defaultdict(dict)  # make -> {normalized key: canonical model}
+        for entry in catalog:
+            self._makes[normalize_key(entry["make"])] = entry["make"]
+            self._models[entry["make"]][normalize_key(entry["model"])] = entry["model"]
+        for alias, make in MAKE_ALIASES.items():
+            self._makes[normalize_key(alias)] = make
+        for (make, alias), model in MODEL_ALIASES.items():
+            self._models[make][normalize_key(alias)] = model
+
+        self._make_index = TrigramIndex(sorted(set(self._makes.values())))
+        self._model_indexes = {make: TrigramIndex(sorted(set(models.values())))
+                               for make, models in self._models.items()}
+
+    def make(self, name):
+        """Canonical make for `name`, or None if unknown."""
+        key = normalize_key(name)
+        if not key:
+            return None
+        if key in self._makes:
+            return self._makes[key]
+        # "Mercedes Benz C300" style inputs: try leading words
+        words = _WORD.findall(name.lower())
+        for n in range(len(words) - 1, 0, -1):
+            candidate = self._makes.get("".join(words[:n]))
+            if candidate:
+                return candidate
+        if len(words) != 1:
+            return None
+        return self._make_index.best(name)[0]
+
+    def model(self, make, name):
+        """Canonical model of `make` for `name`, or None if unknown."""
+        models = self._models.get(make)
+        key = normalize_key(name)
+        if not models or not key:
+            return None
+        if key in models:
+            return models[key]
+        # The make is sometimes repeated in the model ("Honda Civic")
+        make_key = normalize_key(make)
+        if key.startswith(make_key) and key[len(make_key):] in models:
+            return models[key[len(make_key):]]
+        # Drop trailing trim words, longest prefix first ("Civic EX-L" -> "Civic")
+        words = _WORD.findall(name.lower())
+        for n in range(len(words) - 1, 0, -1):
+            candidate = models.get("".join(words[:n]))
+            if candidate and TRIM_WORDS.issuperset(words[n:]):
+                return candidate
+        if len(words) != 1:
+            return None
+        return self._model_indexes[make].best(name)[0]
+
+    def normalize(self, make, model):
+        """
+        Returns:
+            tuple: (make, model, changed) with canonical names where they could be matched;
+                   `changed` is False for fixes of case or punctuation alone ("crv" -> "CR-V")
+        """
+        canonical_make = self.make(make) or make
+        canonical_model = (self.model(canonical_make, model) if model else None) or model
+        changed = ((normalize_key(canonical_make), normalize_key(canonical_model))
+                   != (normalize_key(make), normalize_key(model)))
+        return canonical_make, canonical_model, changed
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_name_index():
+    """Build the index on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VehicleNameIndex()
+    return _index
+
+
+def normalize_recommendation(rec):
+    """Return a copy of a make/model/year recommendation with canonical names, and whether it changed."""
+    make, model, changed = get_name_index().normalize(rec.get("make"), rec.get("model"))
+    if (make, model) != (rec.get("make"), rec.get("model")):
+        print(f"🔤 Normalized {rec.get('make')} {rec.get('model')} -> {make} {model}")
+    return {**rec, "make": make, "model": model}, changed
+
+
+_metrics = {"searches": 0, "normalized": 0, "rescued": 0, "normalizedEmpty": 0, "empty": 0}
+_metrics_lock = threading.Lock()
+
+
+def record_search(normalized, found):
+    """
+    Count one upstream search. A search is "rescued" when its names were
+    normalized and it returned listings.
+    """
+    with _metrics_lock:
+        _metrics["searches"] += 1
+        if not found:
+            _metrics["empty"] += 1
+        if normalized:
+            _metrics["normalized"] += 1
+            if found:
+                _metrics["rescued"] += 1
+            else:
+                _metrics["normalizedEmpty"] += 1
+
+
+def search_metrics():
+    with _metrics_lock:
+        return dict(_metrics)
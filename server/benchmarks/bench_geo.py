@@ -0,0 +1,83 @@
+"""
+Zip Proximity Benchmark
+=======================
+Builds a zip index from N synthetic centroids spread over the contiguous US
+(about the size of the ZCTA gazetteer) and times loading it, locating zips,
+radius queries and ranking a page of listings by distance.
+
+Usage:
+    python server/benchmarks/bench_geo.py [--zips 33000] [--radius 50]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils import geo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zips", type=int, default=33000)
+    parser.add_argument("--radius", type=float, default=geo.DEFAULT_RADIUS_MILES)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    numbers = rng.sample(range(1000, 99999), args.zips)
+    records = [(f"{n:05d}", rng.uniform(25, 49), rng.uniform(-124, -67), geo.zip_to_state(f"{n:05d}") or "XX")
+               for n in numbers]
+
+    path = os.path.join(tempfile.mkdtemp(), "zips.bin")
+    start = time.perf_counter()
+    count = geo.write_zip_index(path, records)
+    write_ms = (time.perf_counter() - start) * 1000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = geo.ZipIndex(path)
+        start = time.perf_counter()
+        index.locate(records[0][0])
+        load_ms = (time.perf_counter() - start) * 1000
+    geo.zip_index = index
+
+    zips = [rng.choice(records)[0] for _ in range(args.queries)]
+    start = time.perf_counter()
+    origins = [index.locate(z) for z in zips]
+    locate_us = (time.perf_counter() - start) / len(zips) * 1e6
+
+    start = time.perf_counter()
+    found = [len(index.within(lat, lon, args.radius)) for lat, lon, _ in origins]
+    within_ms = (time.perf_counter() - start) / len(origins) * 1000
+
+    start = time.perf_counter()
+    for z in zips:
+        geo.resolve_zip_search(z, args.radius)
+    resolve_ms = (time.perf_counter() - start) / len(zips) * 1000
+
+    listings = {f"VIN{i}": {"retailListing": {"zip": rng.choice(records)[0]}} for i in range(100)}
+    start = time.perf_counter()
+    for lat, lon, _ in origins[:100]:
+        geo.rank_by_distance(listings, (lat, lon), args.radius)
+    rank_ms = (time.perf_counter() - start) / min(100, len(origins)) * 1000
+
+    print("=" * 60)
+    print(f"Zip index with {count:,} zips, {os.path.getsize(path) / 1e6:.2f} MB, radius {args.radius:g} mi")
+    print("=" * 60)
+    print(f"write                {write_ms:8.1f} ms")
+    print(f"load (first lookup)  {load_ms:8.3f} ms")
+    print(f"locate               {locate_us:8.1f} µs each")
+    print(f"within               {within_ms:8.3f} ms each  ({sum(found) / len(found):.0f} zips on average)")
+    print(f"resolve_zip_search   {resolve_ms:8.3f} ms each")
+    print(f"rank 100 listings    {rank_ms:8.3f} ms each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+JSON Serialization Benchmark
+============================
+Times jsonify of a realistic /listings/ response (50 enriched VINs with
+ratings, insurance breakdowns and photo galleries) with Flask's stdlib JSON
+provider and with the orjson-backed provider.
+
+Usage:
+    python server/benchmarks/bench_json.py [--listings 50] [--iterations 200]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask, jsonify  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.utils.json_provider import FastJSONProvider, fast_json_enabled  # noqa: E402
+from app.utils.clean_data import get_filter_data  # noqa: E402
+from bench_payload import enriched_listing  # noqa: E402
+
+
+def time_jsonify(provider_class, payload, iterations):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        body = jsonify(payload).get_data()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            jsonify(payload).get_data()
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    listings = dict(enriched_listing(rng, i, 20) for i in range(args.listings))
+    with contextlib.redirect_stdout(io.StringIO()):
+        filters = get_filter_data(listings)
+    payload = {"items": len(listings), "listings": listings, "filters": filters}
+
+    print("=" * 60)
+    print(f"jsonify of a {args.listings}-VIN /listings/ response, {args.iterations} iterations")
+    print("=" * 60)
+    stdlib_ms, stdlib_size = time_jsonify(DefaultJSONProvider, payload, args.iterations)
+    print(f"stdlib json   {stdlib_ms:7.3f} ms/response  {stdlib_size:,} B")
+    if not fast_json_enabled():
+        print("orjson        not installed (or JSON_SERIALIZER=stdlib)")
+        return
+    fast_ms, fast_size = time_jsonify(FastJSONProvider, payload, args.iterations)
+    print(f"orjson        {fast_ms:7.3f} ms/response  {fast_size:,} B  ({stdlib_ms / fast_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
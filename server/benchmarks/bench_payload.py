@@ -0,0 +1,87 @@
+"""
+Listing Payload Size Benchmark
+==============================
+Measures the /listings/ response body for synthetic enriched listings in the
+full layout, with the `grid` field preset, and in the compact columnar
+layout, raw and gzipped.
+
+Usage:
+    python server/benchmarks/bench_payload.py [--listings 50] [--images 20]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.insurance_prediction import estimate_annual_insurance  # noqa: E402
+from app.utils.projection import parse_fields, shape_listings  # noqa: E402
+from app.utils.rating_engine import estimate_ratings  # noqa: E402
+from bench_rating_engine import synthetic_listing  # noqa: E402
+
+COLORS = ["Black", "White", "Silver", "Gray", "Blue", "Red"]
+
+
+def enriched_listing(rng, index, images):
+    """A listing in the shape clean_listings returns."""
+    car = synthetic_listing(rng)
+    vin = f"1HGCV1F3{index:09d}"
+    car["vehicle"].update({
+        "vin": vin, "trim": "EX", "type": "Used", "doors": 4, "seats": 5, "drivetrain": "FWD",
+        "engine": "1.5L I4", "transmission": "CVT", "exteriorColor": rng.choice(COLORS),
+        "interiorColor": "Black",
+    })
+    car["retailListing"].update({
+        "carfaxUrl": f"https://www.carfax.com/VehicleHistory/p/Report.cfx?vin={vin}",
+        "city": "Princeton", "dealer": "Princeton Honda", "used": True, "zip": "08540",
+        "listing": f"https://www.example-dealer.com/used/{vin}.htm",
+        "images": [f"https://retail.photos.vehicletools.com/{vin}/{i}.jpg" for i in range(images)],
+    })
+    car["history"].update({"accidents": [], "personalUse": True, "usageType": "Personal"})
+    car["ratings"] = estimate_ratings(car)
+    car["insurance"] = estimate_annual_insurance(car)
+    return vin, car
+
+
+def encode(body):
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=50)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    listings = dict(enriched_listing(rng, i, args.images) for i in range(args.listings))
+    grid = parse_fields("grid")
+
+    variants = [
+        ("full", shape_listings(listings)),
+        ("fields=grid", shape_listings(listings, grid)),
+        ("fields=grid&format=compact", shape_listings(listings, grid, "compact")),
+    ]
+
+    print("=" * 60)
+    print(f"/listings/ payload, {args.listings} listings, {args.images} images each")
+    print("=" * 60)
+    baseline = None
+    for name, body in variants:
+        start = time.perf_counter()
+        raw = encode({"items": len(listings), "listings": body})
+        encode_ms = (time.perf_counter() - start) * 1000
+        zipped = len(gzip.compress(raw))
+        baseline = baseline or len(raw)
+        print(f"{name:<28} {len(raw):>9,} B  gzip {zipped:>8,} B  "
+              f"{baseline / len(raw):5.1f}x smaller  encode {encode_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Local Rating Engine Benchmark
+=============================
+Rates a batch of synthetic listings with the table-driven engine.
+
+Usage:
+    python server/benchmarks/bench_rating_engine.py [--vehicles 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.rating_engine import MODEL_PROFILES, estimate_ratings  # noqa: E402
+
+BODY_STYLES = ["Sedan", "SUV", "Truck", "Hatchback", "Coupe", "Minivan"]
+FUELS = ["Gasoline", "Gasoline", "Gasoline", "Hybrid", "Electric"]
+STATES = ["NJ", "NY", "CA", "TX", "FL", "PA"]
+
+
+def synthetic_listing(rng):
+    make, model = rng.choice(list(MODEL_PROFILES))
+    year = rng.randint(2010, 2025)
+    msrp = rng.randint(20000, 70000)
+    age = 2025 - year
+    return {
+        "vehicle": {
+            "make": make, "model": model, "year": year, "baseMsrp": msrp,
+            "bodyStyle": rng.choice(BODY_STYLES), "fuel": rng.choice(FUELS),
+            "cylinders": rng.choice([4, 4, 6, 8, None]),
+        },
+        "retailListing": {
+            "price": int(msrp * max(0.2, 1 - 0.08 * age) * rng.uniform(0.85, 1.15)),
+            "miles": int(age * rng.uniform(6000, 18000)),
+            "state": rng.choice(STATES), "cpo": rng.random() < 0.1,
+        },
+        "history": {"accidentCount": rng.choice([0, 0, 0, 1, 2]), "ownerCount": rng.randint(1, 4),
+                    "oneOwner": rng.random() < 0.4},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cars = [synthetic_listing(rng) for _ in range(args.vehicles)]
+
+    start = time.perf_counter()
+    ratings = [estimate_ratings(car) for car in cars]
+    elapsed = time.perf_counter() - start
+
+    overall = sorted(r["overallRating"] for r in ratings)
+    print("=" * 60)
+    print("LOCAL RATING ENGINE BENCHMARK")
+    print("=" * 60)
+    print(f"   Vehicles rated:  {len(ratings):,}")
+    print(f"   Total time:      {elapsed * 1000:.1f} ms")
+    print(f"   Per vehicle:     {elapsed / len(ratings) * 1e6:.1f} µs")
+    print(f"   Overall rating:  min {overall[0]:.2f} / median {overall[len(overall) // 2]:.2f} / max {overall[-1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup Benchmark
+=================
+Measures the cold-start cost of the Vercel entry point (api/index.py) in fresh
+interpreters, with the app built lazily (default) and eagerly (LAZY_APP_INIT=0).
+
+Usage:
+    python server/benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "api"))
+
+# Runs inside the child interpreter; prints one JSON line of timings
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import index
+t1 = time.perf_counter()
+loaded = {m: m in sys.modules for m in ("flask", "openai", "requests")}
+index.handler({"method": "OPTIONS", "path": "/listings/", "headers": {"Origin": "http://localhost:5173"}})
+t2 = time.perf_counter()
+index.handler({"method": "GET", "path": "/", "headers": {}})
+t3 = time.perf_counter()
+print(json.dumps({
+    "importMs": (t1 - t0) * 1000,
+    "optionsMs": (t2 - t1) * 1000,
+    "firstGetMs": (t3 - t2) * 1000,
+    "totalMs": (t3 - t0) * 1000,
+    "loadedAtImport": loaded,
+}))
+"""
+
+
+def run_once(lazy):
+    env = dict(os.environ, LAZY_APP_INIT="1" if lazy else "0")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("COLD START BENCHMARK (median of %d runs)" % args.runs)
+    print("=" * 60)
+    for label, lazy in (("eager", False), ("lazy", True)):
+        runs = [run_once(lazy) for _ in range(args.runs)]
+        median = {k: statistics.median(r[k] for r in runs) for k in ("importMs", "optionsMs", "firstGetMs", "totalMs")}
+        print(f"\n{label}:")
+        print(f"   import api/index.py : {median['importMs']:8.1f} ms")
+        print(f"   first OPTIONS       : {median['optionsMs']:8.1f} ms")
+        print(f"   first GET /         : {median['firstGetMs']:8.1f} ms")
+        print(f"   total               : {median['totalMs']:8.1f} ms")
+        print(f"   loaded at import    : {runs[-1]['loadedAtImport']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Local Recommender Evaluation
+============================
+Replays logged LLM recommendations (written when RECOMMENDATION_LOG_PATH is
+set) through the local recommender and reports how often it agrees.
+
+Usage:
+    python server/benchmarks/eval_recommender.py path/to/recommendations.jsonl [--threshold 0.6]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.recommender import RECOMMENDER_MIN_CONFIDENCE, recommend  # noqa: E402
+
+
+def _key(rec, with_model=True):
+    make = (rec.get("make") or "").strip().lower()
+    return (make, (rec.get("model") or "").strip().lower()) if with_model else make
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="JSONL file of logged LLM recommendations")
+    parser.add_argument("--threshold", type=float, default=RECOMMENDER_MIN_CONFIDENCE)
+    args = parser.parse_args()
+
+    make_hits, model_hits, year_gaps, latencies, confidences = [], [], [], [], []
+    over_budget = total_picks = confident = 0
+
+    with open(args.log) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        print("No logged recommendations to evaluate")
+        return
+
+    for entry in entries:
+        query, llm = entry["query"], entry["llm"]
+        start = time.perf_counter()
+        local = recommend(query.get("state"), query.get("budget"), query.get("primary_use"), query.get("comfort"))
+        latencies.append((time.perf_counter() - start) * 1000)
+        confidences.append(local["confidence"])
+        confident += local["confidence"] >= args.threshold
+
+        llm_makes = {_key(r, False) for r in llm}
+        llm_models = {_key(r): r for r in llm}
+        picks = local["recommendations"]
+        make_hits.append(sum(_key(p, False) in llm_makes for p in picks) / max(len(picks), 1))
+        model_hits.append(sum(_key(p) in llm_models for p in picks) / max(len(picks), 1))
+        for p in picks:
+            match = llm_models.get(_key(p))
+            if match and isinstance(match.get("year"), int) and p.get("year"):
+                year_gaps.append(abs(match["year"] - p["year"]))
+            budget = query.get("budget")
+            total_picks += 1
+            if budget and p["price"] > float(budget):
+                over_budget += 1
+
+    print("=" * 60)
+    print(f"LOCAL vs LLM RECOMMENDATIONS ({len(entries)} logged queries)")
+    print("=" * 60)
+    print(f"   Make agreement@3:        {statistics.mean(make_hits):.1%}")
+    print(f"   Make+model agreement@3:  {statistics.mean(model_hits):.1%}")
+    if year_gaps:
+        print(f"   Mean |year gap| (agreed): {statistics.mean(year_gaps):.2f}")
+    print(f"   Local picks over budget: {over_budget / max(total_picks, 1):.1%}")
+    print(f"   Confident (>= {args.threshold}):     {confident / len(entries):.1%} of queries skip the LLM")
+    print(f"   Median confidence:       {statistics.median(confidences):.2f}")
+    print(f"   Local latency:           p50 {statistics.median(latencies):.2f} ms / max {max(latencies):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Hermetic Load Test
+==================
+Runs the Flask app on a local port against the stub Auto.dev/OpenAI servers
+from stubs.py, drives it at a fixed concurrency, and reports latency
+percentiles, throughput and upstream call counts per scenario. No network
+access or API keys are needed.
+
+Scenarios:
+    listings      GET /listings/ with the default (local-first) recommender
+    listings-llm  GET /listings/?recommender=llm (streamed LLM recommendations)
+    chat          POST /listings/chat
+
+Results can be saved as a baseline and later runs compared against it; the
+comparison exits non-zero when a p95 regresses by more than --max-regression.
+
+The app's shared cache (memory or sqlite; see app/utils/cache.py) is chosen
+with --cache-backend, and its per-namespace hit rates are printed at the end.
+
+Usage:
+    python server/benchmarks/load_test.py [--requests 60] [--concurrency 8]
+    python server/benchmarks/load_test.py --cache-backend sqlite
+    python server/benchmarks/load_test.py --save server/benchmarks/baselines/load.json
+    python server/benchmarks/load_test.py --compare server/benchmarks/baselines/load.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ("listings", "listings-llm", "chat")
+QUERIES = [
+    ("NJ", 25000, "commuting", "sedan"),
+    ("NY", 40000, "family trips", "suv"),
+    ("CA", 18000, "first car", "compact"),
+    ("TX", 55000, "towing a boat", "truck"),
+    ("PA", 30000, "weekend fun", "sports"),
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_request(base_url, scenario, i):
+    from stubs import fake_listing
+
+    state, budget, use, comfort = QUERIES[i % len(QUERIES)]
+    if scenario == "chat":
+        body = json.dumps({
+            "car": fake_listing("Honda", "Civic", i % 10, state),
+            "messageHistory": [],
+            "message": "Is this a good first car?",
+        }).encode()
+        return urllib.request.Request(f"{base_url}/listings/chat", data=body, method="POST",
+                                      headers={"Content-Type": "application/json"})
+    query = f"state={state}&budget={budget}&primary_use={use.replace(' ', '_')}&comfort={comfort}"
+    if scenario == "listings-llm":
+        query += "&recommender=llm"
+    return urllib.request.Request(f"{base_url}/listings/?{query}", headers={"Accept-Encoding": "gzip"})
+
+
+def run_scenario(base_url, scenario, requests, concurrency, timeout=60):
+    def _one(i):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(build_request(base_url, scenario, i), timeout=timeout) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = None
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(_one, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for _, status in results if status != 200)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "throughput_rps": round(requests / wall, 2),
+    }
+
+
+def start_app():
+    """Import and serve the app after the stub URLs are in the environment."""
+    import logging
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def compare(results, baseline, max_regression):
+    """Print p50/p95 changes against a baseline. Returns False if any p95 regressed too far."""
+    ok = True
+    print("\nCompared with baseline:")
+    if baseline.get("config") != results["config"]:
+        print(f"  ⚠️ baseline was recorded with {baseline.get('config')}")
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            print(f"  {name:<13} no baseline")
+            continue
+        line = []
+        for metric in ("p50_ms", "p95_ms"):
+            change = (current[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            line.append(f"{metric} {before[metric]:>8.1f} -> {current[metric]:>8.1f} ({change:+.0%})")
+            if metric == "p95_ms" and change > max_regression:
+                ok = False
+        print(f"  {name:<13} " + "  ".join(line))
+    if not ok:
+        print(f"❌ p95 regressed by more than {max_regression:.0%}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=80, help="stub upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls that return 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of stub calls that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--cache-backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # The app reads upstream URLs at import time, and stubs.py imports the app
+    # package, so the environment has to be set before either is imported
+    stub_port = free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    os.environ.update({
+        "AUTO_DEV_KEY": "stub",
+        "OPENAI_API_KEY": "stub",
+        "AUTO_DEV_BASE_URL": stub_url,
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "MARKET_INDEX_PATH": os.path.join(tempfile.mkdtemp(), "market_index.json"),
+        "CACHE_BACKEND": args.cache_backend,
+        "CACHE_SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "cache.sqlite3"),
+        "SNAPSHOT_PATH": os.path.join(tempfile.mkdtemp(), "snapshot.bin"),
+    })
+    os.environ.pop("RECOMMENDATION_LOG_PATH", None)
+
+    from stubs import start_stub_server
+    stub_server, stub_state, _ = start_stub_server(
+        stub_port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app_server, base_url = start_app()
+
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    results = {
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "latency_ms": args.latency_ms,
+                   "jitter_ms": args.jitter_ms, "error_rate": args.error_rate, "slow_rate": args.slow_rate,
+                   "slow_ms": args.slow_ms, "cache_backend": args.cache_backend},
+        "scenarios": {},
+    }
+
+    print("=" * 78)
+    print(f"Load test: {args.requests} requests x {args.concurrency} concurrent, "
+          f"stub latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, error rate {args.error_rate:.0%}"
+          + (f", {args.slow_rate:.0%} slow at {args.slow_ms:.0f} ms" if args.slow_rate else ""))
+    print("=" * 78)
+    print(f"{'scenario':<13} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7} {'errors':>6}  upstream calls")
+    for name in scenarios:
+        stub_state.snapshot(reset=True)
+        # The app logs every step; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_scenario(base_url, name, args.requests, args.concurrency)
+        result["upstream_calls"] = stub_state.snapshot()["calls"]
+        results["scenarios"][name] = result
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(result["upstream_calls"].items()))
+        print(f"{name:<13} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['throughput_rps']:>7.2f} {result['errors']:>6}  {calls}")
+
+    with urllib.request.urlopen(f"{base_url}/metrics/cache") as resp:
+        cache = json.load(resp)
+    results["cache"] = cache["namespaces"]
+    print(f"\nCache ({cache['backend']}): " + ", ".join(
+        f"{name} {stats['hitRate']:.0%} of {stats['hits'] + stats['misses']}"
+        for name, stats in sorted(cache["namespaces"].items()) if stats["hitRate"] is not None))
+
+    with urllib.request.urlopen(f"{base_url}/metrics/hedging") as resp:
+        hedging = json.load(resp)
+    results["hedging"] = hedging
+    print("Hedging: " + ", ".join(
+        f"{name} {stats['hedged']}/{stats['calls']} hedged, {stats['hedgeWins']} won, delay {stats['delayMs']} ms"
+        for name, stats in sorted(hedging.items())))
+
+    with urllib.request.urlopen(f"{base_url}/metrics/usage") as resp:
+        usage = json.load(resp)
+    results["usage"] = usage
+    print("Per request: " + "; ".join(
+        f"{endpoint.split('.')[-1]} " + ", ".join(f"{k}={v:g}" for k, v in sorted(stats["perRequest"].items()))
+        for endpoint, stats in sorted(usage.items()) if not endpoint.startswith("metrics.")))
+
+    app_server.shutdown()
+    stub_server.shutdown()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Upstream Stand-ins
+==================
+Local HTTP servers that emulate the Auto.dev and OpenAI endpoints the backend
+calls, so benchmarks run offline:
+
+    GET  /listings?vehicle.make=&vehicle.model=&limit=&page=&sort=   (Auto.dev)
+    GET  /photos/{vin}                                         (Auto.dev)
+    POST /v1/chat/completions  (OpenAI; streaming and non-streaming)
+
+Each server adds configurable latency, jitter, a slow tail (a fraction of
+calls that take slow_ms instead) and an error rate (503s), and counts calls
+per route. Responses are deterministic for a given request.
+Point the app at them with AUTO_DEV_BASE_URL and OPENAI_BASE_URL.
+
+Usage (standalone):
+    python server/benchmarks/stubs.py [--port 8901] [--latency-ms 80]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.vehicle_catalog import CATALOG  # noqa: E402
+
+LISTINGS_PER_MODEL = 45
+STATES_CITIES = {"NJ": "Princeton", "NY": "Albany", "CA": "Fresno", "TX": "Austin", "PA": "Erie"}
+COLORS = ["Black", "White", "Silver", "Gray", "Blue", "Red"]
+CATALOG_BY_NAME = {(e["make"].lower(), e["model"].lower()): e for e in CATALOG}
+
+
+def _seed(*parts):
+    return int(hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:12], 16)
+
+
+def _vin(make, model, index):
+    digest = hashlib.sha1(f"{make}|{model}|{index}".encode()).hexdigest().upper()
+    return ("1" + digest.replace("I", "1").replace("O", "0"))[:17]
+
+
+def fake_listing(make, model, index, state, year=None):
+    """One Auto.dev-shaped listing, the same every time for (make, model, index)."""
+    rng = random.Random(_seed(make, model, index))
+    entry = CATALOG_BY_NAME.get((make.lower(), model.lower()), {})
+    year = year or rng.randint(max(entry.get("firstYear", 2012), 2012), min(entry.get("lastYear", 2025), 2025))
+    msrp = entry.get("baseMsrp", 32000)
+    age = max(0, 2025 - year)
+    vin = _vin(make, model, index)
+    return {
+        "vehicle": {
+            "vin": vin, "make": make, "model": model, "year": year, "baseMsrp": msrp,
+            "bodyStyle": entry.get("bodyStyle", "Sedan"), "fuel": entry.get("fuel", "Gasoline"),
+            "cylinders": rng.choice([4, 4, 6]), "doors": 4, "seats": entry.get("seats", 5),
+            "drivetrain": rng.choice(["FWD", "AWD"]), "engine": "2.0L I4", "transmission": "Automatic",
+            "exteriorColor": rng.choice(COLORS), "interiorColor": "Black", "trim": rng.choice(["Base", "EX", "Sport"]),
+            "type": "Used",
+        },
+        "retailListing": {
+            "price": int(msrp * max(0.25, 1 - 0.085 * age) * rng.uniform(0.85, 1.15)),
+            "miles": int(age * rng.uniform(7000, 15000)),
+            "state": state, "city": STATES_CITIES.get(state, "Springfield"), "zip": "08540",
+            "cpo": rng.random() < 0.1, "used": True, "dealer": "Stub Motors",
+            "vdp": f"https://dealer.example/{vin}", "primaryImage": f"https://img.example/{vin}/0.jpg",
+            "carfaxUrl": f"https://carfax.example/{vin}",
+        },
+        "history": {
+            "accidentCount": rng.choice([0, 0, 0, 1]), "ownerCount": rng.randint(1, 3),
+            "oneOwner": rng.random() < 0.4, "personalUse": True, "usageType": "Personal",
+        },
+    }
+
+
+def _completion_content(body):
+    """Reply text for a chat completion request, picked by its structured-output schema name."""
+    schema = (((body.get("response_format") or {}).get("json_schema")) or {}).get("name")
+    prompt = json.dumps(body.get("messages", []))
+    rng = random.Random(_seed(prompt))
+    if schema == "car_ratings" or "dealRating" in prompt:
+        ratings = {k: round(rng.uniform(2.5, 4.8), 1) for k in
+                   ("dealRating", "fuelEconomyRating", "maintenanceRating", "safetyRating", "ownerSatisfactionRating")}
+        ratings["overallRating"] = round(sum(ratings.values()) / 5, 2)
+        return json.dumps(ratings)
+    if schema == "car_recommendations" or "recommendations" in prompt:
+        picks = rng.sample(CATALOG, 3)
+        return json.dumps({"recommendations": [
+            {"make": e["make"], "model": e["model"], "year": min(e["lastYear"], 2021), "price": int(e["baseMsrp"] * 0.6)}
+            for e in picks
+        ]})
+    return "It's a solid choice: reliable, reasonably priced to insure, and easy to resell."
+
+
+class StubState:
+    def __init__(self, latency_ms=80, jitter_ms=20, error_rate=0.0, chunk_ms=5, slow_rate=0.0, slow_ms=2000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.chunk_ms = chunk_ms
+        self.calls = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(1)
+
+    def begin(self, route):
+        """Count the call, sleep the configured latency, and return True if it should fail."""
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            if self._rng.random() < self.slow_rate:
+                delay = self.slow_ms / 1000
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        time.sleep(delay)
+        return fail
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            data = {"calls": dict(self.calls), "errors": dict(self.errors)}
+            if reset:
+                self.calls.clear()
+                self.errors.clear()
+        return data
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/__stats":
+                return self._send_json(200, state.snapshot(reset="reset" in query))
+            if url.path.rstrip("/") == "/listings":
+                if state.begin("listings"):
+                    return self._send_json(503, {"error": "stub failure"})
+                make, model = query.get("vehicle.make", ""), query.get("vehicle.model", "")
+                limit, page = int(query.get("limit", 5)), int(query.get("page", 1))
+                year = int(query["vehicle.year"]) if query.get("vehicle.year", "").isdigit() else None
+                listings = [fake_listing(make, model, i, query.get("retailListing.state", "NJ"), year)
+                            for i in range(LISTINGS_PER_MODEL)]
+                if query.get("sort"):
+                    # "retailListing.price.asc" -> sort across every page by retailListing.price
+                    field, _, direction = query["sort"].rpartition(".")
+                    section, _, key = field.partition(".")
+                    listings.sort(key=lambda l: (l.get(section) or {}).get(key) or 0, reverse=direction == "desc")
+                start = (page - 1) * limit
+                return self._send_json(200, {"data": listings[start:start + limit]})
+            if url.path.startswith("/photos/"):
+                if state.begin("photos"):
+                    return self._send_json(503, {"error": "stub failure"})
+                vin = url.path.rsplit("/", 1)[-1]
+                return self._send_json(200, {"data": {"retail": [f"https://img.example/{vin}/{i}.jpg" for i in range(8)]}})
+            self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if not url.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": "not found"})
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if state.begin("chat.completions"):
+                return self._send_json(503, {"error": {"message": "stub failure", "type": "server_error"}})
+            content = _completion_content(body)
+            created = int(time.time())
+            if not body.get("stream"):
+                return self._send_json(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": body.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": len(json.dumps(body)) // 4, "completion_tokens": len(content) // 4,
+                              "total_tokens": (len(json.dumps(body)) + len(content)) // 4},
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i in range(0, len(content), 12):
+                chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+                         "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + 12]}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(state.chunk_ms / 1000)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+                         "model": body.get("model"), "choices": [],
+                         "usage": {"prompt_tokens": len(json.dumps(body)) // 4, "completion_tokens": len(content) // 4,
+                                   "total_tokens": (len(json.dumps(body)) + len(content)) // 4}}
+                self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return StubHandler
+
+
+def start_stub_server(port=0, **config):
+    """Start the stand-in server on a background thread. Returns (server, state, base_url)."""
+    state = StubState(**config)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of calls that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    args = parser.parse_args()
+
+    server, _, base_url = start_stub_server(args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                            error_rate=args.error_rate, slow_rate=args.slow_rate,
+                                            slow_ms=args.slow_ms)
+    print(f"Stub upstreams on {base_url}")
+    print(f"  AUTO_DEV_BASE_URL={base_url} OPENAI_BASE_URL={base_url}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Build the Zip Index
+===================
+Compiles a zip centroid source into the memory-mapped zip index that
+/listings/?zip= uses (see app/utils/geo.py). Two sources are understood,
+either as a .txt or zipped:
+
+- the GeoNames US postal codes, https://download.geonames.org/export/zip/US.zip
+  (CC BY 4.0), tab-separated without a header; the state is column 5 and
+  the latitude and longitude columns 10 and 11. The bundled
+  app/data/zip_centroids.bin is built from this file.
+- the Census ZCTA gazetteer,
+  https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html,
+  with GEOID, INTPTLAT and INTPTLONG columns. ZCTAs carry no state, so each
+  one is assigned the state of its USPS zip prefix; ZCTAs outside every
+  prefix range are skipped.
+
+Usage:
+    python server/build_zip_index.py US.zip
+    python server/build_zip_index.py 2023_Gaz_zcta_national.zip --output /tmp/zip_centroids.bin
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.geo import GRID_DEGREES, ZIP_INDEX_PATH, write_zip_index, zip_to_state  # noqa: E402
+
+
+def _open_gazetteer(path):
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        name = next(n for n in archive.namelist() if n.endswith(".txt"))
+        return io.TextIOWrapper(archive.open(name), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_gazetteer(path):
+    """Yield (zip, lat, lon, state) for each zip with a known state and position."""
+    with _open_gazetteer(path) as f:
+        reader = csv.reader(f, delimiter="\t")
+        # The last header cell carries trailing whitespace in the published files
+        first = [cell.strip() for cell in next(reader)]
+        if "GEOID" not in first:
+            yield from _read_geonames(itertools.chain([first], reader))
+            return
+        zip_col, lat_col, lon_col = first.index("GEOID"), first.index("INTPTLAT"), first.index("INTPTLONG")
+        for row in reader:
+            zip_code = row[zip_col].strip()
+            state = zip_to_state(zip_code)
+            if state:
+                yield zip_code, float(row[lat_col]), float(row[lon_col]), state
+
+
+def _read_geonames(rows):
+    for row in rows:
+        if len(row) < 11 or row[0].strip() != "US" or not (row[4] and row[9] and row[10]):
+            continue
+        yield row[1].strip(), float(row[9]), float(row[10]), row[4].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("gazetteer", help="GeoNames US postal codes or ZCTA gazetteer, .txt or .zip")
+    parser.add_argument("--output", default=ZIP_INDEX_PATH)
+    parser.add_argument("--grid", type=float, default=GRID_DEGREES, help="grid cell size in degrees")
+    args = parser.parse_args()
+
+    count = write_zip_index(args.output, read_gazetteer(args.gazetteer), grid=args.grid)
+    print(f"✅ Wrote {count} zips to {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
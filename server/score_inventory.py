@@ -0,0 +1,264 @@
+"""
+Bulk Inventory Scoring
+======================
+Scores a dealer inventory export with the local rating engine and the
+insurance model, without the Flask app or any API calls.
+
+Input is JSONL (one Auto.dev-shaped listing per line) or CSV, optionally
+gzipped, or "-" for stdin. CSV columns are either dotted paths
+("vehicle.make", "retailListing.price") or bare field names ("make",
+"price"), which are placed in the section clean_listings reads them from.
+
+Rows are read lazily and scored in chunks across a process pool with a
+bounded number of chunks in flight, so memory stays flat however large the
+file is. Results are written in input order as each chunk finishes, as JSONL
+or CSV (picked from the output extension or --format), and throughput is
+reported on stderr.
+
+Usage:
+    python server/score_inventory.py inventory.jsonl scores.jsonl
+    python server/score_inventory.py inventory.csv.gz scores.csv --workers 8 --chunk-size 2000
+"""
+
+import argparse
+import contextlib
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.listing_fields import HISTORY_FIELDS, RETAIL_FIELDS, VEHICLE_FIELDS, simplify_listing  # noqa: E402
+from app.utils.insurance_prediction import estimate_annual_insurance  # noqa: E402
+from app.utils.rating_engine import estimate_ratings  # noqa: E402
+
+RATING_KEYS = ("overallRating", "dealRating", "fuelEconomyRating", "maintenanceRating", "safetyRating",
+               "ownerSatisfactionRating")
+OUTPUT_COLUMNS = ("vin", "make", "model", "year", "price", "miles", "state", *RATING_KEYS,
+                  "annualInsurance", "monthlyInsurance", "error")
+
+# Bare CSV column -> (section, field), following the clean_listings field mapping
+FIELD_SECTIONS = {
+    **{field: ("history", field) for field in HISTORY_FIELDS},
+    **{field: ("retailListing", field) for field in RETAIL_FIELDS},
+    "vdp": ("retailListing", "vdp"),
+    "primaryImage": ("retailListing", "primaryImage"),
+    **{field: ("vehicle", field) for field in VEHICLE_FIELDS},
+}
+INT_FIELDS = {"year", "cylinders", "doors", "seats", "accidentCount", "ownerCount"}
+FLOAT_FIELDS = {"price", "miles", "baseMsrp"}
+BOOL_FIELDS = {"cpo", "used", "oneOwner", "personalUse"}
+MAX_REPORTED_ERRORS = 10
+
+
+def _coerce(field, value):
+    """CSV cells are strings; convert the fields the scorers do arithmetic on."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value == "":
+        return None
+    if field in BOOL_FIELDS:
+        return value.lower() in ("1", "true", "yes", "y", "t")
+    try:
+        if field in INT_FIELDS:
+            return int(float(value))
+        if field in FLOAT_FIELDS:
+            return float(value.replace(",", "").lstrip("$"))
+    except ValueError:
+        return None
+    return value
+
+
+def csv_row_to_listing(row):
+    """Nest a flat CSV row into the raw listing shape simplify_listing expects."""
+    listing = {"vehicle": {}, "retailListing": {}, "history": {}}
+    for column, value in row.items():
+        if column is None:
+            continue
+        section, _, field = column.strip().rpartition(".")
+        if not section:
+            section, field = FIELD_SECTIONS.get(field, (None, field))
+        if section in listing:
+            listing[section][field] = _coerce(field, value)
+    return listing
+
+
+def _open_text(path, mode):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _data_format(path, explicit=None):
+    if explicit:
+        return explicit
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+def read_rows(handle, data_format):
+    """
+    Yield (line number, row) from an open input file. JSONL rows are left as
+    raw lines so the pool workers, not the reader, pay for parsing them.
+    """
+    if data_format == "csv":
+        for number, row in enumerate(csv.DictReader(handle), start=2):
+            yield number, csv_row_to_listing(row)
+        return
+    for number, line in enumerate(handle, start=1):
+        if line.strip():
+            yield number, line
+
+
+def _parse_row(row):
+    if isinstance(row, dict):
+        return row
+    try:
+        listing = json.loads(row)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}") from None
+    if not isinstance(listing, dict):
+        raise ValueError("line is not a JSON object")
+    return listing
+
+
+def score_listing(listing):
+    """Ratings and insurance for one raw listing."""
+    car_data = simplify_listing(listing)
+    ratings = estimate_ratings(car_data)
+    insurance = estimate_annual_insurance(car_data)
+    vehicle = car_data["vehicle"]
+    retail = car_data["retailListing"]
+    return {
+        "vin": vehicle.get("vin"),
+        "make": vehicle.get("make"),
+        "model": vehicle.get("model"),
+        "year": vehicle.get("year"),
+        "price": retail.get("price"),
+        "miles": retail.get("miles"),
+        "state": retail.get("state"),
+        **{key: ratings.get(key) for key in RATING_KEYS},
+        "annualInsurance": insurance.get("annualEstimate"),
+        "monthlyInsurance": insurance.get("monthlyEstimate"),
+        "error": None,
+    }
+
+
+def score_chunk(rows):
+    """Score a chunk of (line number, row) pairs; runs in a pool worker."""
+    scored = []
+    for number, row in rows:
+        try:
+            scored.append((number, score_listing(_parse_row(row))))
+        except Exception as e:
+            error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            scored.append((number, {column: None for column in OUTPUT_COLUMNS} | {"error": error}))
+    return scored
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ResultWriter:
+    def __init__(self, handle, data_format):
+        self.handle = handle
+        self.csv = csv.DictWriter(handle, fieldnames=OUTPUT_COLUMNS) if data_format == "csv" else None
+        if self.csv is not None:
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is not None:
+            self.csv.writerow(record)
+        else:
+            self.handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def score_file(input_path, output_path, workers=None, chunk_size=1000, in_flight=None,
+               input_format=None, output_format=None, report_every=5.0, log=sys.stderr):
+    """
+    Score every row of `input_path` into `output_path`.
+
+    Returns:
+        dict: {"rows", "errors", "seconds", "rowsPerSecond"}
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or workers * 2
+    input_format = _data_format(input_path, input_format)
+    output_format = _data_format(output_path, output_format)
+    totals = {"rows": 0, "errors": 0}
+    start = last_report = time.monotonic()
+
+    def _write(results):
+        nonlocal last_report
+        for number, record in results:
+            writer.write(record)
+            totals["rows"] += 1
+            if record["error"]:
+                totals["errors"] += 1
+                if totals["errors"] <= MAX_REPORTED_ERRORS:
+                    print(f"⚠️ Row {number}: {record['error']}", file=log)
+        now = time.monotonic()
+        if report_every and now - last_report >= report_every:
+            last_report = now
+            print(f"… {totals['rows']:,} rows, {totals['rows'] / (now - start):,.0f} rows/s", file=log)
+
+    with _open_text(input_path, "r") as source, _open_text(output_path, "w") as sink:
+        writer = ResultWriter(sink, output_format)
+        chunks = _chunks(read_rows(source, input_format), chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                _write(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    # Only `in_flight` chunks are read ahead, so memory doesn't grow with the file
+                    if len(pending) >= in_flight:
+                        _write(pending.popleft().result())
+                    pending.append(pool.submit(score_chunk, chunk))
+                while pending:
+                    _write(pending.popleft().result())
+
+    seconds = time.monotonic() - start
+    return {**totals, "seconds": round(seconds, 2),
+            "rowsPerSecond": round(totals["rows"] / seconds, 1) if seconds else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file (optionally .gz), or - for stdin")
+    parser.add_argument("output", help="JSONL or CSV file (optionally .gz), or - for stdout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per worker task")
+    parser.add_argument("--in-flight", type=int, default=None, help="chunks queued at once (default: 2 x workers)")
+    parser.add_argument("--input-format", choices=("jsonl", "csv"))
+    parser.add_argument("--format", dest="output_format", choices=("jsonl", "csv"))
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    summary = score_file(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                         in_flight=args.in_flight, input_format=args.input_format,
+                         output_format=args.output_format, report_every=args.report_every)
+    print(f"✅ Scored {summary['rows']:,} rows ({summary['errors']:,} errors) in {summary['seconds']}s, "
+          f"{summary['rowsPerSecond']:,} rows/s", file=sys.stderr)
+    return 0 if summary["rows"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Tests for per-request upstream accounting
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from flask import Flask
+
+from server.app.utils import accounting
+from server.app.utils.cache import MemoryBackend, NamespacedCache
+
+
+def test_usage_is_counted_per_request_across_threads_and_aggregated(monkeypatch):
+    monkeypatch.setattr(accounting, "usage_totals", accounting.UsageTotals())
+    photos = NamespacedCache(MemoryBackend(), "photos", ttl=60)
+    photos.set("VIN1", ["a.jpg"])
+
+    app = Flask(__name__)
+    accounting.init_accounting(app)
+
+    @app.route("/search")
+    def search():
+        def _enrich(vin):
+            if photos.get(vin) is None:
+                accounting.record("autodevPhotos")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(accounting.propagate(_enrich), ["VIN1", "VIN2", "VIN3"]))
+        accounting.record_completion(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)))
+        return {"ok": True}
+
+    client = app.test_client()
+    first = client.get("/search")
+    second = client.get("/search")
+
+    assert first.headers[accounting.USAGE_HEADER] == (
+        "autodevPhotos=2, cacheHits.photos=1, completionTokens=30, openaiCalls=1, promptTokens=120")
+    assert second.headers[accounting.USAGE_HEADER] == first.headers[accounting.USAGE_HEADER]
+    totals = accounting.usage_totals.stats()["search"]
+    assert totals["requests"] == 2
+    assert totals["totals"]["promptTokens"] == 240
+    assert totals["perRequest"]["autodevPhotos"] == 2
+
+    # Outside a request nothing is recorded
+    accounting.record("autodevPhotos")
+    assert accounting._current.get() is None
@@ -0,0 +1,68 @@
+"""
+Tests for the Vercel event adapter (api/index.py)
+"""
+
+import base64
+import gzip
+import importlib.util
+import json
+import os
+
+_spec = importlib.util.spec_from_file_location("api_index", os.path.join(os.path.dirname(__file__), "api", "index.py"))
+api_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(api_index)
+
+
+def test_query_falls_back_to_the_url_for_every_path():
+    environ, _ = api_index.build_environ(
+        {"path": "/listings/", "url": "https://example.vercel.app/listings/?state=NJ&budget=1"})
+    assert environ["PATH_INFO"] == "/listings/"
+    assert environ["QUERY_STRING"] == "state=NJ&budget=1"
+
+    environ, _ = api_index.build_environ({"path": "/", "url": "https://example.vercel.app/api/listings/?state=NY"})
+    assert (environ["PATH_INFO"], environ["QUERY_STRING"]) == ("/listings/", "state=NY")
+
+
+def test_explicit_query_wins_over_the_url():
+    environ, _ = api_index.build_environ(
+        {"path": "/listings/?state=CA", "url": "https://example.vercel.app/listings/?state=NJ"})
+    assert environ["QUERY_STRING"] == "state=CA"
+    environ, _ = api_index.build_environ(
+        {"path": "/listings/", "query": {"state": "TX"}, "url": "https://example.vercel.app/listings/?state=NJ"})
+    assert environ["QUERY_STRING"] == "state=TX"
+
+
+def _serve(monkeypatch, event):
+    from flask import Flask, Response, jsonify
+
+    from server.app.utils.http_cache import init_http_cache
+
+    app = Flask(__name__)
+
+    @app.route("/listings/")
+    def listings():
+        return jsonify({"rows": ["listing"] * 500})
+
+    @app.route("/stream")
+    def stream():
+        return Response((chunk for chunk in ("a", "b", "c")), mimetype="text/plain")
+
+    init_http_cache(app)
+    monkeypatch.setattr(api_index, "get_app", lambda: app)
+    return api_index.handler(event)
+
+
+def test_compressed_bodies_are_base64_encoded(monkeypatch):
+    response = _serve(monkeypatch, {"path": "/listings/", "headers": {"Accept-Encoding": "gzip"}})
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["isBase64Encoded"] is True
+    body = json.loads(gzip.decompress(base64.b64decode(response["body"])))
+    assert len(body["rows"]) == 500
+    json.dumps(response)
+
+
+def test_text_and_streamed_bodies_are_strings(monkeypatch):
+    plain = _serve(monkeypatch, {"path": "/listings/", "headers": {"Accept-Encoding": "identity"}})
+    assert plain["isBase64Encoded"] is False and json.loads(plain["body"])["rows"][0] == "listing"
+    streamed = _serve(monkeypatch, {"path": "/stream"})
+    assert streamed["body"] == "abc" and streamed["isBase64Encoded"] is False
@@ -0,0 +1,110 @@
+"""
+Tests for multi-state batch search
+"""
+
+from flask import Flask
+
+from server.app.utils import search
+
+
+def test_search_many_dedups_vins_across_states_and_groups_them(monkeypatch):
+    def fake_search(rec, state, budget, headers, limit=5, page=None):
+        if state == "CA":
+            return {"recommendation": rec, "error": "Auto.dev returned 500"}
+        # NJ and NY share one Civic listing
+        vins = {"NJ": ["CIVIC1", "CIVIC2"], "NY": ["CIVIC2", "CIVIC3"]}[state]
+        return {"recommendation": rec, "listings": [{"vehicle": {"vin": v}} for v in vins]}
+
+    enriched = []
+
+    def fake_clean(data, rating_mode="auto", save_index=True):
+        listing = data["results"][0]["listings"][0]
+        enriched.append(listing["vehicle"]["vin"])
+        return {"results": {listing["vehicle"]["vin"]: listing}}
+
+    monkeypatch.setattr(search, "search_autodev", fake_search)
+    monkeypatch.setattr(search, "clean_listings", fake_clean)
+    monkeypatch.setattr(search.market_index, "save", lambda force=False: False)
+
+    with Flask(__name__).app_context():
+        found = search.search_many([{"make": "Honda", "model": "Civic"}], ["NJ", "NY", "CA"], None, {})
+
+    assert found["uniqueVinCount"] == 3
+    assert sorted(enriched) == ["CIVIC1", "CIVIC2", "CIVIC3"]
+    groups = {g["state"]: g for g in found["groups"]}
+    assert groups["NJ"]["vins"] == ["CIVIC1", "CIVIC2"]
+    assert groups["NY"]["vins"] == ["CIVIC2", "CIVIC3"]
+    assert groups["CA"]["vins"] == [] and groups["CA"]["error"] == "Auto.dev returned 500"
+
+
+def test_batch_route_parses_query_model_years(monkeypatch):
+    from server.app.routes import listings
+
+    searched = []
+
+    def fake_search_many(recommendations, states, budget, headers, rating_mode="auto"):
+        searched.extend(recommendations)
+        return {"uniqueVinCount": 0, "results": {}, "groups": []}
+
+    monkeypatch.setattr(listings, "search_many", fake_search_many)
+    monkeypatch.setattr(listings, "autodev_headers", lambda: {})
+    monkeypatch.setattr(listings, "finish_recommendations", lambda params, rec_state, local: None)
+    app = Flask(__name__)
+    app.register_blueprint(listings.listings_bp, url_prefix="/listings")
+    client = app.test_client()
+
+    response = client.post("/listings/batch", json={"states": ["NJ"], "queries": [
+        {"make": "Honda", "model": "Civic", "model_year": "2021"},
+        {"make": "Mazda", "model": "Mazda3", "model_year": "2021&vehicle.make=BMW"},
+        {"make": "Toyota", "model": "Camry", "model_year": [2020]},
+    ]})
+
+    assert response.status_code == 200
+    assert [rec["year"] for rec in searched] == [2021, None, None]
+    bad = client.post("/listings/batch", json={"states": ["NJ"], "queries": [{"make": "Honda", "model": 1}]})
+    assert bad.status_code == 400
+
+
+def test_a_failed_search_is_recorded_on_its_group(monkeypatch):
+    def fake_search(rec, state, budget, headers, limit=5, page=None):
+        if state == "CA":
+            raise RuntimeError("boom")
+        return {"recommendation": rec, "listings": [{"vehicle": {"vin": f"{state}1"}}]}
+
+    searched = []
+    monkeypatch.setattr(search, "search_autodev", fake_search)
+    monkeypatch.setattr(search, "clean_listings", lambda data, rating_mode="auto", save_index=True: {
+        "results": {data["results"][0]["listings"][0]["vehicle"]["vin"]: {}}})
+    monkeypatch.setattr(search.market_index, "save", lambda force=False: False)
+
+    with Flask(__name__).app_context():
+        found = search.search_many([{"make": "Honda", "model": "Civic"}], ["NJ", "CA"], None, {},
+                                   on_searched=searched.append)
+
+    groups = {g["state"]: g for g in found["groups"]}
+    assert groups["NJ"]["vins"] == ["NJ1"] and groups["NJ"]["error"] is None
+    assert groups["CA"]["error"] == "Search failed: boom"
+    # Callers tracking progress still hear about the failed search
+    assert sorted(item.get("error") or "" for item in searched) == ["", "Search failed: boom"]
+
+
+def test_only_searches_that_reach_auto_dev_are_counted(monkeypatch):
+    import requests
+
+    from server.app.utils import vehicle_names
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"listings": [{"vehicle": {"vin": "VIN1"}}]}
+
+    calls = []
+    monkeypatch.setattr(requests, "get", lambda url, **kwargs: calls.append(url) or Response())
+    before = vehicle_names.search_metrics()["searches"]
+    rec = {"make": "Honda", "model": "Civic", "year": 1987}
+    for _ in range(2):
+        assert search.search_autodev(rec, "VT", None, {})["listings"]
+
+    assert len(calls) == 1
+    assert vehicle_names.search_metrics()["searches"] == before + 1
@@ -0,0 +1,105 @@
+"""
+Tests for the shared cache backends
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from server.app.utils.cache import MemoryBackend, NamespacedCache, RedisBackend, SQLiteBackend
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for RedisBackend: GET, SET [PX], DEL, DBSIZE."""
+
+    def _read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            now = time.time()
+            if name == b"GET":
+                value, expires = store.get(args[1], (None, None))
+                if value is None or (expires and expires < now):
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif name == b"SET":
+                expires = now + int(args[4]) / 1000 if len(args) > 3 else None
+                store[args[1]] = (args[2], expires)
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"DEL":
+                self.wfile.write(b":%d\r\n" % (store.pop(args[1], None) is not None))
+            elif name == b"DBSIZE":
+                self.wfile.write(b":%d\r\n" % len(store))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RESPHandler)
+    server.daemon_threads = True
+    server.store = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend(max_entries=100)
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    return RedisBackend(request.getfixturevalue("resp_server"))
+
+
+def test_backends_share_semantics_and_stats(backend):
+    cache = NamespacedCache(backend, "ratings", ttl=60)
+    assert cache.get("k") is None
+    cache.set("k", {"overallRating": 4.1, "tags": ["a"]})
+    assert cache.get("k") == {"overallRating": 4.1, "tags": ["a"]}
+    cache.set("short", [1], ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    # Namespaces don't collide on the same backend
+    assert NamespacedCache(backend, "photos", ttl=60).get("k") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["errors"]) == (1, 2, 2, 0)
+    assert stats["hitRate"] == pytest.approx(0.333)
+    assert backend.stats()["entries"] >= 1
+
+
+def test_sqlite_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    NamespacedCache(SQLiteBackend(path), "search", ttl=60).set("url", [{"vin": "1"}])
+    assert NamespacedCache(SQLiteBackend(path), "search", ttl=60).get("url") == [{"vin": "1"}]
+
+
+def test_unreachable_backend_is_a_miss():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cache = NamespacedCache(RedisBackend(f"redis://127.0.0.1:{port}/0", timeout=0.2), "photos", ttl=60)
+    cache.set("vin", ["a.jpg"])
+    assert cache.get("vin") is None
+    stats = cache.stats()
+    assert stats["errors"] == 2 and stats["misses"] == 1 and stats["writes"] == 0
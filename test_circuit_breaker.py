@@ -0,0 +1,94 @@
+"""
+Tests for the upstream circuit breaker
+"""
+
+import pytest
+import requests
+
+from server.app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, UpstreamError
+
+
+def _raise(error):
+    def func():
+        raise error
+    return func
+
+
+def test_transport_and_upstream_errors_trip_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    assert breaker.call(_raise(requests.ConnectionError("refused")), fallback=lambda: "down") == "down"
+    assert breaker.state == CLOSED
+    breaker.call(_raise(UpstreamError("503")), fallback=lambda: "down")
+    assert breaker.state == OPEN
+    assert breaker.stats()["failures"] == 2
+
+
+def test_unusable_responses_fall_back_without_counting_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    malformed = _raise(AttributeError("'list' object has no attribute 'get'"))
+    assert breaker.call(malformed, fallback=lambda: "default") == "default"
+    assert breaker.call(_raise(requests.JSONDecodeError("bad", "", 0)), fallback=lambda: "default") == "default"
+    assert breaker.state == CLOSED
+    assert breaker.stats()["failures"] == 0
+
+
+def test_only_real_results_are_kept_for_cached_fallbacks():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    assert breaker.call(lambda: ["photo.jpg"], fallback=lambda: None, cache_key="VIN") == ["photo.jpg"]
+    # A 404 answers None; it must not replace the photos served while the upstream is down
+    assert breaker.call(lambda: None, fallback=lambda: None, cache_key="VIN") is None
+    assert breaker.call(_raise(requests.Timeout()), fallback=lambda: None, cache_key="VIN") == ["photo.jpg"]
+    assert breaker.stats()["cachedFallbacks"] == 1
+
+
+def _half_open(breaker):
+    breaker.call(_raise(UpstreamError("503")), fallback=lambda: None)
+    breaker.reset_timeout = 0
+    assert breaker.state == HALF_OPEN
+
+
+def test_abandoned_probe_is_released():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    _half_open(breaker)
+
+    def stream():
+        assert breaker.allow_request()
+        with breaker.attempt():
+            yield 1
+            yield 2
+
+    chunks = stream()
+    next(chunks)
+    assert not breaker.allow_request()  # the probe is in flight
+    chunks.close()
+    assert breaker.allow_request()
+
+
+def test_attempt_counts_only_upstream_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    with pytest.raises(ValueError):
+        with breaker.attempt():
+            raise ValueError("bad JSON")
+    assert breaker.state == CLOSED
+    with pytest.raises(requests.ConnectionError):
+        with breaker.attempt():
+            raise requests.ConnectionError()
+    assert breaker.state == OPEN
+
+
+def test_openai_errors_are_classified():
+    import openai as sdk
+
+    from server.app.utils.openai import _is_openai_failure
+
+    def sdk_error(cls, status=None):
+        # Built without the SDK's HTTP request/response objects
+        error = cls.__new__(cls)
+        error.status_code = status
+        return error
+
+    assert _is_openai_failure(sdk_error(sdk.APITimeoutError))
+    assert _is_openai_failure(sdk_error(sdk.RateLimitError, 429))
+    assert _is_openai_failure(sdk_error(sdk.InternalServerError, 503))
+    assert not _is_openai_failure(sdk_error(sdk.BadRequestError, 400))
+    assert not _is_openai_failure(ValueError("unparseable output"))
@@ -0,0 +1,80 @@
+"""
+Tests for the zip proximity index
+"""
+
+import pytest
+
+from server.app.utils import geo
+
+ZIPS = [
+    ("07030", 40.745, -74.028, "NJ"),  # Hoboken
+    ("10001", 40.750, -73.997, "NY"),  # Manhattan
+    ("06901", 41.053, -73.539, "CT"),  # Stamford
+    ("19103", 39.953, -75.174, "PA"),  # Philadelphia
+    ("90210", 34.090, -118.406, "CA"),  # Beverly Hills
+]
+
+
+def _index(tmp_path, monkeypatch):
+    path = str(tmp_path / "zips.bin")
+    assert geo.write_zip_index(path, ZIPS) == len(ZIPS)
+    index = geo.ZipIndex(path)
+    monkeypatch.setattr(geo, "zip_index", index)
+    return index
+
+
+def test_zip_index_locates_zips_and_finds_neighbours_nearest_first(tmp_path, monkeypatch):
+    index = _index(tmp_path, monkeypatch)
+
+    lat, lon, state = index.locate("10001")
+    assert state == "NY" and abs(lat - 40.75) < 1e-4 and abs(lon + 73.997) < 1e-4
+    assert index.locate("99999") is None
+
+    nearby = index.within(lat, lon, 40)
+    assert [z for _, z, _ in nearby] == ["10001", "07030", "06901"]
+    assert nearby[1][0] < 3
+
+    search = geo.resolve_zip_search("10001", 100)
+    assert search["origin"] is not None
+    assert search["states"] == ["NY", "NJ", "CT", "PA"]
+
+
+def test_rank_by_distance_orders_and_drops_far_listings(tmp_path, monkeypatch):
+    _index(tmp_path, monkeypatch)
+    origin = geo.zip_index.locate("07030")[:2]
+    listings = {
+        "FAR": {"retailListing": {"zip": "90210"}},
+        "PHILLY": {"retailListing": {"zip": "19103"}},
+        "NYC": {"retailListing": {"zip": "10001-1234"}},
+        "UNKNOWN": {"retailListing": {"zip": None}},
+    }
+
+    ranking, distances = geo.rank_by_distance(listings, origin, 100)
+
+    assert ranking == ["NYC", "PHILLY", "UNKNOWN"]
+    assert set(distances) == {"NYC", "PHILLY"}
+
+
+def test_resolve_zip_search_without_index_falls_back_to_prefix_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(geo, "zip_index", geo.ZipIndex(str(tmp_path / "missing.bin")))
+
+    search = geo.resolve_zip_search("07030")
+    assert search == {"zip": "07030", "radius": geo.DEFAULT_RADIUS_MILES, "origin": None, "states": ["NJ"]}
+    for bad in ("abc", "123"):
+        try:
+            geo.resolve_zip_search(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} should be rejected")
+    # Without distances an explicit radius can't be honoured
+    with pytest.raises(ValueError, match="radius"):
+        geo.resolve_zip_search("07030", 25)
+
+
+def test_bundled_zip_index_covers_real_zips():
+    index = geo.ZipIndex()
+    assert index.available and index.count > 40000
+    lat, lon, state = index.locate("07030")
+    assert state == "NJ" and abs(lat - 40.74) < 0.05 and abs(lon + 74.03) < 0.05
+    assert index.locate("99950")[2] == "AK"
+    assert geo.distance_miles(*index.locate("10001")[:2], lat, lon) < 5
@@ -0,0 +1,50 @@
+"""
+Tests for hedged upstream requests
+"""
+
+import threading
+import time
+
+import pytest
+
+from server.app.utils.hedging import Hedger
+
+
+def _warm(hedger, seconds=0.01):
+    for _ in range(hedger.min_samples):
+        hedger.record(seconds)
+
+
+def test_slow_call_is_hedged_and_fast_duplicate_wins():
+    hedger = Hedger("test", percentile=0.9, max_ratio=1.0, min_delay=0.01, min_samples=10, enabled=True)
+    assert hedger.delay() is None
+    _warm(hedger)
+    calls = []
+    lock = threading.Lock()
+
+    def func():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.01)
+        return "slow" if first else "fast"
+
+    start = time.monotonic()
+    assert hedger.call(func) == "fast"
+    assert time.monotonic() - start < 0.5
+    stats = hedger.stats()
+    assert (stats["calls"], stats["hedged"], stats["hedgeWins"]) == (1, 1, 1)
+
+
+def test_hedge_budget_and_failures():
+    hedger = Hedger("test", max_ratio=0.0, min_delay=0.01, min_samples=10, enabled=True, burst=0)
+    _warm(hedger)
+    assert hedger.call(lambda: time.sleep(0.05) or "primary") == "primary"
+    assert hedger.stats()["budgetDenied"] == 1
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        hedger.call(failing)
+    assert hedger.stats()["failedAttempts"] == 1
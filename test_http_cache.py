@@ -0,0 +1,65 @@
+"""
+Tests for response compression and ETag revalidation
+"""
+
+import gzip
+
+from flask import Flask, jsonify
+
+from server.app.utils.http_cache import init_http_cache
+
+
+def _client():
+    app = Flask(__name__)
+    calls = []
+    job = {"status": "running"}
+
+    @app.route("/big")
+    def big():
+        calls.append(1)
+        return jsonify({"rows": ["listing"] * 500})
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/jobs/<job_id>")
+    def poll(job_id):
+        return jsonify({"id": job_id, **job})
+
+    init_http_cache(app, revalidate_endpoints={"big"})
+    app.job = job
+    return app.test_client(), calls
+
+
+def test_gzip_negotiation_and_representation_etags():
+    client, _ = _client()
+    zipped = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_matching_etag_is_answered_before_the_view_runs():
+    client, calls = _client()
+    first = client.get("/big?b=2&a=1", headers={"Accept-Encoding": "gzip"})
+    again = client.get("/big?a=1&b=2", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert len(calls) == 1
+    stale = client.get("/big?a=1&b=2", headers={"Accept-Encoding": "gzip", "If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+def test_polled_resources_always_run_their_view():
+    client, _ = _client()
+    first = client.get("/jobs/1")
+    unchanged = client.get("/jobs/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert unchanged.status_code == 304
+
+    client.application.job["status"] = "done"
+    done = client.get("/jobs/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert done.status_code == 200
+    assert done.get_json()["status"] == "done"
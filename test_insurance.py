@@ -104,3 +104,35 @@ for i, car in enumerate([test_car_1, test_car_2, test_car_3], 1):
     print("-" * 60)
 
 print("\n✅ Insurance prediction test completed!")
+
+
+def test_listings_route_estimates_insurance_for_listings_missing_fields(tmp_path, monkeypatch):
+    from flask import Flask
+
+    from server.app.routes import listings
+    from server.app.utils import clean_data, search
+    from server.app.utils.market_index import MarketIndex
+
+    # Auto.dev leaves fields out; the simplified listing keeps them as None
+    raw = {"vehicle": {"vin": "SPARSE1", "make": "Honda", "model": "Civic"}, "retailListing": {"price": 18000}}
+    monkeypatch.setenv("AUTO_DEV_KEY", "test")
+    monkeypatch.setattr(search, "search_autodev", lambda rec, *args, **kwargs: {"recommendation": rec,
+                                                                                  "listings": [raw]})
+    index = MarketIndex(str(tmp_path / "market.json"))
+    monkeypatch.setattr(search, "market_index", index)
+    monkeypatch.setattr(clean_data, "market_index", index)
+    monkeypatch.setattr(clean_data, "fetch_listing_photos", lambda vin, retail: [])
+    monkeypatch.setattr(clean_data.listing_store, "put", lambda vin, listing: None)
+    monkeypatch.setattr(clean_data.similar_index, "add", lambda vin, listing: None)
+
+    app = Flask(__name__)
+    app.register_blueprint(listings.listings_bp, url_prefix="/listings")
+    response = app.test_client().get("/listings/?state=NJ&make=Honda&model=Civic&ratings=local")
+
+    assert response.status_code == 200
+    listing = response.get_json()["listings"]["SPARSE1"]
+    assert listing["retailListing"]["miles"] is None and listing["vehicle"]["year"] is None
+    # Missing fields take the model's defaults instead of failing the estimate
+    defaults = {"vehicle": {"make": "Honda", "year": 2020, "bodyStyle": "Sedan"},
+                "retailListing": {"price": 18000, "state": "NJ", "miles": 50000}}
+    assert listing["insurance"] == estimate_annual_insurance(defaults)
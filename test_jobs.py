@@ -0,0 +1,112 @@
+"""
+Tests for background search jobs
+"""
+
+import time
+
+from flask import Flask
+
+from server.app.utils import jobs
+from server.app.utils.jobs import JobManager
+
+PARAMS = {"state": "NJ", "budget": "25000", "primary_use": "commuting"}
+
+
+def _fake_pipeline(monkeypatch, searched_states=None):
+    def fake_search_many(recommendations, states, budget, headers, rating_mode="auto",
+                         on_searched=None, on_enriched=None):
+        if searched_states is not None:
+            searched_states.extend(states)
+        for rec in recommendations:
+            on_searched({"recommendation": rec, "listings": [{}, {}]})
+            on_enriched({f"{rec['model']}-1": {"vehicle": {"model": rec["model"]},
+                                               "retailListing": {"zip": rec.get("zip")}}})
+
+    monkeypatch.setattr(jobs, "resolve_recommendations",
+                        lambda params: ([{"make": "Honda", "model": "Civic", "zip": "19103"},
+                                         {"make": "Mazda", "model": "Mazda3", "zip": "10001"}],
+                                        {"count": 2, "error": None, "picks": []}, None))
+    monkeypatch.setattr(jobs, "search_many", fake_search_many)
+    monkeypatch.setattr(jobs, "finish_recommendations", lambda params, rec_state, local: None)
+
+
+def _wait(job):
+    for _ in range(100):
+        if not job.active:
+            return
+        time.sleep(0.01)
+
+
+def test_job_collects_progress_and_results(monkeypatch):
+    _fake_pipeline(monkeypatch)
+    manager = JobManager(workers=1)
+    job, created = manager.submit(Flask(__name__), PARAMS, {})
+    _wait(job)
+    snapshot = job.snapshot()
+    assert created
+    assert snapshot["status"] == "done"
+    assert snapshot["progress"] == {"recommendations": 2, "searchesDone": 2, "listingsFound": 4, "listingsEnriched": 2}
+    assert set(snapshot["results"]) == {"Civic-1", "Mazda3-1"}
+
+
+def test_repeat_submission_reuses_job_and_store_is_bounded(monkeypatch):
+    _fake_pipeline(monkeypatch)
+    manager = JobManager(workers=1, max_jobs=2)
+    app = Flask(__name__)
+    first, _ = manager.submit(app, PARAMS, {})
+    _wait(first)
+    again, created = manager.submit(app, dict(PARAMS), {})
+    assert again is first and not created
+
+    for state in ("NY", "PA"):
+        _wait(manager.submit(app, {**PARAMS, "state": state}, {})[0])
+    assert manager.get(first.id) is None
+    assert manager.stats()["jobs"] == 2
+
+
+def test_job_route_rejects_non_string_params():
+    from server.app.routes.listings import listings_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(listings_bp, url_prefix="/listings")
+    response = app.test_client().post("/listings/jobs", json={"state": "NJ", "primary_use": 1})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "primary_use must be a string"}
+
+
+def test_zip_jobs_search_every_state_in_the_radius_and_rank_by_distance(monkeypatch):
+    from server.app.routes import listings
+    from server.app.utils import geo
+
+    searched = []
+    _fake_pipeline(monkeypatch, searched)
+    monkeypatch.setattr(listings, "job_manager", JobManager(workers=1))
+    monkeypatch.setattr(listings, "autodev_headers", lambda: {})
+    app = Flask(__name__)
+    app.register_blueprint(listings.listings_bp, url_prefix="/listings")
+    client = app.test_client()
+
+    search = geo.resolve_zip_search("07030", 50)
+    started = client.post("/listings/jobs", json={"zip": "07030", "radius": 50, "primary_use": "commuting"})
+    assert started.status_code == 202
+    job = listings.job_manager.get(started.get_json()["jobId"])
+    _wait(job)
+
+    assert searched == search["states"]
+    polled = client.get(f"/listings/jobs/{job.id}").get_json()
+    # Philadelphia is beyond 50 miles of Hoboken; Manhattan is not
+    assert polled["ranking"] == ["Mazda3-1"]
+    assert list(polled["listings"]) == ["Mazda3-1"]
+    assert polled["zip"]["states"] == search["states"]
+
+
+def test_failed_searches_are_reported_by_the_job():
+    job = jobs.SearchJob(PARAMS)
+    job.searched({"recommendation": {"make": "Honda", "model": "Civic"}, "listings": [{}]})
+    job.searched({"recommendation": {"make": "Kia", "model": "Soul"}, "error": "Search failed: boom"})
+
+    snapshot = job.snapshot()
+    assert snapshot["progress"]["searchesDone"] == 2 and snapshot["progress"]["listingsFound"] == 1
+    assert snapshot["searchErrors"] == [{"recommendation": {"make": "Kia", "model": "Soul"},
+                                         "error": "Search failed: boom"}]
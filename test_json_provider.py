@@ -0,0 +1,33 @@
+"""
+Tests for the orjson-backed JSON provider
+"""
+
+import datetime
+import json
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from server.app.utils import json_provider
+from server.app.utils.json_provider import FastJSONProvider
+
+PAYLOAD = {"b": 1, "a": [1.5, None, "Citroën"], "listed": datetime.date(2024, 1, 2), "c": {"nested": True}}
+
+
+def _body(provider_class):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        return jsonify(PAYLOAD).get_data()
+
+
+def test_matches_stdlib_provider_output():
+    fast = _body(FastJSONProvider)
+    assert json.loads(fast) == json.loads(_body(DefaultJSONProvider))
+    assert "Citroën".encode() in fast
+
+
+def test_falls_back_to_stdlib(monkeypatch):
+    fast = _body(FastJSONProvider)
+    monkeypatch.setattr(json_provider, "orjson", None)
+    assert _body(FastJSONProvider) == fast
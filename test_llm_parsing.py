@@ -0,0 +1,69 @@
+"""
+Tests for tolerant LLM response parsing
+"""
+
+import pytest
+
+from server.app.utils.llm_parsing import (
+    JSONStreamExtractor,
+    LLMParseError,
+    extract_json,
+    parse_ratings,
+    parse_recommendations,
+)
+
+
+def test_fenced_and_chatty_output():
+    text = 'Sure! Here you go:\n```json\n[{"make": "Honda", "model": "Civic", "year": 2019, "price": 18000}]\n```\nEnjoy.'
+    assert extract_json(text)[0]["model"] == "Civic"
+
+
+def test_trailing_commas_and_python_literals():
+    assert extract_json('{"a": 1, "b": [1, 2,],}') == {"a": 1, "b": [1, 2]}
+    assert extract_json("{'a': True, 'b': None}") == {"a": True, "b": None}
+
+
+def test_truncated_output_is_closed():
+    text = '[{"make": "Toyota", "model": "RAV4", "year": 2020}, {"make": "Mazda", "model": "CX-5"'
+    assert extract_json(text)[1] == {"make": "Mazda", "model": "CX-5"}
+
+
+def test_stream_extractor_yields_elements_as_they_close():
+    extractor = JSONStreamExtractor()
+    chunks = ['{"recommendations": [{"make": "Ho', 'nda", "model": "C}R-V"}, {"make"', ': "Kia", "model": "Soul"}]}']
+    seen = [extractor.feed(chunk) for chunk in chunks]
+    # Elements of the nested "recommendations" array are reported as they close
+    assert seen == [[], ['{"make": "Honda", "model": "C}R-V"}'], ['{"make": "Kia", "model": "Soul"}']]
+    assert extract_json(extractor.document)["recommendations"][0]["model"] == "C}R-V"
+
+    extractor = JSONStreamExtractor()
+    seen = [extractor.feed(chunk) for chunk in ['[{"make": "Ford"}, {"ma', 'ke": "Ram"}]']]
+    assert seen == [['{"make": "Ford"}'], ['{"make": "Ram"}']]
+
+
+def test_parse_ratings_coerces_and_fills_overall():
+    ratings = parse_ratings('{"dealRating": "4.1", "fuelEconomyRating": 3.9, "maintenanceRating": 4, '
+                            '"safetyRating": 4.5, "ownerSatisfactionRating": 4.0}')
+    assert ratings["dealRating"] == 4.1
+    assert ratings["overallRating"] == 4.1
+
+
+def test_parse_ratings_rejects_out_of_range():
+    with pytest.raises(LLMParseError):
+        parse_ratings('{"dealRating": 9, "fuelEconomyRating": 3, "maintenanceRating": 3, '
+                      '"safetyRating": 3, "ownerSatisfactionRating": 3, "overallRating": 4}')
+
+
+def test_parse_recommendations_shapes():
+    structured = '{"recommendations": [{"make": "Honda", "model": "Fit", "year": "2018", "price": 12000}, {"make": ""}]}'
+    assert parse_recommendations(structured) == [{"make": "Honda", "model": "Fit", "year": 2018, "price": 12000}]
+    with pytest.raises(LLMParseError):
+        parse_recommendations("I could not find any cars.")
+
+
+def test_non_finite_numbers_are_not_numbers():
+    text = '[{"make": "Honda", "model": "Fit", "year": NaN, "price": Infinity}, {"make": "Kia", "model": "Soul", "year": "-inf"}]'
+    assert [(r["year"], r["price"]) for r in parse_recommendations(text)] == [(None, None), (None, None)]
+    with pytest.raises(LLMParseError):
+        parse_ratings('{"dealRating": NaN, "fuelEconomyRating": 4, "maintenanceRating": 4, "safetyRating": 4, '
+                      '"ownerSatisfactionRating": 4, "overallRating": 4}')
@@ -0,0 +1,119 @@
+"""
+Tests for the comparable-listing market index
+"""
+
+import random
+
+import pytest
+
+from server.app.utils import clean_data, market_index
+from server.app.utils.market_index import SKETCH_ACCURACY, MarketIndex, QuantileSketch
+
+
+def _listing(vin, price, miles=30000, state="NJ"):
+    return {
+        "vehicle": {"vin": vin, "make": "Honda", "model": "Civic", "year": 2020},
+        "retailListing": {"price": price, "miles": miles, "state": state},
+    }
+
+
+def test_sketch_quantiles_stay_within_the_relative_error():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(10, 0.5) for _ in range(5000))
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= SKETCH_ACCURACY * exact * 1.01
+    assert sketch.rank(values[2500]) == pytest.approx(0.5, abs=0.02)
+
+
+def test_merged_sketches_match_one_sketch_of_all_values():
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate([0, 5, 120, 9000, 15000, 15500, 22000, 48000]):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+
+    assert left.to_dict() == whole.to_dict()
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(accuracy=0.05))
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    path = str(tmp_path / "market.json")
+    index = MarketIndex(path)
+    for i in range(6):
+        assert index.observe(_listing(f"VIN{i}", 15000 + 1000 * i))
+    assert not index.observe(_listing("VIN0", 15000))
+    assert index.save()
+
+    reloaded = MarketIndex(path)
+    assert reloaded.export() == index.export()
+    assert reloaded.stats("Honda", "Civic", 2020, "NJ") == index.stats("Honda", "Civic", 2020, "NJ")
+    assert not reloaded.observe(_listing("VIN3", 18000))
+
+
+def test_market_deal_rating_replaces_the_llm_deal_rating(tmp_path, monkeypatch):
+    index = MarketIndex(str(tmp_path / "market.json"))
+    monkeypatch.setattr(market_index, "market_index", index)
+    ratings = {"dealRating": 3, "fuelEconomyRating": 4, "maintenanceRating": 4,
+               "safetyRating": 4, "ownerSatisfactionRating": 4, "overallRating": 3.8}
+
+    # Too few comparables: the ratings are left alone
+    assert market_index.apply_market_deal_rating(_listing("NEW", 10000), ratings) == ratings
+
+    for i in range(10):
+        index.observe(_listing(f"VIN{i}", 20000 + 1000 * i))
+    cheap = market_index.apply_market_deal_rating(_listing("NEW", 10000, miles=5000), ratings)
+    pricey = market_index.apply_market_deal_rating(_listing("NEW", 40000, miles=90000), ratings)
+
+    assert cheap["dealRating"] == 5 and pricey["dealRating"] == 1
+    assert cheap["overallRating"] == pytest.approx((5 + 4 * 4) / 5)
+    assert ratings["dealRating"] == 3
+
+
+def test_clean_listings_rates_a_listing_before_counting_it_as_a_comparable(tmp_path, monkeypatch):
+    index = MarketIndex(str(tmp_path / "market.json"))
+    for i in range(4):
+        index.observe(_listing(f"VIN{i}", 20000 + 1000 * i))
+    monkeypatch.setattr(market_index, "market_index", index)
+    monkeypatch.setattr(clean_data, "market_index", index)
+    monkeypatch.setattr(clean_data, "fetch_listing_photos", lambda vin, retail: [])
+    monkeypatch.setattr(clean_data, "rate_listing", lambda car, mode: {"dealRating": 3})
+    monkeypatch.setattr(clean_data, "estimate_annual_insurance", lambda car: {})
+    monkeypatch.setattr(clean_data.listing_store, "put", lambda vin, listing: None)
+    monkeypatch.setattr(clean_data.similar_index, "add", lambda vin, listing: None)
+
+    # Four comparables plus the listing itself would reach MIN_COMPARABLES
+    cleaned = clean_data.clean_listings({"results": [{"listings": [_listing("NEW", 10000)]}]}, save_index=False)
+
+    assert cleaned["results"]["NEW"]["ratings"] == {"dealRating": 3}
+    assert index.comparables("Honda", "Civic", 2020, "NJ")[1]["price"].count == 5
+
+
+def test_saves_are_throttled(tmp_path):
+    index = MarketIndex(str(tmp_path / "market.json"), save_interval=3600)
+    index.observe(_listing("VIN0", 15000))
+    assert index.save()
+    index.observe(_listing("VIN1", 16000))
+    assert not index.save()
+    assert index.save(force=True)
+    assert MarketIndex(index.path).comparables("Honda", "Civic", 2020, "NJ", min_count=1)[1]["price"].count == 2
+
+
+def test_workers_sharing_a_file_keep_each_others_observations(tmp_path):
+    path = str(tmp_path / "market.json")
+    first, second = MarketIndex(path, save_interval=0), MarketIndex(path, save_interval=0)
+    for i in range(3):
+        first.observe(_listing(f"A{i}", 15000 + 1000 * i))
+        second.observe(_listing(f"B{i}", 25000 + 1000 * i))
+    second.observe(_listing("A0", 15000))  # both workers saw this one
+    assert first.save() and second.save()
+
+    merged = MarketIndex(path)
+    assert merged.comparables("Honda", "Civic", 2020, "NJ")[1]["price"].count == 6
+    # The later writer picked up the other worker's observations too
+    assert second.export() == merged.export()
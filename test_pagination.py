@@ -0,0 +1,94 @@
+"""
+Tests for ranked listing pagination
+"""
+
+import pytest
+
+from server.app.utils import pagination
+from server.app.utils.pagination import CursorError, ResultSession, decode_cursor, encode_cursor
+
+
+def _listing(vin, price):
+    return {"vehicle": {"vin": vin, "make": "Honda", "model": "Civic"}, "retailListing": {"price": price}}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Upstream pages sorted by price within each model, interleaved across models."""
+    calls = []
+    pages = {
+        ("Civic", 1): [_listing("C2", 100), _listing("SHARED", 150), _listing("C1", 300)],
+        ("Civic", 2): [_listing("C3", 350)],
+        ("Accord", 1): [_listing("SHARED", 150), _listing("A1", 200), _listing("A2", 400)],
+    }
+
+    def fake_search(rec, state, budget, headers, limit=5, page=None, sort=None):
+        calls.append((rec["model"], page, sort))
+        return {"recommendation": rec, "listings": pages.get((rec["model"], page), [])}
+
+    monkeypatch.setattr(pagination, "search_autodev", fake_search)
+    monkeypatch.setattr(pagination, "UPSTREAM_PAGE_SIZE", 3)
+    return calls
+
+
+RECS = [{"make": "Honda", "model": "Civic"}, {"make": "Honda", "model": "Accord"}]
+
+
+def _vins(page):
+    return [l["vehicle"]["vin"] for l in page]
+
+
+def test_merges_streams_in_rank_order_without_duplicates(upstream):
+    session = ResultSession("NJ", None, {}).open(RECS)
+    page, has_more = session.take(0, 4)
+    assert _vins(page) == ["C2", "SHARED", "A1", "C1"]
+    assert has_more
+    page, has_more = session.take(4, 4)
+    # Civic's second page is merged in once its first page is used up
+    assert _vins(page) == ["C3", "A2"]
+    assert not has_more
+    assert {sort for _, _, sort in upstream} == {"retailListing.price.asc"}
+
+
+def test_fetches_next_upstream_page_lazily(upstream):
+    session = ResultSession("NJ", None, {}).open([{"make": "Honda", "model": "Civic"}])
+    session.take(0, 3)
+    assert [call[:2] for call in upstream] == [("Civic", 1)]
+    session.take(3, 1)
+    assert [call[:2] for call in upstream] == [("Civic", 1), ("Civic", 2)]
+
+
+def test_sorts_upstream_cant_do_read_every_page_first(upstream, monkeypatch):
+    monkeypatch.setattr(pagination, "UPSTREAM_SORT_FIELDS", {})
+    session = ResultSession("NJ", None, {}, descending=True).open(RECS)
+    assert sorted(call[:2] for call in upstream) == [("Accord", 1), ("Accord", 2), ("Civic", 1), ("Civic", 2)]
+    assert _vins(session.take(0, 2)[0]) == ["A2", "C3"]
+    assert session.exact
+
+    monkeypatch.setattr(pagination, "UNSORTED_MAX_PAGES", 1)
+    assert not ResultSession("NJ", None, {}).open(RECS).exact
+
+
+def test_cursor_rebuilds_a_session_this_process_doesnt_have(upstream):
+    session = ResultSession("NJ", "30000", {}, page_size=2).open(RECS)
+    pagination.store_session(session)
+    session_id, offset, spec = decode_cursor(encode_cursor(session.id, 2, session.spec()))
+    expected = _vins(session.take(offset, 2)[0])
+
+    pagination._sessions.clear()
+    rebuilt = pagination.load_session(session_id, spec, {})
+    assert rebuilt.id == session.id and rebuilt.budget == "30000"
+    assert _vins(rebuilt.take(offset, 2)[0]) == expected
+    with pytest.raises(CursorError) as expired:
+        pagination.load_session("gone")
+    assert expired.value.status == 410
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc", 40)) == ("abc", 40, None)
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor")
+    tampered = {"state": "NJ", "budget": None, "sort": "price", "desc": False, "size": 20,
+                "recs": [["Honda", {"$ne": 1}, None]]}
+    with pytest.raises(CursorError):
+        decode_cursor(encode_cursor("abc", 40, tampered))
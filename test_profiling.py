@@ -0,0 +1,76 @@
+"""
+Tests for the request profiling hook
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from server.app.utils import accounting, profiling
+
+
+def _busy(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def _app(monkeypatch, tmp_path, slow_ms):
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "s3cret")
+    monkeypatch.setattr(profiling, "profiler", profiling.Profiler(str(tmp_path), interval=0.002, slow_ms=slow_ms,
+                                                                  keep=2))
+    app = Flask(__name__)
+    accounting.init_accounting(app)
+    profiling.init_profiling(app)
+
+    @app.route("/slow")
+    def slow():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(accounting.propagate(_busy), 0.15).result()
+        time.sleep(0.05)
+        return {"ok": True}
+
+    @app.route("/fast")
+    def fast():
+        return {"ok": True}
+
+    return app.test_client()
+
+
+def test_tokens_are_signed_and_expire():
+    token = profiling.sign_profile_token(60, secret="k", now=1000)
+    assert profiling.verify_profile_token(token, secret="k", now=1000)
+    assert not profiling.verify_profile_token(token, secret="other", now=1000)
+    assert not profiling.verify_profile_token(token, secret="k", now=1100)
+    assert not profiling.verify_profile_token("garbage", secret="k")
+    assert not profiling.verify_profile_token(token, secret="", now=1000)
+
+
+def test_signed_requests_are_profiled_with_wall_and_cpu_stacks(monkeypatch, tmp_path):
+    client = _app(monkeypatch, tmp_path, slow_ms=0)
+
+    assert profiling.PROFILE_ID_HEADER not in client.get("/slow").headers
+    response = client.get("/slow", headers={profiling.PROFILE_HEADER: profiling.sign_profile_token(60)})
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+
+    (meta,) = profiling.profiler.list()
+    assert meta["id"] == profile_id and meta["trigger"] == "header" and meta["path"] == "/slow"
+    wall = profiling.profiler.stacks(profile_id, "wall")
+    cpu = profiling.profiler.stacks(profile_id, "cpu")
+    assert any(line.startswith("request;") for line in wall.splitlines())
+    assert any(line.startswith("worker;") and "_busy" in line for line in wall.splitlines())
+    assert "_busy" in cpu
+    assert profiling.profiler.stacks("../etc/passwd") is None
+
+
+def test_slow_requests_are_profiled_automatically_in_a_bounded_ring(monkeypatch, tmp_path):
+    client = _app(monkeypatch, tmp_path, slow_ms=50)
+
+    assert profiling.PROFILE_ID_HEADER not in client.get("/fast").headers
+    ids = [client.get("/slow").headers[profiling.PROFILE_ID_HEADER] for _ in range(3)]
+
+    stored = profiling.profiler.list()
+    assert [meta["id"] for meta in stored] == ids[:0:-1]
+    assert all(meta["trigger"] == "slow" and meta["sampledMs"] < meta["durationMs"] for meta in stored)
+    assert len(list(tmp_path.iterdir())) == 6
@@ -0,0 +1,45 @@
+"""
+Tests for listing field projection and the compact layout
+"""
+
+import pytest
+
+from server.app.utils.projection import parse_fields, shape_listings
+
+LISTINGS = {
+    "VIN1": {"vehicle": {"vin": "VIN1", "make": "Honda"}, "retailListing": {"price": 100, "images": ["a.jpg", "b.jpg"]}},
+    "VIN2": {"vehicle": {"vin": "VIN2", "make": "Mazda"}, "retailListing": {"price": 200, "images": []}},
+}
+
+
+def test_projection_keeps_requested_paths():
+    fields = parse_fields("vehicle.make,retailListing.primaryImage")
+    shaped = shape_listings(LISTINGS, fields)
+    assert shaped["VIN1"] == {"vehicle": {"make": "Honda"}, "retailListing": {"primaryImage": "a.jpg"}}
+    assert shaped["VIN2"]["retailListing"]["primaryImage"] is None
+
+
+def test_compact_layout_is_columnar_in_order():
+    shaped = shape_listings(LISTINGS, parse_fields("retailListing.price"), "compact", order=["VIN2", "VIN1"])
+    assert shaped == {"vins": ["VIN2", "VIN1"], "fields": ["retailListing.price"],
+                      "columns": {"retailListing.price": [200, 100]}}
+
+
+def test_unknown_section_is_rejected():
+    assert parse_fields(None) is None
+    with pytest.raises(ValueError):
+        parse_fields("dealer.name")
+
+
+def test_projection_never_modifies_the_stored_listing():
+    listings = {"VIN1": {"vehicle": {"vin": "VIN1"}, "retailListing": {"price": 100, "images": ["a.jpg"]},
+                         "history": None}}
+
+    shaped = shape_listings(listings, parse_fields("retailListing,retailListing.primaryImage,history,history.oneOwner"))
+
+    assert shaped["VIN1"]["retailListing"] == {"price": 100, "images": ["a.jpg"], "primaryImage": "a.jpg"}
+    assert shaped["VIN1"]["history"] == {"oneOwner": None}
+    assert listings["VIN1"]["retailListing"] == {"price": 100, "images": ["a.jpg"]}
+    assert listings["VIN1"]["history"] is None
+    shaped["VIN1"]["retailListing"]["images"].append("b.jpg")
+    assert listings["VIN1"]["retailListing"]["images"] == ["a.jpg"]
@@ -0,0 +1,92 @@
+"""
+Regression test for the compact rating prompt
+"""
+
+from server.app.utils.openai import (
+    build_rating_prompt,
+    project_rating_input,
+    rating_prompt_report,
+)
+
+# A simplified listing as produced by clean_listings
+listing = {
+    "history": {
+        "accidentCount": 0,
+        "accidents": [],
+        "oneOwner": True,
+        "ownerCount": 1,
+        "personalUse": True,
+        "usageType": "Personal",
+    },
+    "retailListing": {
+        "carfaxUrl": "https://www.carfax.com/VehicleHistory/p/Report.cfx?partner=DVW_1&vin=2HGFC2F59KH512345",
+        "city": "Princeton",
+        "cpo": False,
+        "dealer": {"name": "Princeton Honda", "phone": "609-555-0100", "address": "1 Route 1", "website": "https://example.com"},
+        "miles": 42150,
+        "price": 18995,
+        "images": [f"https://cdn.example.com/photos/2HGFC2F59KH512345/{i}.jpg" for i in range(12)],
+        "state": "NJ",
+        "used": True,
+        "listing": "https://www.example.com/vdp/2HGFC2F59KH512345",
+        "zip": "08540",
+    },
+    "vehicle": {
+        "baseMsrp": 21450,
+        "bodyStyle": "Sedan",
+        "cylinders": 4,
+        "doors": 4,
+        "drivetrain": "FWD",
+        "engine": "2.0L I4",
+        "exteriorColor": "Lunar Silver Metallic",
+        "fuel": "Gasoline",
+        "interiorColor": "Black",
+        "make": "Honda",
+        "model": "Civic",
+        "seats": 5,
+        "transmission": "Automatic (CVT)",
+        "trim": "LX",
+        "type": "Car",
+        "vin": "2HGFC2F59KH512345",
+        "year": 2019,
+    },
+}
+
+
+def test_projection_keeps_rating_fields():
+    compact = project_rating_input(listing)
+    for expected in ("year=2019", "make=Honda", "model=Civic", "price=18995", "miles=42150",
+                     "state=NJ", "accidents=0", "owners=1"):
+        assert expected in compact
+
+
+def test_projection_drops_irrelevant_fields():
+    compact = project_rating_input(listing)
+    for dropped in ("https://", "Princeton Honda", "Lunar Silver", ".jpg"):
+        assert dropped not in compact
+
+
+def test_projection_is_stable():
+    reordered = {key: dict(reversed(list(value.items()))) for key, value in reversed(list(listing.items()))}
+    assert project_rating_input(reordered) == project_rating_input(listing)
+
+
+def test_prompt_payload_shrank():
+    report = rating_prompt_report(listing)
+    assert report["compactTokens"] < report["fullTokens"]
+    # The vehicle payload itself should be well under half its previous size
+    full_payload = len(str(listing))
+    compact_payload = len(project_rating_input(listing))
+    assert compact_payload * 2 < full_payload
+    assert "{vehicle_data}" not in build_rating_prompt(listing)
+
+
+if __name__ == "__main__":
+    report = rating_prompt_report(listing)
+    print("=" * 60)
+    print("RATING PROMPT SIZE")
+    print("=" * 60)
+    print(f"   Full listing prompt:  ~{report['fullTokens']} tokens")
+    print(f"   Compact prompt:       ~{report['compactTokens']} tokens")
+    print(f"   Saved:                ~{report['savedTokens']} tokens ({report['reduction']:.0%})")
+    print(f"\n   Payload: {project_rating_input(listing)}")
@@ -0,0 +1,30 @@
+"""
+Tests for the local recommender's query intents
+"""
+
+import pytest
+
+from server.app.utils.recommender import _intents
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("around town", set()),  # not "tow"
+    ("good economy", {"compact"}),  # not "eco"
+    ("advanced safety", set()),  # not "van"
+    ("functional", set()),  # not "fun"
+    ("public transport", set()),  # not "sport"
+    ("every day", set()),  # not "ev"
+])
+def test_keywords_inside_other_words_do_not_match(query, expected):
+    assert _intents(query) == expected
+
+
+def test_gas_mileage_is_only_a_commute():
+    assert _intents("gas mileage") == {"commute"}
+
+
+def test_keywords_match_whole_words_and_their_forms():
+    assert _intents("Towing a boat", "sporty") == {"towing", "sports"}
+    assert _intents("commuting", "eco-friendly") == {"commute", "electric"}
+    assert _intents("kids and vans") == {"family", "minivan"}
+    assert _intents("an EV", "SUVs") == {"electric", "suv"}
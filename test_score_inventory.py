@@ -0,0 +1,57 @@
+"""
+Tests for the bulk inventory scoring CLI
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+
+from server import score_inventory
+
+LISTING = {
+    "vehicle": {"vin": "VIN1", "make": "Toyota", "model": "Camry", "year": 2019, "bodyStyle": "Sedan",
+                "cylinders": 4, "baseMsrp": 25000},
+    "retailListing": {"price": 18000, "miles": 40000, "state": "NJ", "vdp": "https://dealer.example/VIN1"},
+    "history": {"accidentCount": 0, "ownerCount": 1},
+}
+
+
+def test_jsonl_rows_are_scored_in_order_across_workers(tmp_path):
+    source = tmp_path / "inventory.jsonl"
+    rows = [dict(LISTING, vehicle=dict(LISTING["vehicle"], vin=f"VIN{i}")) for i in range(5)]
+    source.write_text("\n".join([json.dumps(r) for r in rows[:2]] + ["{broken", "[1]"]
+                                + [json.dumps(r) for r in rows[2:]]) + "\n")
+    output = tmp_path / "scores.jsonl"
+
+    summary = score_inventory.score_file(str(source), str(output), workers=2, chunk_size=2, report_every=0)
+
+    assert summary["rows"] == 7 and summary["errors"] == 2
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["vin"] for r in records] == ["VIN0", "VIN1", None, None, "VIN2", "VIN3", "VIN4"]
+    assert records[2]["error"].startswith("invalid JSON") and records[3]["error"] == "line is not a JSON object"
+    assert records[0]["overallRating"] and records[0]["annualInsurance"] > 0
+
+
+def test_csv_columns_map_like_clean_listings(tmp_path):
+    source = tmp_path / "inventory.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["vehicle.vin", "make", "model", "year", "price", "miles", "state", "oneOwner"])
+        writer.writerow(["VIN1", "Toyota", "Camry", "2019", "$18,000", "40000", "NJ", "true"])
+    output = tmp_path / "scores.csv"
+
+    score_inventory.score_file(str(source), str(output), workers=1, report_every=0)
+
+    (record,) = list(csv.DictReader(open(output)))
+    assert record["vin"] == "VIN1" and float(record["price"]) == 18000 and record["error"] == ""
+    assert float(record["annualInsurance"]) > 0
+
+
+def test_workers_do_not_import_flask_or_the_api_clients():
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server")
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, score_inventory; print(' '.join(sys.modules))"],
+        cwd=server, capture_output=True, text=True, check=True).stdout.split()
+    assert not {"flask", "openai", "numpy", "app.utils.clean_data"} & set(loaded)
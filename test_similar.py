@@ -0,0 +1,62 @@
+"""
+Tests for the similar-listings vector index
+"""
+
+import pytest
+
+from server.app.utils import similar
+from server.app.utils.similar import SimilarIndex, encode_listing
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request):
+    """Run a test against both vector backends; the NumPy one only where NumPy is installed."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        return None
+    return False
+
+
+def _listing(make, model, year, price, miles, body="Sedan", fuel="Gasoline"):
+    return {
+        "vehicle": {"make": make, "model": model, "year": year, "bodyStyle": body, "fuel": fuel},
+        "retailListing": {"price": price, "miles": miles},
+    }
+
+
+def test_similar_ranks_same_model_first_and_excludes_the_query(backend):
+    index = SimilarIndex(max_size=100, use_numpy=backend)
+    index.add("CIVIC1", _listing("Honda", "Civic", 2020, 21000, 30000))
+    index.add("CIVIC2", _listing("Honda", "Civic", 2019, 19500, 41000))
+    index.add("COROLLA", _listing("Toyota", "Corolla", 2020, 20500, 33000))
+    index.add("F150", _listing("Ford", "F-150", 2016, 32000, 90000, body="Pickup"))
+    index.add("TESLA", _listing("Tesla", "Model 3", 2022, 38000, 12000, fuel="Electric"))
+
+    matches = index.similar("CIVIC1", limit=3)
+
+    assert [vin for vin, _ in matches] == ["CIVIC2", "COROLLA", "TESLA"]
+    assert 0 < matches[-1][1] < matches[0][1] <= 1
+    assert index.similar("MISSING") is None
+    assert encode_listing({}) is None
+
+
+def test_index_is_bounded_and_reindexes_in_place(backend):
+    index = SimilarIndex(max_size=3, use_numpy=backend)
+    for i in range(5):
+        index.add(f"VIN{i}", _listing("Honda", "Civic", 2015 + i, 15000 + 1000 * i, 80000 - 10000 * i))
+    index.add("VIN3", _listing("Honda", "Accord", 2021, 26000, 20000))
+
+    assert len(index) == 3
+    assert index.similar("VIN0") is None
+    assert sorted(vin for vin, _ in index.similar("VIN4")) == ["VIN2", "VIN3"]
+    assert index.stats()["size"] == 3
+
+
+def test_numpy_is_only_imported_once_a_listing_is_indexed(monkeypatch):
+    loads = []
+    monkeypatch.setattr(similar, "_load_numpy", lambda: loads.append(1))
+    index = SimilarIndex(max_size=10)
+    assert index.similar("VIN") is None and index.stats()["numpy"] is None
+    assert loads == []
+    index.add("VIN", _listing("Honda", "Civic", 2020, 21000, 30000))
+    assert loads == [1] and index.stats()["numpy"] is False
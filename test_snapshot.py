@@ -0,0 +1,53 @@
+"""
+Tests for cache snapshots and warm start
+"""
+
+import time
+
+from server.app.utils import snapshot
+from server.app.utils.cache import MemoryBackend, NamespacedCache
+from server.app.utils.snapshot import Snapshot, write_snapshot
+
+
+def _hot_backend():
+    backend = MemoryBackend()
+    NamespacedCache(backend, "ratings", ttl=60).set("abc", {"overallRating": 4.2})
+    NamespacedCache(backend, "photos", ttl=0.05).set("VIN1", ["a.jpg"])
+    NamespacedCache(backend, "search", ttl=60).set("url", [])  # not snapshotted
+    return backend
+
+
+def test_warm_start_serves_misses_from_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    market = {"version": snapshot.INDEX_VERSION, "groups": {}, "vins": ["VIN1"]}
+    assert write_snapshot(path, backend=_hot_backend(), market=market) == 2
+    time.sleep(0.1)
+
+    warm = Snapshot(path)
+    assert warm.stats()["loaded"] is False  # nothing is read until the first lookup
+    fresh = MemoryBackend()
+    ratings = NamespacedCache(fresh, "ratings", ttl=60, warm_source=warm)
+    assert ratings.get("abc") == {"overallRating": 4.2}
+    assert ratings.stats()["warmHits"] == 1
+    assert fresh.get("ratings:abc") is not None  # copied into the live cache
+    assert NamespacedCache(fresh, "photos", ttl=60, warm_source=warm).get("VIN1") is None  # expired
+    assert NamespacedCache(fresh, "search", ttl=60, warm_source=warm).get("url") is None
+    assert warm.market()["vins"] == ["VIN1"]
+
+
+def test_incompatible_snapshots_are_skipped(tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, backend=_hot_backend(), market={"version": snapshot.INDEX_VERSION})
+
+    monkeypatch.setattr(snapshot, "CACHE_VERSION", snapshot.CACHE_VERSION + 1)
+    assert Snapshot(path).lookup("ratings", "abc") is None
+    monkeypatch.undo()
+
+    monkeypatch.setattr(snapshot, "INDEX_VERSION", snapshot.INDEX_VERSION + 1)
+    warm = Snapshot(path)
+    assert warm.lookup("ratings", "abc") is not None
+    assert warm.market() is None
+
+    garbage = tmp_path / "garbage.bin"
+    garbage.write_bytes(b"not a snapshot at all")
+    assert Snapshot(str(garbage)).lookup("ratings", "abc") is None
@@ -0,0 +1,38 @@
+"""
+Tests for make/model normalization
+"""
+
+from server.app.utils.vehicle_names import get_name_index
+
+
+def test_aliases_and_punctuation():
+    index = get_name_index()
+    assert index.normalize("Mercedes Benz", "C class")[:2] == ("Mercedes-Benz", "C-Class")
+    assert index.normalize("Honda", "CRV")[:2] == ("Honda", "CR-V")
+    assert index.normalize("Chevy", "Silverado")[:2] == ("Chevrolet", "Silverado")
+
+
+def test_trim_words_and_typos():
+    index = get_name_index()
+    assert index.normalize("Honda", "Civic EX-L")[:2] == ("Honda", "Civic")
+    assert index.normalize("Toyta", "Corrolla")[:2] == ("Toyota", "Corolla")
+
+
+def test_unknown_names_pass_through():
+    assert get_name_index().normalize("Fisker", "Ocean") == ("Fisker", "Ocean", False)
+    assert get_name_index().normalize("Honda", "Civic") == ("Honda", "Civic", False)
+
+
+def test_models_missing_from_the_catalog_are_not_swapped_for_similar_ones():
+    index = get_name_index()
+    for make, model in [
+        ("Hyundai", "Santa Cruz"), ("Mazda", "CX-90"), ("Toyota", "Corolla Cross"), ("Toyota", "Grand Highlander"),
+        ("Ford", "Bronco Sport"), ("Toyota", "Camry Hybrid"), ("Honda", "Civic Type R"),
+    ]:
+        assert index.normalize(make, model) == (make, model, False)
+    assert index.normalize("Toyota", "Camry XLE AWD")[:2] == ("Toyota", "Camry")
+
+
+def test_case_and_punctuation_fixes_do_not_count_as_changes():
+    assert get_name_index().normalize("honda", "crv") == ("Honda", "CR-V", False)
+    assert get_name_index().normalize("Honda", "Civic EX-L")[2] is True